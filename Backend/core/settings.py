@@ -55,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.middleware.MetricsMiddleware',
+    'utils.middleware.SQLProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -149,7 +151,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.StandardPagination',
     'PAGE_SIZE': 20,
 }
 
@@ -182,6 +184,88 @@ EMAIL_PORT = 1025
 EMAIL_USE_TLS = False
 EMAIL_USE_SSL = False
 
+# Cache Configuration
+# Redis when REDIS_CACHE_URL is set, otherwise process-local memory (tests, development)
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'wcompany',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wcompany',
+        }
+    }
+
+# Public content responses are cached for this many seconds and
+# invalidated when the underlying rows change
+RESPONSE_CACHE_TIMEOUT = 300
+
+# SystemSetting rows are cached in process memory; with this enabled the
+# loaded values are also shared through the cache above (Redis)
+SYSTEM_SETTINGS_SHARED_CACHE = bool(REDIS_CACHE_URL)
+
+# SMS provider client: keep-alive pool size, (connect, read) timeouts,
+# messages per second (the sms_rate_limit system setting overrides it) and
+# circuit breaker limits
+SMS_POOL_SIZE = 10
+SMS_TIMEOUT = (3.05, 10)
+SMS_RATE_LIMIT = None
+SMS_CIRCUIT_FAILURES = 5
+SMS_CIRCUIT_RESET = 30
+
+# PDF rendering: WeasyPrint in a pool of PDF_WORKERS processes (0 renders
+# in the request process), output cached in MEDIA_ROOT/PDF_CACHE_DIR by
+# content hash. utils.pdf.render_text is a ReportLab fallback for hosts
+# without the Pango libraries
+PDF_RENDERER = os.environ.get('PDF_RENDERER', 'utils.pdf.render_weasyprint')
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+PDF_CACHE_DIR = 'pdf'
+PDF_TIMEOUT = 60
+PDF_EXPORT_MAX_DOCUMENTS = 1000
+# Hosts WeasyPrint may load images and stylesheets from, besides data: URLs.
+# file:// and any other host are refused
+PDF_ALLOWED_HOSTS = [host.strip() for host in os.environ.get('PDF_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+# Per-request SQL profiling: query count, SQL time and duplicated queries
+# in the Server-Timing header and the utils.middleware log. Requests slower
+# than SQL_PROFILING_SLOW_MS or running SQL_PROFILING_SLOW_QUERIES queries
+# are kept in the admin, the newest SQL_PROFILING_BUFFER_SIZE of them
+SQL_PROFILING = os.environ.get('SQL_PROFILING', '').lower() == 'true'
+SQL_PROFILING_SLOW_MS = 500
+SQL_PROFILING_SLOW_QUERIES = 50
+SQL_PROFILING_BUFFER_SIZE = 200
+
+# Prometheus metrics served on /metrics: request counts, latency and SQL
+# histograms per URL name of the METRICS_NAMESPACES apps, email, SMS and
+# PDF delivery. Off unless METRICS_ENABLED=true. Scrapers send
+# METRICS_TOKEN as a bearer token; without a token only staff users can
+# read the endpoint.
+# The values are kept in the memory of each process. With several worker
+# processes (gunicorn workers, Celery) set METRICS_DIR to a directory
+# shared by all of them: each process writes its values there every
+# METRICS_WRITE_INTERVAL seconds and /metrics serves the sum. Empty the
+# directory when the service is restarted. Without it a scrape only sees
+# the worker that answered it.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_WRITE_INTERVAL = 5
+METRICS_NAMESPACES = ['orders', 'declarations', 'support', 'users', 'news']
+
+# Newest status updates nested in order and declaration details, the rest
+# are paginated by the status-updates endpoints
+DETAIL_HISTORY_LIMIT = 20
+
+# Rows validated and inserted per transaction by the bulk order import
+ORDER_IMPORT_BATCH_SIZE = 1000
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -189,6 +273,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Tasks run in-process without a broker when CELERY_TASK_ALWAYS_EAGER=true
+# is set for local development; tests enable it with override_settings.
+# Eager errors are not propagated so that task retries run in-process as well.
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', '').lower() == 'true'
+CELERY_TASK_EAGER_PROPAGATES = False
+
+# Email delivery retries: delay doubles from EMAIL_RETRY_BACKOFF seconds up
+# to EMAIL_RETRY_BACKOFF_MAX, with random jitter
+EMAIL_MAX_RETRIES = 5
+EMAIL_RETRY_BACKOFF = 30
+EMAIL_RETRY_BACKOFF_MAX = 3600
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
@@ -203,3 +301,10 @@ VERIFICATION_CODE_EXPIRY = 300  # 5 minutes in seconds
 
 # PDF Generation Settings
 PDF_TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates', 'pdf')
+
+# Full-text search backend: 'auto' uses SQLite FTS5 or PostgreSQL tsvector
+# depending on the database engine, 'like' falls back to icontains lookups
+SEARCH_BACKEND = 'auto'
+# Rows of the unpaginated search list (?pagination=none), the default is
+# keyset pages
+SEARCH_LIST_LIMIT = 100
@@ -23,10 +23,14 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
+from utils.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+    
     # JWT Token endpoints
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from utils.rollups import RollupSpec
+
+
+def build_rollups(apps, schema_editor):
+    RollupSpec(
+        apps.get_model('declarations', 'Declaration'),
+        apps.get_model('declarations', 'DeclarationStatsRollup'),
+        'created_at',
+        ['status']
+    ).rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('declarations', '0003_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeclarationStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('count', models.IntegerField(default=0, verbose_name='Soni')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('status', models.CharField(choices=[('draft', 'Qoralama'), ('submitted', 'Yuborildi'), ('under_review', "Ko'rib chiqilmoqda"), ('approved', 'Tasdiqlandi'), ('rejected', 'Rad etildi'), ('completed', 'Bajarildi')], max_length=20, verbose_name='Holat')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Deklaratsiya statistikasi',
+                'verbose_name_plural': 'Deklaratsiya statistikasi',
+                'ordering': ['-date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'date', 'status'), name='declarations_rollup_user_unique'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date', 'status'), name='declarations_rollup_global_unique')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
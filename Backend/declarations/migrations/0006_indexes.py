@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('declarations', '0005_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='declaration',
+            index=models.Index(fields=['user', '-created_at'], name='decl_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='declaration',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='decl_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='declaration',
+            index=models.Index(fields=['status', '-created_at'], name='decl_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='declarationstatusupdate',
+            index=models.Index(fields=['declaration', '-updated_at'], name='decl_update_decl_date_idx'),
+        ),
+    ]
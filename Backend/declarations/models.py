@@ -3,6 +3,8 @@ from django.conf import settings
 from django.utils import timezone
 import uuid
 
+from utils.models import StatsRollup
+
 
 class Declaration(models.Model):
     """Declaration model for customs declarations"""
@@ -89,6 +91,11 @@ class Declaration(models.Model):
         verbose_name = "Deklaratsiya"
         verbose_name_plural = "Deklaratsiyalar"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='decl_user_created_idx'),
+            models.Index(fields=['user', 'status', '-created_at'], name='decl_user_status_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='decl_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.declaration_number} - {self.product_name}"
@@ -143,6 +150,34 @@ class DeclarationStatusUpdate(models.Model):
         verbose_name = "Deklaratsiya holati yangilanishi"
         verbose_name_plural = "Deklaratsiya holati yangilanishlari"
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['declaration', '-updated_at'], name='decl_update_decl_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.declaration.declaration_number} - {self.status}"
+
+
+class DeclarationStatsRollup(StatsRollup):
+    """Daily declaration counts per user and status"""
+    
+    status = models.CharField(max_length=20, choices=Declaration.DECLARATION_STATUS_CHOICES, verbose_name="Holat")
+    
+    class Meta(StatsRollup.Meta):
+        verbose_name = "Deklaratsiya statistikasi"
+        verbose_name_plural = "Deklaratsiya statistikasi"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'status'],
+                condition=models.Q(user__isnull=False),
+                name='declarations_rollup_user_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'status'],
+                condition=models.Q(user__isnull=True),
+                name='declarations_rollup_global_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.status}: {self.count}"
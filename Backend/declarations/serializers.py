@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Declaration, DeclarationDocument, DeclarationStatusUpdate
 
@@ -92,7 +93,8 @@ class DeclarationDocumentSerializer(serializers.ModelSerializer):
 class DeclarationDetailSerializer(serializers.ModelSerializer):
     """Detailed declaration serializer with related data"""
     
-    status_updates = DeclarationStatusUpdateSerializer(many=True, read_only=True)
+    status_updates = serializers.SerializerMethodField()
+    status_updates_count = serializers.SerializerMethodField()
     documents = DeclarationDocumentSerializer(many=True, read_only=True)
     
     class Meta:
@@ -106,9 +108,23 @@ class DeclarationDetailSerializer(serializers.ModelSerializer):
             'product_unit', 'product_value', 'product_currency', 'customs_code',
             'customs_value', 'customs_duty', 'notes', 'admin_notes', 'rejection_reason',
             'created_at', 'submitted_at', 'reviewed_at', 'completed_at', 'updated_at',
-            'reviewed_by', 'status_updates', 'documents'
+            'reviewed_by', 'status_updates', 'status_updates_count', 'documents'
         ]
         read_only_fields = ['id', 'declaration_number', 'created_at', 'submitted_at', 'reviewed_at', 'completed_at', 'updated_at']
+    
+    def get_status_updates(self, obj):
+        # Prefetched by the detail view, otherwise loaded with the same limit
+        updates = getattr(obj, 'latest_status_updates', None)
+        if updates is None:
+            updates = obj.status_updates.all()[:settings.DETAIL_HISTORY_LIMIT]
+        return DeclarationStatusUpdateSerializer(updates, many=True, context=self.context).data
+    
+    def get_status_updates_count(self, obj):
+        # Annotated by the detail view, status_updates only holds the newest
+        # DETAIL_HISTORY_LIMIT updates
+        if hasattr(obj, 'status_updates_count'):
+            return obj.status_updates_count
+        return obj.status_updates.count()
 
 
 class DeclarationListSerializer(serializers.ModelSerializer):
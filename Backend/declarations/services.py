@@ -0,0 +1,21 @@
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from utils.rollups import aggregate_rollup
+
+from .models import Declaration, DeclarationStatsRollup
+
+
+class DeclarationStatisticsService:
+    """Declaration statistics read from the rollup table"""
+    
+    @staticmethod
+    def rollup_summary(user=None, date_from=None, date_to=None):
+        """Status counts for one user, or for all users when user is None"""
+        aggregates = {
+            'total_declarations': Coalesce(Sum('count'), 0),
+        }
+        for status_value, _ in Declaration.DECLARATION_STATUS_CHOICES:
+            aggregates[f'{status_value}_declarations'] = Coalesce(Sum('count', filter=Q(status=status_value)), 0)
+        
+        return aggregate_rollup(DeclarationStatsRollup, user, date_from, date_to, **aggregates)
@@ -0,0 +1,17 @@
+from utils.rollups import register_rollup
+from utils.search import register_search_index
+
+from .models import Declaration, DeclarationStatsRollup
+
+
+declaration_rollup = register_rollup(
+    Declaration,
+    DeclarationStatsRollup,
+    date_field='created_at',
+    dimensions=['status'],
+)
+
+declaration_search_index = register_search_index(
+    Declaration,
+    ['declaration_number', 'product_name', 'product_description', 'contact_name'],
+)
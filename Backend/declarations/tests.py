@@ -1,3 +1,38 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.models import User
+from utils.seeding import DatasetSeeder
+from .models import Declaration
+
+
+class DeclarationSearchTests(TestCase):
+    """Tests for full-text search of the declaration list"""
+    
+    def setUp(self):
+        seeder = DatasetSeeder(seed=11, batch_size=50)
+        users = seeder.seed_users(3)
+        orders = seeder.seed_orders(users, 40)
+        seeder.seed_declarations(orders, 20)
+        seeder.refresh_derived()
+        
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.product = Declaration.objects.order_by('id').first().product_name
+    
+    def test_cursor_pagination_with_search(self):
+        url = reverse('declarations:declaration-list')
+        expected = [item['id'] for item in self.client.get(url, {'search': self.product, 'page_size': 100}).data['results']]
+        self.assertTrue(expected)
+        
+        ids = []
+        response = self.client.get(url, {'search': self.product, 'pagination': 'cursor', 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, expected)
@@ -19,6 +19,9 @@ urlpatterns = [
     path('<int:declaration_id>/documents/', views.DeclarationDocumentView.as_view(), name='documents'),
     path('documents/<int:pk>/', views.DeclarationDocumentDetailView.as_view(), name='document-detail'),
     
+    # Exports
+    path('export/pdf/', views.export_declaration_pdfs, name='export-pdf'),
+    
     # Statistics
     path('statistics/', views.declaration_statistics, name='declaration-statistics'),
 ] 
\ No newline at end of file
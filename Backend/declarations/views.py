@@ -1,28 +1,57 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.utils import timezone
-from django.http import HttpResponse
-from django.template.loader import get_template
 # from weasyprint import HTML
 import os
 
+from utils.conditional import ConditionalGetMixin, latest_prefetch
+from utils.exports import ExportMixin
+from utils.filters import filter_by_params
+from utils.pdf import pdf_file_response
+from utils.search import search_queryset
+from utils.services import PDFService
+from utils.streaming import zip_response
+
 from .models import Declaration, DeclarationDocument, DeclarationStatusUpdate
 from .serializers import (
     DeclarationSerializer, DeclarationCreateSerializer, DeclarationUpdateSerializer,
     DeclarationDetailSerializer, DeclarationListSerializer, DeclarationStatusUpdateSerializer,
     DeclarationDocumentSerializer, DeclarationStatusUpdateCreateSerializer
 )
+from .services import DeclarationStatisticsService
 
 
-class DeclarationListView(generics.ListCreateAPIView):
-    """List and create declarations"""
+class DeclarationListView(ConditionalGetMixin, ExportMixin, generics.ListCreateAPIView):
+    """List and create declarations
+    
+    Filters: search, ids, status, declaration_type, date_from, date_to.
+    Pass export=csv or export=xlsx to download every matching declaration.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    export_fields = (
+        'declaration_number', 'user__email', 'declaration_type', 'status', 'contact_name', 'contact_phone',
+        'product_name', 'product_quantity', 'product_value', 'product_currency', 'customs_value',
+        'customs_duty', 'delivery_country', 'delivery_city', 'created_at',
+    )
+    export_filename = 'declarations'
     
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Declaration.objects.all()
-        return Declaration.objects.filter(user=self.request.user)
+            queryset = Declaration.objects.all()
+        else:
+            queryset = Declaration.objects.filter(user=self.request.user)
+        
+        if self.request.method == 'GET':
+            queryset = filter_by_params(queryset, self.request.query_params, 'created_at', ('status', 'declaration_type'))
+        
+        # Full-text search, ranked by relevance
+        search = self.request.query_params.get('search', None)
+        if search and self.request.method == 'GET':
+            queryset = search_queryset(queryset, search)
+        
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -33,10 +62,18 @@ class DeclarationListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class DeclarationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DeclarationDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update and delete declaration"""
     serializer_class = DeclarationDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = {'status_updates': 'updated_at', 'documents': 'created_at'}
+    
+    @property
+    def detail_prefetch(self):
+        return (
+            latest_prefetch('status_updates', DeclarationStatusUpdate.objects.order_by('-updated_at', '-id')),
+            'documents',
+        )
     
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -50,7 +87,7 @@ class DeclarationDetailView(generics.RetrieveUpdateDestroyAPIView):
         return DeclarationDetailSerializer
     
     def perform_update(self, serializer):
-        declaration = self.get_object()
+        declaration = serializer.instance
         
         # Create status update if status changed
         if 'status' in serializer.validated_data:
@@ -232,20 +269,13 @@ def generate_pdf(request, declaration_id):
     except Declaration.DoesNotExist:
         return Response({'error': 'Deklaratsiya topilmadi'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Generate PDF using WeasyPrint
-    template = get_template('declarations/declaration_pdf.html')
-    context = {
-        'declaration': declaration,
-        'user': request.user,
-    }
-    html_content = template.render(context)
-    
-    # Create PDF
-    # pdf = HTML(string=html_content).write_pdf()
+    # Rendered in the PDF worker pool, unchanged declarations come from the cache
+    pdf_log = PDFService.generate_declaration_pdf(declaration, request.user, request.META.get('REMOTE_ADDR'))
+    if pdf_log is None:
+        return Response({'error': 'PDF yaratib bo\'lmadi'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     # Create response
-    response = HttpResponse(html_content, content_type='text/html')
-    response['Content-Disposition'] = f'attachment; filename="declaration_{declaration.declaration_number}.pdf"'
+    response = pdf_file_response(pdf_log, f'declaration_{declaration.declaration_number}.pdf')
     
     return response
 
@@ -256,25 +286,38 @@ def declaration_statistics(request):
     """Get declaration statistics for the user"""
     user = request.user
     
-    if user.is_staff:
-        declarations = Declaration.objects.all()
-    else:
-        declarations = Declaration.objects.filter(user=user)
-    
-    total_declarations = declarations.count()
-    draft_declarations = declarations.filter(status='draft').count()
-    submitted_declarations = declarations.filter(status='submitted').count()
-    under_review_declarations = declarations.filter(status='under_review').count()
-    approved_declarations = declarations.filter(status='approved').count()
-    rejected_declarations = declarations.filter(status='rejected').count()
-    completed_declarations = declarations.filter(status='completed').count()
+    stats = DeclarationStatisticsService.rollup_summary(None if user.is_staff else user)
     
     return Response({
-        'total_declarations': total_declarations,
-        'draft_declarations': draft_declarations,
-        'submitted_declarations': submitted_declarations,
-        'under_review_declarations': under_review_declarations,
-        'approved_declarations': approved_declarations,
-        'rejected_declarations': rejected_declarations,
-        'completed_declarations': completed_declarations,
+        'total_declarations': stats['total_declarations'],
+        'draft_declarations': stats['draft_declarations'],
+        'submitted_declarations': stats['submitted_declarations'],
+        'under_review_declarations': stats['under_review_declarations'],
+        'approved_declarations': stats['approved_declarations'],
+        'rejected_declarations': stats['rejected_declarations'],
+        'completed_declarations': stats['completed_declarations'],
     }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_declaration_pdfs(request):
+    """Download declaration PDFs as a ZIP archive
+    
+    Filters: ids, status, date_from, date_to. Documents are rendered in
+    parallel and the archive is streamed as each one completes.
+    """
+    declarations = filter_by_params(Declaration.objects.all(), request.query_params, 'created_at').order_by('created_at')
+    declarations = list(declarations[:settings.PDF_EXPORT_MAX_DOCUMENTS + 1])
+    if len(declarations) > settings.PDF_EXPORT_MAX_DOCUMENTS:
+        return Response(
+            {'error': f"Bir martada {settings.PDF_EXPORT_MAX_DOCUMENTS} tadan ko'p hujjat eksport qilib bo'lmaydi"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    documents = (
+        (f'declaration_{declaration.declaration_number}.pdf', 'declaration', PDFService.declaration_context(declaration))
+        for declaration in declarations
+    )
+    files = PDFService.batch_files(documents, request.user, request.META.get('REMOTE_ADDR'))
+    return zip_response(files, 'declarations.zip')
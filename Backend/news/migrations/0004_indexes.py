@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['status', '-published_at', '-created_at'], name='news_status_published_idx'),
+        ),
+    ]
@@ -59,6 +59,9 @@ class News(models.Model):
         verbose_name = "Yangilik"
         verbose_name_plural = "Yangiliklar"
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-published_at', '-created_at'], name='news_status_published_idx'),
+        ]
     
     def __str__(self):
         return self.title
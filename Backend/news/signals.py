@@ -0,0 +1,17 @@
+from utils.cache import register_cache_invalidation
+from utils.search import register_search_index
+
+from .models import News, NewsCategory, Service, CompanyInfo, FAQ
+
+
+news_search_index = register_search_index(
+    News,
+    ['title', 'content', 'excerpt'],
+)
+
+# Public response cache groups
+register_cache_invalidation(News, 'news')
+register_cache_invalidation(NewsCategory, 'news')
+register_cache_invalidation(Service, 'services')
+register_cache_invalidation(CompanyInfo, 'company_info')
+register_cache_invalidation(FAQ, 'faq')
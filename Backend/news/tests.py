@@ -1,3 +1,138 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.models import User
+from .models import FAQ, News, NewsCategory, Service
+
+
+class PublicNewsSearchTests(TestCase):
+    """Tests for full-text search of public news"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(email='author@example.com', username='author', password='pass12345')
+        self.category = NewsCategory.objects.create(name='Umumiy', slug='umumiy')
+        
+        self.customs = self.create_news(
+            'Oʻzbekiston bojxona xizmati', 'bojxona-xizmati',
+            'Bojxona qoidalari oʻzgardi. Bojxona deklaratsiyalari endi onlayn.'
+        )
+        self.delivery = self.create_news(
+            'Yetkazish muddatlari', 'yetkazish',
+            'Toshkentga yetkazish tezlashdi, bojxona tekshiruvi qisqardi.'
+        )
+        self.create_news('Qoralama', 'qoralama', 'Bojxona', status='draft')
+    
+    def create_news(self, title, slug, content, status='published'):
+        return News.objects.create(
+            title=title, slug=slug, content=content,
+            category=self.category, author=self.author, status=status
+        )
+    
+    def search(self, query):
+        response = self.client.get(reverse('news:public-news-list'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['slug'] for item in response.data['results']]
+    
+    def test_prefix_matching_and_ranking(self):
+        self.assertEqual(self.search('bojx'), ['bojxona-xizmati', 'yetkazish'])
+        self.assertEqual(self.search('toshk yetk'), ['yetkazish'])
+        self.assertEqual(self.search('"?!'), [])
+    
+    def test_uzbek_apostrophes(self):
+        for query in ["o'zbekiston", 'oʻzbekiston', 'o’zbek', 'ozbekiston']:
+            self.assertEqual(self.search(query), ['bojxona-xizmati'])
+    
+    def test_index_follows_save_and_delete(self):
+        self.delivery.title = 'Yangi aviareyslar'
+        self.delivery.save()
+        self.assertEqual(self.search('aviarey'), ['yetkazish'])
+        
+        self.delivery.delete()
+        self.assertEqual(self.search('aviarey'), [])
+    
+    
+    def test_cursor_pagination_with_search(self):
+        response = self.client.get(reverse('news:public-news-list'), {'search': 'bojx', 'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['slug'] for item in response.data['results']], ['bojxona-xizmati'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['slug'] for item in response.data['results']], ['yetkazish'])
+        self.assertIsNone(response.data['next'])
+    
+    def test_cursor_pages_keep_order_of_unpublished_dates(self):
+        for number in range(4):
+            self.create_news(f'Xabar {number}', f'xabar-{number}', 'Matn')
+        # Rows imported without a publication date
+        News.objects.filter(slug__in=['xabar-1', 'xabar-3', 'yetkazish']).update(published_at=None)
+        
+        url = reverse('news:public-news-list')
+        expected = [item['slug'] for item in self.client.get(url, {'page_size': 100}).data['results']]
+        slugs = []
+        response = self.client.get(url, {'pagination': 'cursor', 'page_size': 2})
+        while True:
+            slugs.extend(item['slug'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(slugs, expected)
+
+
+class PublicContentCacheTests(TestCase):
+    """Tests for the response cache of public content endpoints"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.faq = FAQ.objects.create(question='Yetkazish qancha davom etadi?', answer='3-5 kun')
+    
+    def get_faq(self, **params):
+        response = self.client.get(reverse('news:public-faq-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_repeated_requests_are_served_from_cache(self):
+        self.assertEqual(self.get_faq()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_faq()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['count'], 1)
+        
+        # Each query string is cached separately
+        self.assertEqual(self.get_faq(page=1)['X-Cache'], 'MISS')
+    
+    def test_cached_list_etag_costs_no_query(self):
+        url = reverse('news:public-service-list')
+        service = Service.objects.create(name='Yetkazish', slug='yetkazish', description='Tez', service_type='logistics')
+        etag = self.client.get(url)['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        service.is_active = False
+        service.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+    
+    def test_saving_or_deleting_rows_invalidates_their_group(self):
+        self.get_faq()
+        self.client.get(reverse('news:public-home-data'))
+        
+        self.faq.answer = '2 kun'
+        self.faq.save()
+        response = self.get_faq()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['answer'], '2 kun')
+        # Home page data does not include FAQ and stays cached
+        self.assertEqual(self.client.get(reverse('news:public-home-data'))['X-Cache'], 'HIT')
+        
+        self.faq.delete()
+        self.assertEqual(self.get_faq().data['count'], 0)
@@ -12,7 +12,6 @@ urlpatterns = [
     
     # Public News
     path('public/', views.PublicNewsListView.as_view(), name='public-news-list'),
-    path('public/<slug:slug>/', views.PublicNewsDetailView.as_view(), name='public-news-detail'),
     
     # Admin Service Management
     path('admin/services/', views.ServiceListView.as_view(), name='admin-service-list'),
@@ -40,4 +39,7 @@ urlpatterns = [
     # Statistics and Dashboard
     path('admin/statistics/', views.news_statistics, name='news-statistics'),
     path('public/home-data/', views.public_home_data, name='public-home-data'),
+    
+    # Public news detail last, its slug would otherwise match the public routes above
+    path('public/<slug:slug>/', views.PublicNewsDetailView.as_view(), name='public-news-detail'),
 ] 
\ No newline at end of file
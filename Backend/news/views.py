@@ -2,7 +2,10 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Q
+
+from utils.cache import CachedResponseMixin, cache_response
+from utils.conditional import ConditionalGetMixin
+from utils.search import search_queryset
 
 from .models import News, NewsCategory, Service, CompanyInfo, FAQ
 from .serializers import (
@@ -35,8 +38,9 @@ class NewsDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = News.objects.all()
 
 
-class PublicNewsListView(generics.ListAPIView):
+class PublicNewsListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """Public list of published news"""
+    cache_groups = ('news',)
     serializer_class = PublicNewsSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -48,19 +52,15 @@ class PublicNewsListView(generics.ListAPIView):
         if category:
             queryset = queryset.filter(category__slug=category)
         
-        # Search functionality
+        # Full-text search, ranked by relevance
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(excerpt__icontains=search)
-            )
+            queryset = search_queryset(queryset, search)
         
         return queryset
 
 
-class PublicNewsDetailView(generics.RetrieveAPIView):
+class PublicNewsDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Public news detail view"""
     serializer_class = PublicNewsSerializer
     permission_classes = [permissions.AllowAny]
@@ -104,14 +104,15 @@ class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Service.objects.all()
 
 
-class PublicServiceListView(generics.ListAPIView):
+class PublicServiceListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """Public list of active services"""
+    cache_groups = ('services',)
     serializer_class = PublicServiceSerializer
     permission_classes = [permissions.AllowAny]
     queryset = Service.objects.filter(is_active=True)
 
 
-class PublicServiceDetailView(generics.RetrieveAPIView):
+class PublicServiceDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Public service detail view"""
     serializer_class = PublicServiceSerializer
     permission_classes = [permissions.AllowAny]
@@ -140,8 +141,9 @@ class CompanyInfoDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = CompanyInfo.objects.all()
 
 
-class PublicCompanyInfoListView(generics.ListAPIView):
+class PublicCompanyInfoListView(CachedResponseMixin, generics.ListAPIView):
     """Public list of active company information"""
+    cache_groups = ('company_info',)
     serializer_class = PublicCompanyInfoSerializer
     permission_classes = [permissions.AllowAny]
     queryset = CompanyInfo.objects.filter(is_active=True)
@@ -175,8 +177,9 @@ class FAQDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = FAQ.objects.all()
 
 
-class PublicFAQListView(generics.ListAPIView):
+class PublicFAQListView(CachedResponseMixin, generics.ListAPIView):
     """Public list of active FAQ"""
+    cache_groups = ('faq',)
     serializer_class = PublicFAQSerializer
     permission_classes = [permissions.AllowAny]
     queryset = FAQ.objects.filter(is_active=True)
@@ -218,6 +221,7 @@ def news_statistics(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_response('news', 'services', 'company_info')
 def public_home_data(request):
     """Get public home page data"""
     latest_news = News.objects.filter(status='published').order_by('-published_at')[:6]
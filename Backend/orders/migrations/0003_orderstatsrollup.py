@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from utils.rollups import RollupSpec
+
+
+def build_rollups(apps, schema_editor):
+    RollupSpec(
+        apps.get_model('orders', 'Order'),
+        apps.get_model('orders', 'OrderStatsRollup'),
+        'order_date',
+        ['status'], {'total_value': 'total_price'}
+    ).rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('count', models.IntegerField(default=0, verbose_name='Soni')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('status', models.CharField(choices=[('pending', 'Kutilmoqda'), ('processing', 'Jarayonda'), ('shipped', 'Yuborildi'), ('delivered', 'Yetkazildi'), ('cancelled', 'Bekor qilindi'), ('returned', 'Qaytarildi')], max_length=20, verbose_name='Holat')),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Umumiy qiymat')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Buyurtma statistikasi',
+                'verbose_name_plural': 'Buyurtma statistikasi',
+                'ordering': ['-date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'date', 'status'), name='orders_rollup_user_unique'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date', 'status'), name='orders_rollup_global_unique')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
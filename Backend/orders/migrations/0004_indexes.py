@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orderstatsrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-order_date'], name='order_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', '-order_date'], name='order_user_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-order_date'], name='order_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatusupdate',
+            index=models.Index(fields=['order', '-updated_at'], name='order_update_order_date_idx'),
+        ),
+    ]
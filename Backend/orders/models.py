@@ -3,6 +3,8 @@ from django.conf import settings
 from django.utils import timezone
 import uuid
 
+from utils.models import StatsRollup
+
 
 class Order(models.Model):
     """Order model for client orders"""
@@ -61,6 +63,11 @@ class Order(models.Model):
         verbose_name = "Buyurtma"
         verbose_name_plural = "Buyurtmalar"
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['user', '-order_date'], name='order_user_date_idx'),
+            models.Index(fields=['user', 'status', '-order_date'], name='order_user_status_date_idx'),
+            models.Index(fields=['status', '-order_date'], name='order_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.order_number} - {self.product_name}"
@@ -91,6 +98,9 @@ class OrderStatusUpdate(models.Model):
         verbose_name = "Buyurtma holati yangilanishi"
         verbose_name_plural = "Buyurtma holati yangilanishlari"
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['order', '-updated_at'], name='order_update_order_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.order.order_number} - {self.status}"
@@ -120,3 +130,29 @@ class OrderDocument(models.Model):
     
     def __str__(self):
         return f"{self.order.order_number} - {self.title}"
+
+
+class OrderStatsRollup(StatsRollup):
+    """Daily order counts and value per user and status"""
+    
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES, verbose_name="Holat")
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Umumiy qiymat")
+    
+    class Meta(StatsRollup.Meta):
+        verbose_name = "Buyurtma statistikasi"
+        verbose_name_plural = "Buyurtma statistikasi"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'status'],
+                condition=models.Q(user__isnull=False),
+                name='orders_rollup_user_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'status'],
+                condition=models.Q(user__isnull=True),
+                name='orders_rollup_global_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.status}: {self.count}"
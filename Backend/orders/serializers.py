@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Order, OrderStatusUpdate, OrderDocument
 
@@ -77,7 +78,8 @@ class OrderDocumentSerializer(serializers.ModelSerializer):
 class OrderDetailSerializer(serializers.ModelSerializer):
     """Detailed order serializer with related data"""
     
-    status_updates = OrderStatusUpdateSerializer(many=True, read_only=True)
+    status_updates = serializers.SerializerMethodField()
+    status_updates_count = serializers.SerializerMethodField()
     documents = OrderDocumentSerializer(many=True, read_only=True)
     
     class Meta:
@@ -87,9 +89,23 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'quantity', 'unit_price', 'total_price', 'status', 'delivery_status',
             'tracking_number', 'tracking_url', 'delivery_address', 'delivery_phone',
             'delivery_notes', 'order_date', 'estimated_delivery', 'actual_delivery',
-            'updated_at', 'admin_notes', 'status_updates', 'documents'
+            'updated_at', 'admin_notes', 'status_updates', 'status_updates_count', 'documents'
         ]
         read_only_fields = ['id', 'order_number', 'total_price', 'order_date', 'updated_at']
+    
+    def get_status_updates(self, obj):
+        # Prefetched by the detail view, otherwise loaded with the same limit
+        updates = getattr(obj, 'latest_status_updates', None)
+        if updates is None:
+            updates = obj.status_updates.all()[:settings.DETAIL_HISTORY_LIMIT]
+        return OrderStatusUpdateSerializer(updates, many=True, context=self.context).data
+    
+    def get_status_updates_count(self, obj):
+        # Annotated by the detail view, status_updates only holds the newest
+        # DETAIL_HISTORY_LIMIT updates
+        if hasattr(obj, 'status_updates_count'):
+            return obj.status_updates_count
+        return obj.status_updates.count()
 
 
 class OrderListSerializer(serializers.ModelSerializer):
@@ -126,4 +142,26 @@ class OrderStatusUpdateCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['updated_by'] = self.context['request'].user
-        return super().create(validated_data) 
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """Serializer for changing the status of many orders at once"""
+    
+    MAX_ORDERS = 1000
+    
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_ORDERS)
+    order_numbers = serializers.ListField(child=serializers.CharField(), required=False, max_length=MAX_ORDERS)
+    status = serializers.ChoiceField(choices=Order.ORDER_STATUS_CHOICES, required=False)
+    delivery_status = serializers.ChoiceField(choices=Order.DELIVERY_STATUS_CHOICES, required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    notify = serializers.BooleanField(default=True)
+    
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('order_numbers'):
+            raise serializers.ValidationError("ids yoki order_numbers berilishi kerak")
+        
+        if 'status' not in attrs and 'delivery_status' not in attrs:
+            raise serializers.ValidationError("status yoki delivery_status berilishi kerak")
+        
+        return attrs
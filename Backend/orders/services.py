@@ -0,0 +1,279 @@
+import csv
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.utils import timezone
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils.dateparse import parse_date
+
+from rest_framework import serializers
+from utils.rollups import aggregate_rollup
+from utils.services import NotificationService
+
+from .models import Order, OrderStatsRollup, OrderStatusUpdate
+from .serializers import OrderCreateSerializer
+from .signals import order_rollup
+
+
+class OrderStatisticsService:
+    """Order statistics computed with database aggregates"""
+    
+    # Statuses counted towards the total order value
+    ACTIVE_STATUSES = ['pending', 'processing', 'shipped', 'delivered']
+    
+    PERIOD_FUNCTIONS = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+    
+    @staticmethod
+    def _value_sum(filter=None):
+        return Coalesce(
+            Sum('total_price', filter=filter),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+    
+    @staticmethod
+    def parse_date_param(value):
+        """Parse an optional YYYY-MM-DD query parameter"""
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid date: {value}")
+        return parsed
+    
+    @staticmethod
+    def filter_date_range(queryset, date_from=None, date_to=None):
+        """Restrict queryset to orders placed within [date_from, date_to]"""
+        if date_from:
+            queryset = queryset.filter(order_date__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(order_date__date__lte=date_to)
+        return queryset
+    
+    @staticmethod
+    def summary(queryset):
+        """Status counts and total value in a single aggregate query"""
+        aggregates = {
+            'total_orders': Count('id'),
+            'total_value': OrderStatisticsService._value_sum(
+                Q(status__in=OrderStatisticsService.ACTIVE_STATUSES)
+            ),
+        }
+        for status_value, _ in Order.ORDER_STATUS_CHOICES:
+            aggregates[f'{status_value}_orders'] = Count('id', filter=Q(status=status_value))
+        
+        return queryset.order_by().aggregate(**aggregates)
+    
+    @staticmethod
+    def rollup_summary(user=None, date_from=None, date_to=None):
+        """Status counts and total value read from the daily rollup table
+        
+        Pass user=None for the totals across all users.
+        """
+        aggregates = {
+            'total_orders': Coalesce(Sum('count'), 0),
+            'total_value': Coalesce(
+                Sum('total_value', filter=Q(status__in=OrderStatisticsService.ACTIVE_STATUSES)),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+        }
+        for status_value, _ in Order.ORDER_STATUS_CHOICES:
+            aggregates[f'{status_value}_orders'] = Coalesce(Sum('count', filter=Q(status=status_value)), 0)
+        
+        return aggregate_rollup(OrderStatsRollup, user, date_from, date_to, **aggregates)
+    
+    @staticmethod
+    def delivery_status_breakdown(queryset):
+        """Order count and value grouped by delivery status"""
+        rows = (
+            queryset.order_by()
+            .values('delivery_status')
+            .annotate(
+                count=Count('id'),
+                total_value=OrderStatisticsService._value_sum(),
+            )
+            .order_by('delivery_status')
+        )
+        return list(rows)
+    
+    @staticmethod
+    def period_breakdown(queryset, period='day'):
+        """Order count, value and status counts grouped by day, week or month"""
+        if period not in OrderStatisticsService.PERIOD_FUNCTIONS:
+            raise ValueError(f"Unsupported period: {period}")
+        
+        trunc = OrderStatisticsService.PERIOD_FUNCTIONS[period]
+        annotations = {
+            'count': Count('id'),
+            'total_value': OrderStatisticsService._value_sum(
+                Q(status__in=OrderStatisticsService.ACTIVE_STATUSES)
+            ),
+        }
+        for status_value, _ in Order.ORDER_STATUS_CHOICES:
+            annotations[f'{status_value}_orders'] = Count('id', filter=Q(status=status_value))
+        
+        rows = (
+            queryset.order_by()
+            .annotate(period=trunc('order_date'))
+            .values('period')
+            .annotate(**annotations)
+            .order_by('period')
+        )
+        return list(rows)
+
+
+class OrderImportService:
+    """Create many orders from CSV or JSON rows in batches
+    
+    Every batch is validated with one reused OrderCreateSerializer, gets its
+    order numbers checked for collisions with a single query and is written
+    with one bulk_create in its own transaction, together with the rollup
+    update that the skipped post_save signals would have made. Invalid rows
+    are reported and skipped, the valid rows of the batch are still created.
+    """
+    
+    @staticmethod
+    def parse(content, format='csv'):
+        """Rows of an uploaded CSV (with a header line) or JSON list"""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8-sig')
+        if format == 'json':
+            rows = json.loads(content)
+            if isinstance(rows, dict):
+                rows = rows.get('orders')
+            if not isinstance(rows, list):
+                raise ValueError("JSON ro'yxat yoki {\"orders\": [...]} bo'lishi kerak")
+            return rows
+        return csv.DictReader(io.StringIO(content))
+    
+    @staticmethod
+    def validate(serializer, row):
+        try:
+            return serializer.run_validation(row), None
+        except serializers.ValidationError as e:
+            return None, e.detail
+    
+    @staticmethod
+    def unique_order_numbers(count):
+        """count order numbers not used yet, checked with one query"""
+        generate = Order().generate_order_number
+        numbers = set()
+        while len(numbers) < count:
+            candidates = {generate() for _ in range(count - len(numbers))}
+            taken = set(
+                Order.objects.filter(order_number__in=candidates).order_by().values_list('order_number', flat=True)
+            )
+            numbers |= candidates - taken
+        return list(numbers)
+    
+    @staticmethod
+    def import_rows(rows, user, batch_size=1000):
+        """Validate and insert rows for user
+        
+        Returns the numbers of created and failed rows, the errors per row
+        (1-based) and the throughput in rows per second.
+        """
+        started = time.perf_counter()
+        serializer = OrderCreateSerializer()
+        report = {'created': 0, 'failed': 0, 'errors': []}
+        
+        batch = []
+        for number, row in enumerate(rows, 1):
+            data, errors = OrderImportService.validate(serializer, row)
+            if errors:
+                report['failed'] += 1
+                report['errors'].append({'row': number, 'errors': errors})
+                continue
+            batch.append(data)
+            if len(batch) >= batch_size:
+                report['created'] += OrderImportService.create_batch(batch, user)
+                batch = []
+        if batch:
+            report['created'] += OrderImportService.create_batch(batch, user)
+        
+        elapsed = time.perf_counter() - started
+        report['elapsed_seconds'] = round(elapsed, 3)
+        report['rows_per_second'] = round((report['created'] + report['failed']) / elapsed) if elapsed else 0
+        return report
+    
+    @staticmethod
+    def create_batch(batch, user):
+        numbers = OrderImportService.unique_order_numbers(len(batch))
+        orders = [
+            Order(
+                user=user,
+                order_number=order_number,
+                total_price=data['quantity'] * data['unit_price'],
+                **data
+            )
+            for order_number, data in zip(numbers, batch)
+        ]
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(orders)
+            # Every row was inserted, with or without pks set by the backend
+            order_rollup.apply_bulk([], [order_rollup.snapshot(order, stored=True) for order in orders])
+        return len(orders)
+
+
+class OrderStatusService:
+    """Status changes applied to many orders with set-based queries"""
+    
+    @staticmethod
+    def bulk_update_status(queryset, status=None, delivery_status=None, updated_by=None, notes='', notify=True):
+        """Move every order of the queryset to status and/or delivery_status
+        
+        The orders are read once, changed with a single UPDATE, get their
+        OrderStatusUpdate history rows with one bulk_create and have the
+        rollups adjusted for the status change. Notifications are queued in
+        batches after commit. Returns the ids of the updated orders.
+        """
+        changes = {}
+        if status:
+            changes['status'] = status
+        if delivery_status:
+            changes['delivery_status'] = delivery_status
+        
+        with transaction.atomic():
+            # Only the fields the rollup and the history rows need
+            orders = list(
+                queryset.select_for_update().order_by()
+                .only('id', 'user_id', 'order_date', 'status', 'delivery_status', 'total_price')
+            )
+            if not orders:
+                return []
+            order_ids = [order.pk for order in orders]
+            
+            Order.objects.filter(pk__in=order_ids).update(**changes, updated_at=timezone.now())
+            
+            OrderStatusUpdate.objects.bulk_create([
+                OrderStatusUpdate(
+                    order_id=order.pk,
+                    status=status or order.status,
+                    delivery_status=delivery_status or order.delivery_status,
+                    updated_by=updated_by,
+                    notes=notes
+                )
+                for order in orders
+            ])
+            
+            if status:
+                old_rows = [order_rollup.snapshot(order) for order in orders]
+                for order in orders:
+                    order.status = status
+                order_rollup.apply_bulk(old_rows, [order_rollup.snapshot(order) for order in orders])
+            
+            if notify:
+                NotificationService.send_bulk_order_status_notifications(
+                    Order.objects.filter(pk__in=order_ids), user=updated_by
+                )
+        
+        return order_ids
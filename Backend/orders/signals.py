@@ -0,0 +1,12 @@
+from utils.rollups import register_rollup
+
+from .models import Order, OrderStatsRollup
+
+
+order_rollup = register_rollup(
+    Order,
+    OrderStatsRollup,
+    date_field='order_date',
+    dimensions=['status'],
+    value_fields={'total_value': 'total_price'},
+)
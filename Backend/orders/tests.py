@@ -1,3 +1,608 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from users.models import User
+from utils.models import EmailLog, EmailTemplate, PDFLog, PDFTemplate
+from utils.testing import QueryCountMixin
+from .models import Order, OrderDocument, OrderStatsRollup, OrderStatusUpdate
+from .services import OrderStatisticsService
+
+
+class OrderStatisticsTests(TestCase):
+    """Tests for the order statistics endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        
+        for status_value, quantity in [('pending', 1), ('processing', 2), ('delivered', 3), ('cancelled', 4)]:
+            Order.objects.create(
+                user=self.user,
+                product_name='Mahsulot',
+                quantity=quantity,
+                unit_price=Decimal('10.00'),
+                status=status_value,
+                delivery_address='Toshkent',
+                delivery_phone='+998901234567',
+            )
+    
+    def test_summary_uses_single_query(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('orders:order-statistics'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_orders'], 4)
+        self.assertEqual(response.data['pending_orders'], 1)
+        self.assertEqual(response.data['cancelled_orders'], 1)
+        self.assertEqual(response.data['total_value'], Decimal('60.00'))
+    
+    def test_breakdowns(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('orders:order-statistics'), {'group_by': 'delivery_status', 'period': 'month'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['delivery_status_breakdown'][0]['count'], 4)
+        self.assertEqual(len(response.data['timeline']), 1)
+        self.assertEqual(response.data['timeline'][0]['count'], 4)
+    
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('orders:order-statistics'), {'date_from': '2025-13-45'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('orders:order-statistics'), {'period': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderStatsRollupTests(TestCase):
+    """Tests for incremental maintenance of the order rollup table"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+    
+    def create_order(self, user, quantity=1, **kwargs):
+        return Order.objects.create(
+            user=user,
+            product_name='Mahsulot',
+            quantity=quantity,
+            unit_price=Decimal('5.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+            **kwargs
+        )
+    
+    def assertRollupMatchesRows(self):
+        for user in (self.user, self.other):
+            self.assertEqual(
+                OrderStatisticsService.rollup_summary(user),
+                OrderStatisticsService.summary(Order.objects.filter(user=user))
+            )
+        self.assertEqual(
+            OrderStatisticsService.rollup_summary(None),
+            OrderStatisticsService.summary(Order.objects.all())
+        )
+    
+    def test_create_update_delete(self):
+        first = self.create_order(self.user, quantity=2)
+        second = self.create_order(self.other, quantity=3, status='processing')
+        self.assertRollupMatchesRows()
+        
+        first.status = 'cancelled'
+        first.save()
+        loaded = Order.objects.get(pk=second.pk)
+        loaded.status = 'delivered'
+        loaded.total_price = Decimal('20.00')
+        loaded.save()
+        self.assertRollupMatchesRows()
+        
+        # Instances loaded without the tracked fields still move buckets
+        deferred = Order.objects.only('id').get(pk=first.pk)
+        deferred.status = 'returned'
+        deferred.save()
+        self.assertRollupMatchesRows()
+        
+        Order.objects.get(pk=second.pk).delete()
+        self.assertRollupMatchesRows()
+    
+    def test_stored_row_is_locked_during_the_save(self):
+        order = self.create_order(self.user)
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=lambda rows: rows) as lock:
+            order.status = 'processing'
+            order.save()
+        lock.assert_called_once()
+        self.assertRollupMatchesRows()
+    
+    def test_rebuild_command(self):
+        self.create_order(self.user, status='shipped')
+        self.create_order(self.other)
+        expected = OrderStatisticsService.rollup_summary(None)
+        
+        OrderStatsRollup.objects.all().delete()
+        call_command('rebuild_stats_rollups', 'orders.OrderStatsRollup', stdout=open('/dev/null', 'w'))
+        
+        self.assertEqual(OrderStatisticsService.rollup_summary(None), expected)
+        self.assertRollupMatchesRows()
+
+
+class OrderListPaginationTests(TestCase):
+    """Tests for page-number, count-less and cursor pagination of the order list"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.user)
+        
+        orders = [
+            Order.objects.create(
+                user=self.user,
+                product_name=f'Mahsulot {index}',
+                unit_price=Decimal('10.00'),
+                delivery_address='Toshkent',
+                delivery_phone='+998901234567',
+            )
+            for index in range(25)
+        ]
+        # Equal timestamps must still page without duplicates or gaps
+        Order.objects.filter(pk__in=[order.pk for order in orders[:10]]).update(order_date=orders[0].order_date)
+        self.expected = list(Order.objects.order_by('-order_date', '-id').values_list('id', flat=True))
+    
+    def test_page_numbers_with_count(self):
+        # The conditional GET aggregate provides the count
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('orders:order-list'))
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+    
+    def test_page_numbers_without_count(self):
+        # No aggregate for the ETag either, only the page query
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('orders:order-list'), {'count': 'false'})
+        self.assertIsNone(response.data['count'])
+        self.assertIsNotNone(response.data['next'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+    
+    def test_cursor_pagination(self):
+        seen = []
+        url = reverse('orders:order-list') + '?pagination=cursor&page_size=7'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], self.expected[14:21])
+
+
+class OrderExportTests(TestCase):
+    """Tests for streaming CSV and XLSX order exports"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+        self.client.force_authenticate(self.user)
+        for owner, status_value, quantity in [(self.user, 'pending', 1), (self.user, 'delivered', 2), (other, 'pending', 3)]:
+            Order.objects.create(
+                user=owner,
+                product_name='Mahsulot <&>',
+                quantity=quantity,
+                unit_price=Decimal('10.50'),
+                status=status_value,
+                delivery_address='Toshkent',
+                delivery_phone='+998901234567',
+            )
+    
+    def test_csv_export_uses_list_filters(self):
+        response = self.client.get(reverse('orders:order-list'), {'export': 'csv', 'status': 'pending'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.csv"')
+        
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:3], ['Buyurtma raqami', 'Email', 'Mahsulot nomi'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1:5], ['client@example.com', 'Mahsulot <&>', '1', '10.50'])
+    
+    def test_xlsx_export(self):
+        response = self.client.get(reverse('orders:order-list'), {'export': 'xlsx'})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        
+        namespace = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.findall('s:sheetData/s:row', namespace)
+        self.assertEqual(len(rows), 3)
+        cells = rows[1].findall('s:c', namespace)
+        self.assertEqual(cells[2].find('s:is/s:t', namespace).text, 'Mahsulot <&>')
+        # Numbers are numeric cells
+        self.assertEqual(cells[4].get('t'), None)
+        self.assertEqual(cells[4].find('s:v', namespace).text, '10.50')
+    
+    def test_invalid_filter(self):
+        response = self.client.get(reverse('orders:order-list'), {'export': 'csv', 'date_from': '01.01.2025'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderImportTests(TestCase):
+    """Tests for the bulk order import"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.user)
+    
+    def rows(self, count):
+        return [
+            {
+                'product_name': f'Mahsulot {number}',
+                'quantity': number % 5 + 1,
+                'unit_price': '12.50',
+                'delivery_address': 'Toshkent',
+                'delivery_phone': '+998901234567',
+            }
+            for number in range(count)
+        ]
+    
+    def test_json_import_reports_invalid_rows(self):
+        rows = self.rows(5)
+        rows[1]['quantity'] = 0
+        del rows[3]['product_name']
+        
+        response = self.client.post(reverse('orders:import-orders'), rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4])
+        self.assertIn('product_name', response.data['errors'][1]['errors'])
+        
+        orders = Order.objects.filter(user=self.user).order_by('product_name')
+        self.assertEqual([order.total_price for order in orders], [Decimal('12.50'), Decimal('37.50'), Decimal('62.50')])
+        self.assertEqual(len({order.order_number for order in orders}), 3)
+        # Rollups are kept in sync although bulk_create sends no signals
+        for user in (self.user, None):
+            self.assertEqual(
+                OrderStatisticsService.rollup_summary(user),
+                OrderStatisticsService.summary(Order.objects.all())
+            )
+    
+    def test_rollups_without_returned_pks(self):
+        # Backends without INSERT ... RETURNING leave the pks unset
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False):
+            response = self.client.post(reverse('orders:import-orders'), self.rows(4), format='json')
+        self.assertEqual(response.data['created'], 4)
+        self.assertEqual(
+            OrderStatisticsService.rollup_summary(self.user),
+            OrderStatisticsService.summary(Order.objects.all())
+        )
+    
+    def test_query_count_does_not_grow_with_rows(self):
+        # Creates the rollup buckets
+        self.client.post(reverse('orders:import-orders'), self.rows(1), format='json')
+        
+        # Order number check, savepoint, insert, user and global rollup updates, release
+        # (SQLite splits inserts of more than 52 orders, its limit is 999 parameters)
+        for count in (10, 50):
+            with self.assertNumQueries(6):
+                self.client.post(reverse('orders:import-orders'), self.rows(count), format='json')
+        self.assertEqual(Order.objects.count(), 61)
+    
+    def test_staff_csv_upload_for_client(self):
+        staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.client.force_authenticate(staff)
+        content = 'product_name,quantity,unit_price,delivery_address,delivery_phone\nMahsulot,2,5.00,Toshkent,+998901234567\n'
+        upload = SimpleUploadedFile('orders.csv', content.encode(), content_type='text/csv')
+        
+        response = self.client.post(reverse('orders:import-orders'), {'file': upload, 'user': self.user.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().user, self.user)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class OrderBulkStatusTests(TestCase):
+    """Tests for the bulk order status endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.staff)
+        EmailTemplate.objects.create(name='Buyurtma', template_type='order_confirmation', subject='{{order_number}}', content='{{status}}')
+    
+    def create_orders(self, count):
+        return [
+            Order.objects.create(
+                user=self.user,
+                product_name='Mahsulot',
+                unit_price=Decimal('10.00'),
+                delivery_address='Toshkent',
+                delivery_phone='+998901234567',
+            )
+            for _ in range(count)
+        ]
+    
+    def test_updates_orders_history_rollups_and_notifies(self):
+        first, second, untouched = self.create_orders(3)
+        data = {
+            'ids': [first.pk, 999999],
+            'order_numbers': [second.order_number, 'ORD-MISSING'],
+            'status': 'shipped',
+            'delivery_status': 'in_transit',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('orders:bulk-status'), data, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['not_found'], {'ids': [999999], 'order_numbers': ['ORD-MISSING']})
+        self.assertEqual(
+            set(Order.objects.values_list('pk', 'status', 'delivery_status')),
+            {(first.pk, 'shipped', 'in_transit'), (second.pk, 'shipped', 'in_transit'), (untouched.pk, 'pending', 'pending')}
+        )
+        
+        updates = OrderStatusUpdate.objects.filter(updated_by=self.staff)
+        self.assertEqual(sorted(updates.values_list('order_id', flat=True)), [first.pk, second.pk])
+        self.assertEqual(OrderStatisticsService.rollup_summary(None), OrderStatisticsService.summary(Order.objects.all()))
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 2)
+    
+    def test_query_count_does_not_grow_with_orders(self):
+        orders = self.create_orders(30)
+        # Creates the rollup buckets of the target status
+        self.client.post(reverse('orders:bulk-status'), {'ids': [orders[0].pk], 'status': 'processing', 'notify': False}, format='json')
+        
+        for batch in (orders[1:3], orders[3:]):
+            data = {'ids': [order.pk for order in batch], 'status': 'processing', 'notify': False}
+            with self.assertNumQueries(9):
+                self.client.post(reverse('orders:bulk-status'), data, format='json')
+    
+    def test_requires_staff_and_target_status(self):
+        response = self.client.post(reverse('orders:bulk-status'), {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('orders:bulk-status'), {'ids': [1], 'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderConditionalGetTests(TestCase):
+    """Tests for ETag handling of order endpoints"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.order = Order.objects.create(
+            user=self.user,
+            product_name='Mahsulot',
+            unit_price=Decimal('10.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+    
+    def test_list_not_modified_until_rows_change(self):
+        url = reverse('orders:order-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        # Deletions would not move MAX(updated_at), lists rely on the ETag
+        self.assertNotIn('Last-Modified', response)
+        
+        # Only the aggregate query runs, the page is not serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        
+        # Other query strings are different representations
+        self.assertEqual(self.client.get(url, {'page': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        
+        Order.objects.create(
+            user=self.user,
+            product_name='Boshqa',
+            unit_price=Decimal('5.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_list_ignores_if_modified_since(self):
+        url = reverse('orders:order-list')
+        Order.objects.create(
+            user=self.user,
+            product_name='Boshqa',
+            unit_price=Decimal('5.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+        response = self.client.get(url)
+        since = http_date(time.time() + 60)
+        
+        self.order.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_cursor_and_uncounted_pages_skip_the_aggregate(self):
+        url = reverse('orders:order-list')
+        for params in [{'pagination': 'cursor'}, {'count': 'false'}]:
+            # The page query only, the ETag is derived from the page
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            etag = response['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            
+            self.order.product_name = f"Mahsulot {params}"
+            self.order.save()
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+    
+    def test_detail_tracks_nested_status_updates(self):
+        url = reverse('orders:order-detail', args=[self.order.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Whole seconds would miss a second change in the same second
+        self.assertNotIn('Last-Modified', response)
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        
+        OrderStatusUpdate.objects.create(order=self.order, status='processing', delivery_status='pending')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class OrderDetailQueryTests(QueryCountMixin, TestCase):
+    """Query count tests for the order detail with nested history"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.order = Order.objects.create(
+            user=self.user,
+            product_name='Mahsulot',
+            unit_price=Decimal('10.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+        self.url = reverse('orders:order-detail', args=[self.order.pk])
+    
+    def add_history(self, count=15):
+        OrderStatusUpdate.objects.bulk_create([
+            OrderStatusUpdate(order=self.order, status='processing', delivery_status='pending', notes=f'#{number}')
+            for number in range(count)
+        ])
+        OrderDocument.objects.create(order=self.order, document_type='other', title='Hujjat', file='order_documents/a.pdf')
+    
+    @override_settings(DETAIL_HISTORY_LIMIT=20)
+    def test_detail_query_count_is_constant(self):
+        # Order with its validators, newest status updates, documents
+        responses = self.assertQueriesConstant(3, self.url, self.add_history)
+        
+        data = responses[-1].data
+        self.assertEqual(data['status_updates_count'], 30)
+        self.assertEqual(len(data['status_updates']), 20)
+        self.assertEqual(len(data['documents']), 2)
+        newest = OrderStatusUpdate.objects.filter(order=self.order).order_by('-updated_at', '-id').first()
+        self.assertEqual(data['status_updates'][0]['id'], newest.id)
+    
+    def test_not_modified_skips_prefetch(self):
+        self.add_history()
+        etag = self.client.get(self.url)['ETag']
+        self.assertEndpointQueries(1, self.url, status_code=304, HTTP_IF_NONE_MATCH=etag)
+    
+    def test_full_history_is_paginated(self):
+        self.add_history(25)
+        response = self.client.get(reverse('orders:status-updates', args=[self.order.pk]))
+        self.assertEqual(response.data['count'], 25)
+
+
+class InvoicePDFTests(TestCase):
+    """Tests for the cached invoice PDF download"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PDF_RENDERER='utils.pdf.render_text', PDF_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.order = Order.objects.create(
+            user=self.user,
+            product_name='Mahsulot',
+            unit_price=Decimal('10.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+        PDFTemplate.objects.create(
+            name='Hisob-faktura',
+            template_type='invoice',
+            html_template='<h1>Hisob-faktura {{order_number}}</h1><p>{{product_name}}: {{total_price}}</p>'
+        )
+    
+    def download(self):
+        response = self.client.get(reverse('orders:invoice-pdf', args=[self.order.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return b''.join(response.streaming_content)
+    
+    def test_invoice_is_rendered_once_while_unchanged(self):
+        content = self.download()
+        self.assertTrue(content.startswith(b'%PDF'))
+        
+        with mock.patch('utils.pdf.render_html') as render_html:
+            # Served from storage, the renderer is not called
+            self.assertEqual(self.download(), content)
+        render_html.assert_not_called()
+        
+        first, second = PDFLog.objects.order_by('id')
+        self.assertEqual(first.file_path, second.file_path)
+        self.assertEqual(second.file_size, len(content))
+        
+        self.order.product_name = 'Boshqa mahsulot'
+        self.order.save()
+        self.download()
+        self.assertNotEqual(PDFLog.objects.latest('id').file_path, first.file_path)
+    
+    def test_other_users_invoice_is_not_found(self):
+        other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse('orders:invoice-pdf', args=[self.order.pk]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_staff_export_streams_zip_of_filtered_invoices(self):
+        cancelled = Order.objects.create(
+            user=self.user,
+            product_name='Bekor qilingan',
+            unit_price=Decimal('5.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+            status='cancelled',
+        )
+        url = reverse('orders:export-invoices')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+        
+        staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get(url, {'status': 'pending'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'invoice_{self.order.order_number}.pdf'])
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+        
+        PDFTemplate.objects.filter(template_type='invoice').delete()
+        response = self.client.get(url, {'ids': f'{self.order.pk},{cancelled.pk}'})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ['errors.txt'])
+        self.assertIn(cancelled.order_number, archive.read('errors.txt').decode())
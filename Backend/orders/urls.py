@@ -9,6 +9,7 @@ urlpatterns = [
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('<int:order_id>/cancel/', views.cancel_order, name='cancel-order'),
     path('<int:order_id>/track/', views.track_order, name='track-order'),
+    path('<int:order_id>/invoice/', views.invoice_pdf, name='invoice-pdf'),
     
     # Order status updates
     path('<int:order_id>/status-updates/', views.OrderStatusUpdateView.as_view(), name='status-updates'),
@@ -17,6 +18,13 @@ urlpatterns = [
     path('<int:order_id>/documents/', views.OrderDocumentView.as_view(), name='documents'),
     path('documents/<int:pk>/', views.OrderDocumentDetailView.as_view(), name='document-detail'),
     
+    # Bulk operations
+    path('import/', views.import_orders, name='import-orders'),
+    path('bulk-status/', views.bulk_update_status, name='bulk-status'),
+    
+    # Exports
+    path('export/invoices/', views.export_invoice_pdfs, name='export-invoices'),
+    
     # Statistics
     path('statistics/', views.order_statistics, name='order-statistics'),
 ] 
\ No newline at end of file
@@ -1,25 +1,50 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from datetime import timedelta
 
+from utils.conditional import ConditionalGetMixin, latest_prefetch
+from utils.exports import ExportMixin
+from utils.filters import filter_by_params
+from utils.pdf import pdf_file_response
+from utils.services import PDFService
+from utils.streaming import zip_response
+
 from .models import Order, OrderStatusUpdate, OrderDocument
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer,
     OrderDetailSerializer, OrderListSerializer, OrderStatusUpdateSerializer,
-    OrderDocumentSerializer, OrderStatusUpdateCreateSerializer
+    OrderDocumentSerializer, OrderStatusUpdateCreateSerializer, OrderBulkStatusSerializer
 )
+from .services import OrderImportService, OrderStatisticsService, OrderStatusService
 
 
-class OrderListView(generics.ListCreateAPIView):
-    """List and create orders"""
+class OrderListView(ConditionalGetMixin, ExportMixin, generics.ListCreateAPIView):
+    """List and create orders
+    
+    Filters: ids, status, delivery_status, date_from, date_to. Pass
+    export=csv or export=xlsx to download every matching order.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    export_fields = (
+        'order_number', 'user__email', 'product_name', 'quantity', 'unit_price', 'total_price',
+        'status', 'delivery_status', 'delivery_address', 'tracking_number', 'order_date',
+    )
+    export_filename = 'orders'
     
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            queryset = Order.objects.all()
+        else:
+            queryset = Order.objects.filter(user=self.request.user)
+        
+        if self.request.method == 'GET':
+            queryset = filter_by_params(queryset, self.request.query_params, 'order_date', ('status', 'delivery_status'))
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -30,10 +55,18 @@ class OrderListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OrderDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update and delete order"""
     serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = {'status_updates': 'updated_at', 'documents': 'created_at'}
+    
+    @property
+    def detail_prefetch(self):
+        return (
+            latest_prefetch('status_updates', OrderStatusUpdate.objects.order_by('-updated_at', '-id')),
+            'documents',
+        )
     
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -47,7 +80,7 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
         return OrderDetailSerializer
     
     def perform_update(self, serializer):
-        order = self.get_object()
+        order = serializer.instance
         
         # Create status update if status changed
         if 'status' in serializer.validated_data or 'delivery_status' in serializer.validated_data:
@@ -148,6 +181,80 @@ def cancel_order(request, order_id):
     return Response({'message': 'Buyurtma bekor qilindi'}, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_update_status(request):
+    """Change the status and/or delivery status of many orders
+    
+    Orders are given by ids and/or order_numbers. One UPDATE changes all of
+    them, their history rows are created in bulk and the status emails are
+    queued in batches (notify=false skips them).
+    """
+    serializer = OrderBulkStatusSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    
+    ids = set(data.get('ids', []))
+    numbers = set(data.get('order_numbers', []))
+    orders = Order.objects.filter(Q(pk__in=ids) | Q(order_number__in=numbers))
+    
+    updated_ids = OrderStatusService.bulk_update_status(
+        orders,
+        status=data.get('status'),
+        delivery_status=data.get('delivery_status'),
+        updated_by=request.user,
+        notes=data.get('notes') or f"Ommaviy holat yangilanishi: {request.user.get_full_name() or request.user.username}",
+        notify=data['notify']
+    )
+    
+    found_numbers = set(
+        Order.objects.filter(pk__in=updated_ids, order_number__in=numbers).values_list('order_number', flat=True)
+    ) if numbers else set()
+    return Response({
+        'updated': len(updated_ids),
+        'not_found': {
+            'ids': sorted(ids - set(updated_ids)),
+            'order_numbers': sorted(numbers - found_numbers),
+        },
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_orders(request):
+    """Create many orders at once
+    
+    Accepts an uploaded CSV or JSON file (file) or a JSON list of orders in
+    the body. Staff can import for a client by passing user (id). Returns
+    the created/failed counts with the errors of each invalid row.
+    """
+    user = request.user
+    user_id = request.query_params.get('user') or (request.data.get('user') if hasattr(request.data, 'get') else None)
+    if user_id and request.user.is_staff:
+        try:
+            user = get_user_model().objects.get(pk=user_id)
+        except (get_user_model().DoesNotExist, ValueError):
+            return Response({'error': 'Foydalanuvchi topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+    
+    upload = request.FILES.get('file')
+    try:
+        if upload is not None:
+            import_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            rows = OrderImportService.parse(upload.read(), import_format)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('orders')
+            if not isinstance(rows, list):
+                return Response({'error': 'Buyurtmalar ro\'yxati yoki fayl yuborilishi kerak'}, status=status.HTTP_400_BAD_REQUEST)
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({'error': f'Faylni o\'qib bo\'lmadi: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    report = OrderImportService.import_rows(rows, user, batch_size=settings.ORDER_IMPORT_BATCH_SIZE)
+    response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+    return Response(report, status=response_status)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def order_statistics(request):
@@ -159,25 +266,33 @@ def order_statistics(request):
     else:
         orders = Order.objects.filter(user=user)
     
-    total_orders = orders.count()
-    pending_orders = orders.filter(status='pending').count()
-    processing_orders = orders.filter(status='processing').count()
-    shipped_orders = orders.filter(status='shipped').count()
-    delivered_orders = orders.filter(status='delivered').count()
-    cancelled_orders = orders.filter(status='cancelled').count()
+    # Optional date range
+    try:
+        date_from = OrderStatisticsService.parse_date_param(request.query_params.get('date_from'))
+        date_to = OrderStatisticsService.parse_date_param(request.query_params.get('date_to'))
+    except ValueError:
+        return Response({'error': 'Sana formati noto\'g\'ri (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    orders = OrderStatisticsService.filter_date_range(orders, date_from, date_to)
     
-    # Calculate total value
-    total_value = sum(order.total_price for order in orders.filter(status__in=['pending', 'processing', 'shipped', 'delivered']))
+    period = request.query_params.get('period')
+    if period and period not in OrderStatisticsService.PERIOD_FUNCTIONS:
+        return Response({'error': 'Davr day, week yoki month bo\'lishi kerak'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'processing_orders': processing_orders,
-        'shipped_orders': shipped_orders,
-        'delivered_orders': delivered_orders,
-        'cancelled_orders': cancelled_orders,
-        'total_value': total_value,
-    }, status=status.HTTP_200_OK)
+    # Status counts and total value from the rollup table
+    data = OrderStatisticsService.rollup_summary(
+        None if user.is_staff else user,
+        date_from,
+        date_to
+    )
+    
+    if request.query_params.get('group_by') == 'delivery_status':
+        data['delivery_status_breakdown'] = OrderStatisticsService.delivery_status_breakdown(orders)
+    
+    if period:
+        data['period'] = period
+        data['timeline'] = OrderStatisticsService.period_breakdown(orders, period)
+    
+    return Response(data, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -207,3 +322,46 @@ def track_order(request, order_id):
     }
     
     return Response(tracking_info, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def invoice_pdf(request, order_id):
+    """Download the invoice PDF of an order"""
+    try:
+        if request.user.is_staff:
+            order = Order.objects.get(id=order_id)
+        else:
+            order = Order.objects.get(id=order_id, user=request.user)
+    except Order.DoesNotExist:
+        return Response({'error': 'Buyurtma topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+    
+    pdf_log = PDFService.generate_invoice_pdf(order, request.user, request.META.get('REMOTE_ADDR'))
+    if pdf_log is None:
+        return Response({'error': 'PDF yaratib bo\'lmadi'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return pdf_file_response(pdf_log, f'invoice_{order.order_number}.pdf')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_invoice_pdfs(request):
+    """Download order invoice PDFs as a ZIP archive
+    
+    Filters: ids, status, date_from, date_to. Documents are rendered in
+    parallel and the archive is streamed as each one completes.
+    """
+    orders = filter_by_params(Order.objects.all(), request.query_params, 'order_date').order_by('order_date')
+    orders = list(orders[:settings.PDF_EXPORT_MAX_DOCUMENTS + 1])
+    if len(orders) > settings.PDF_EXPORT_MAX_DOCUMENTS:
+        return Response(
+            {'error': f"Bir martada {settings.PDF_EXPORT_MAX_DOCUMENTS} tadan ko'p hujjat eksport qilib bo'lmaydi"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    documents = (
+        (f'invoice_{order.order_number}.pdf', 'invoice', PDFService.invoice_context(order))
+        for order in orders
+    )
+    files = PDFService.batch_files(documents, request.user, request.META.get('REMOTE_ADDR'))
+    return zip_response(files, 'invoices.zip')
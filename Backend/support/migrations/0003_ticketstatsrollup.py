@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from utils.rollups import RollupSpec
+
+
+def build_rollups(apps, schema_editor):
+    RollupSpec(
+        apps.get_model('support', 'SupportTicket'),
+        apps.get_model('support', 'TicketStatsRollup'),
+        'created_at',
+        ['status', 'priority']
+    ).rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('count', models.IntegerField(default=0, verbose_name='Soni')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('status', models.CharField(choices=[('open', 'Ochiq'), ('in_progress', 'Jarayonda'), ('waiting_for_customer', 'Mijoz kutilmoqda'), ('resolved', 'Hal qilindi'), ('closed', 'Yopildi')], max_length=20, verbose_name='Holat')),
+                ('priority', models.CharField(choices=[('low', 'Past'), ('medium', "O'rta"), ('high', 'Yuqori'), ('urgent', 'Shoshilinch')], max_length=20, verbose_name='Ustuvorlik')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Tiket statistikasi',
+                'verbose_name_plural': 'Tiket statistikasi',
+                'ordering': ['-date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'date', 'status', 'priority'), name='support_rollup_user_unique'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date', 'status', 'priority'), name='support_rollup_global_unique')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from utils.search import SearchIndex, create_search_index, drop_search_index
+
+
+def get_index(apps):
+    return SearchIndex(apps.get_model('support', 'SupportTicket'), ['ticket_number', 'subject', 'description'])
+
+
+def create_index(apps, schema_editor):
+    create_search_index(get_index(apps), schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(get_index(apps), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0003_ticketstatsrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0004_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supportmessage',
+            index=models.Index(fields=['ticket', 'created_at'], name='message_ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportmessage',
+            index=models.Index(fields=['ticket', 'message_type', 'created_at'], name='message_ticket_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['user', '-created_at'], name='ticket_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='ticket_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['status', '-created_at'], name='ticket_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['assigned_to', 'status'], name='ticket_assignee_status_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+import uuid
+
+from utils.models import StatsRollup
 
 
 class SupportTicket(models.Model):
@@ -66,6 +69,12 @@ class SupportTicket(models.Model):
         verbose_name = "Qo'llab-quvvatlash tiketi"
         verbose_name_plural = "Qo'llab-quvvatlash tiketlari"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='ticket_user_created_idx'),
+            models.Index(fields=['user', 'status', '-created_at'], name='ticket_user_status_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='ticket_status_created_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='ticket_assignee_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.ticket_number} - {self.subject}"
@@ -84,7 +93,7 @@ class SupportTicket(models.Model):
     
     def generate_ticket_number(self):
         """Generate unique ticket number"""
-        return f"TKT-{timezone.now().strftime('%Y%m%d')}-{self.id or '0000'}"
+        return f"TKT-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
 
 
 class SupportMessage(models.Model):
@@ -127,6 +136,10 @@ class SupportMessage(models.Model):
         verbose_name = "Qo'llab-quvvatlash xabari"
         verbose_name_plural = "Qo'llab-quvvatlash xabarlari"
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['ticket', 'created_at'], name='message_ticket_created_idx'),
+            models.Index(fields=['ticket', 'message_type', 'created_at'], name='message_ticket_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.ticket.ticket_number} - {self.subject or self.message[:50]}"
@@ -170,3 +183,29 @@ class SupportTemplate(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class TicketStatsRollup(StatsRollup):
+    """Daily support ticket counts per user, status and priority"""
+    
+    status = models.CharField(max_length=20, choices=SupportTicket.STATUS_CHOICES, verbose_name="Holat")
+    priority = models.CharField(max_length=20, choices=SupportTicket.PRIORITY_CHOICES, verbose_name="Ustuvorlik")
+    
+    class Meta(StatsRollup.Meta):
+        verbose_name = "Tiket statistikasi"
+        verbose_name_plural = "Tiket statistikasi"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'status', 'priority'],
+                condition=models.Q(user__isnull=False),
+                name='support_rollup_user_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'status', 'priority'],
+                condition=models.Q(user__isnull=True),
+                name='support_rollup_global_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.status}/{self.priority}: {self.count}"
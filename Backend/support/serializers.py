@@ -61,13 +61,23 @@ class SupportTicketListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'ticket_number', 'user_name', 'assigned_to_name', 'created_at', 'updated_at']
     
     def get_latest_message(self, obj):
-        latest_message = obj.messages.last()
-        if latest_message:
-            return {
-                'message': latest_message.message[:100] + '...' if len(latest_message.message) > 100 else latest_message.message,
-                'created_at': latest_message.created_at
-            }
-        return None
+        # Use the values annotated by the list views when available
+        if hasattr(obj, 'latest_message_created_at'):
+            text = obj.latest_message_text
+            created_at = obj.latest_message_created_at
+        else:
+            latest_message = obj.messages.last()
+            if not latest_message:
+                return None
+            text = latest_message.message
+            created_at = latest_message.created_at
+        
+        if created_at is None:
+            return None
+        return {
+            'message': text[:100] + '...' if len(text) > 100 else text,
+            'created_at': created_at
+        }
 
 
 class SupportMessageSerializer(serializers.ModelSerializer):
@@ -190,5 +200,8 @@ class SupportStatisticsSerializer(serializers.Serializer):
     closed_tickets = serializers.IntegerField()
     urgent_tickets = serializers.IntegerField()
     high_priority_tickets = serializers.IntegerField()
-    average_response_time = serializers.FloatField()
+    average_response_time = serializers.FloatField(allow_null=True)
+    median_response_time = serializers.FloatField(allow_null=True)
+    p90_response_time = serializers.FloatField(allow_null=True)
+    response_time_by_agent = serializers.ListField(child=serializers.DictField(), allow_null=True)
     customer_satisfaction = serializers.FloatField() 
\ No newline at end of file
@@ -0,0 +1,100 @@
+import math
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from utils.rollups import aggregate_rollup
+
+from .models import SupportTicket, SupportMessage, TicketStatsRollup
+
+
+class TicketStatisticsService:
+    """Support ticket statistics"""
+    
+    @staticmethod
+    def rollup_summary(user=None, date_from=None, date_to=None):
+        """Status and priority counts for one user, or for all users when user is None"""
+        aggregates = {
+            'total_tickets': Coalesce(Sum('count'), 0),
+        }
+        for status_value, _ in SupportTicket.STATUS_CHOICES:
+            aggregates[f'{status_value}_tickets'] = Coalesce(Sum('count', filter=Q(status=status_value)), 0)
+        for priority_value, _ in SupportTicket.PRIORITY_CHOICES:
+            aggregates[f'{priority_value}_priority_tickets'] = Coalesce(Sum('count', filter=Q(priority=priority_value)), 0)
+        
+        return aggregate_rollup(TicketStatsRollup, user, date_from, date_to, **aggregates)
+    
+    @staticmethod
+    def with_first_response(queryset):
+        """Annotate tickets with the first staff reply time and the response duration"""
+        first_staff_reply = (
+            SupportMessage.objects
+            .filter(ticket=OuterRef('pk'), message_type='staff')
+            .order_by('created_at')
+            .values('created_at')[:1]
+        )
+        return queryset.annotate(
+            first_response_at=Subquery(first_staff_reply)
+        ).filter(
+            first_response_at__isnull=False
+        ).annotate(
+            response_time=ExpressionWrapper(F('first_response_at') - F('created_at'), output_field=DurationField())
+        )
+    
+    @staticmethod
+    def _hours(duration):
+        if duration is None:
+            return None
+        return duration.total_seconds() / 3600
+    
+    @staticmethod
+    def _percentile(queryset, count, fraction):
+        """Linearly interpolated percentile of response_time, read with ORDER BY/OFFSET"""
+        if not count:
+            return None
+        
+        position = fraction * (count - 1)
+        lower = math.floor(position)
+        values = list(
+            queryset.order_by('response_time').values_list('response_time', flat=True)[lower:lower + 2]
+        )
+        if len(values) == 1:
+            return values[0]
+        return values[0] + (values[1] - values[0]) * (position - lower)
+    
+    @staticmethod
+    def response_time_summary(queryset):
+        """Average, median and p90 first response time in hours, plus a per-agent breakdown"""
+        responded = TicketStatisticsService.with_first_response(queryset.order_by())
+        totals = responded.aggregate(count=Count('id'), average=Avg('response_time'))
+        count = totals['count']
+        
+        by_agent = (
+            responded
+            .values('assigned_to', 'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name')
+            .annotate(tickets=Count('id'), average=Avg('response_time'))
+            .order_by('assigned_to')
+        )
+        
+        return {
+            'responded_tickets': count,
+            'average_response_time': TicketStatisticsService._hours(totals['average']),
+            'median_response_time': TicketStatisticsService._hours(
+                TicketStatisticsService._percentile(responded, count, 0.5)
+            ),
+            'p90_response_time': TicketStatisticsService._hours(
+                TicketStatisticsService._percentile(responded, count, 0.9)
+            ),
+            'response_time_by_agent': [
+                {
+                    'assigned_to': row['assigned_to'],
+                    'assigned_to_name': (
+                        f"{row['assigned_to__first_name']} {row['assigned_to__last_name']}".strip()
+                        or row['assigned_to__username']
+                    ),
+                    'tickets': row['tickets'],
+                    'average_response_time': TicketStatisticsService._hours(row['average']),
+                }
+                for row in by_agent
+            ],
+        }
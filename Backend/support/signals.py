@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from utils.rollups import register_rollup
+from utils.search import register_search_index
+
+from .models import SupportMessage, SupportTicket, TicketStatsRollup
+
+
+ticket_rollup = register_rollup(
+    SupportTicket,
+    TicketStatsRollup,
+    date_field='created_at',
+    dimensions=['status', 'priority'],
+)
+
+ticket_search_index = register_search_index(
+    SupportTicket,
+    ['ticket_number', 'subject', 'description'],
+)
+
+
+@receiver(post_save, sender=SupportMessage)
+@receiver(post_delete, sender=SupportMessage)
+def touch_ticket(sender, instance, raw=False, **kwargs):
+    """Move the ticket's updated_at with its messages
+    
+    The ticket list shows the latest message, and its ETag only follows
+    the tickets' own updated_at.
+    """
+    if raw:
+        return
+    SupportTicket.objects.filter(pk=instance.ticket_id).update(updated_at=timezone.now())
@@ -1,3 +1,243 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from utils.testing import QueryCountMixin
+from .models import SupportTicket, SupportMessage
+
+
+class SupportStatisticsTests(TestCase):
+    """Tests for the support statistics endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.agent = User.objects.create_user(
+            email='agent@example.com', username='agent', password='pass12345',
+            first_name='Ali', last_name='Valiyev', is_staff=True
+        )
+        
+        # Resolved tickets answered after 1, 2, 3 and 10 hours
+        for hours in [1, 2, 3, 10]:
+            ticket = SupportTicket.objects.create(
+                user=self.customer,
+                subject='Savol',
+                description='Tavsif',
+                status='resolved',
+                assigned_to=self.agent,
+            )
+            for delay, text in [(hours, 'Javob'), (hours + 5, 'Yana')]:
+                message = SupportMessage.objects.create(ticket=ticket, sender=self.agent, message_type='staff', message=text)
+                SupportMessage.objects.filter(pk=message.pk).update(created_at=ticket.created_at + timedelta(hours=delay))
+        
+        # Tickets without a staff reply or still open are ignored
+        SupportTicket.objects.create(user=self.customer, subject='Savol', description='Tavsif', status='closed')
+        SupportTicket.objects.create(user=self.customer, subject='Savol', description='Tavsif', priority='urgent')
+    
+    def test_response_times_for_staff(self):
+        self.client.force_authenticate(self.agent)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('support:support-statistics'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_tickets'], 6)
+        self.assertEqual(response.data['resolved_tickets'], 4)
+        self.assertEqual(response.data['urgent_tickets'], 1)
+        self.assertAlmostEqual(response.data['average_response_time'], 4.0)
+        self.assertAlmostEqual(response.data['median_response_time'], 2.5)
+        self.assertAlmostEqual(response.data['p90_response_time'], 7.9)
+        
+        by_agent = response.data['response_time_by_agent']
+        self.assertEqual(len(by_agent), 1)
+        self.assertEqual(by_agent[0]['assigned_to_name'], 'Ali Valiyev')
+        self.assertEqual(by_agent[0]['tickets'], 4)
+    
+    def test_customer_does_not_see_response_times(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('support:support-statistics'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_tickets'], 6)
+        self.assertIsNone(response.data['average_response_time'])
+
+
+class SupportTicketListQueryTests(TestCase):
+    """Query count regression tests for ticket lists"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+    
+    def create_tickets(self, count):
+        for _ in range(count):
+            customer = User.objects.create_user(
+                email=f'client{SupportTicket.objects.count()}@example.com',
+                username=f'client{SupportTicket.objects.count()}',
+                password='pass12345'
+            )
+            ticket = SupportTicket.objects.create(
+                user=customer, subject='Savol', description='Tavsif', assigned_to=self.staff
+            )
+            SupportMessage.objects.create(ticket=ticket, sender=customer, message='Birinchi')
+            SupportMessage.objects.create(ticket=ticket, sender=self.staff, message_type='staff', message='J' * 150)
+    
+    def test_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.staff)
+        
+        self.create_tickets(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('support:ticket-list'))
+        self.assertEqual(len(response.data['results']), 3)
+        
+        self.create_tickets(10)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('support:ticket-list'))
+        self.assertEqual(len(response.data['results']), 13)
+        
+        latest = response.data['results'][0]['latest_message']
+        self.assertEqual(latest['message'], 'J' * 100 + '...')
+        self.assertEqual(response.data['results'][0]['assigned_to_name'], '')
+    
+    def test_new_message_changes_list_etag(self):
+        self.client.force_authenticate(self.staff)
+        self.create_tickets(2)
+        url = reverse('support:ticket-list')
+        etag = self.client.get(url)['ETag']
+        
+        ticket = SupportTicket.objects.order_by('id').first()
+        SupportMessage.objects.create(ticket=ticket, sender=self.staff, message_type='staff', message='Javob')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        latest = next(row['latest_message'] for row in response.data['results'] if row['id'] == ticket.pk)
+        self.assertEqual(latest['message'], 'Javob')
+    
+    def test_csv_export_is_filtered_and_streamed(self):
+        self.client.force_authenticate(self.staff)
+        self.create_tickets(4)
+        SupportTicket.objects.filter(pk=SupportTicket.objects.order_by('id').first().pk).update(status='closed')
+        
+        # Aggregate for the ETag plus one query for all rows
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('support:ticket-list'), {'export': 'csv', 'status': 'open'})
+            content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][:3], ['Tiket raqami', 'Email', 'Mavzu'])
+        self.assertEqual(len(rows), 4)
+        # Choices are exported with their display values
+        self.assertEqual(rows[1][5], dict(SupportTicket.STATUS_CHOICES)['open'])
+    
+    def test_customer_export_leaves_out_staff_emails_and_formulas(self):
+        self.create_tickets(1)
+        ticket = SupportTicket.objects.get()
+        ticket.subject = '=HYPERLINK("http://example.com")'
+        ticket.save()
+        self.client.force_authenticate(ticket.user)
+        
+        response = self.client.get(reverse('support:ticket-list'), {'export': 'csv'})
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertNotIn(self.staff.email, content)
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1][2], '\'=HYPERLINK("http://example.com")')
+        
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('support:ticket-list'), {'export': 'csv'})
+        self.assertIn(self.staff.email, b''.join(response.streaming_content).decode('utf-8-sig'))
+    
+    def test_search_query_count_is_constant(self):
+        self.client.force_authenticate(self.staff)
+        self.create_tickets(5)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('support:search-tickets'), {'q': 'Savol'})
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class SupportTicketDetailQueryTests(QueryCountMixin, TestCase):
+    """Query count tests for the ticket detail with its messages"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.customer = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        self.ticket = SupportTicket.objects.create(
+            user=self.customer, subject='Savol', description='Tavsif', assigned_to=self.staff
+        )
+        self.client.force_authenticate(self.customer)
+    
+    def add_messages(self):
+        SupportMessage.objects.create(ticket=self.ticket, sender=self.customer, message='Savol')
+        SupportMessage.objects.create(ticket=self.ticket, sender=self.staff, message_type='staff', message='Javob')
+    
+    def test_detail_query_count_is_constant(self):
+        # Ticket with users and validators, messages with their senders
+        url = reverse('support:ticket-detail', args=[self.ticket.pk])
+        responses = self.assertQueriesConstant(2, url, self.add_messages)
+        self.assertEqual(len(responses[-1].data['messages']), 4)
+        self.assertEqual(responses[-1].data['user_name'], self.customer.get_full_name())
+
+
+class SupportTicketSearchTests(TestCase):
+    """Tests for keyset pagination and streaming of ticket search"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        
+        tickets = [
+            SupportTicket.objects.create(user=self.staff, subject=f'Savol {index}', description='Tavsif')
+            for index in range(7)
+        ]
+        # Equal timestamps must still page deterministically
+        SupportTicket.objects.filter(pk__in=[ticket.pk for ticket in tickets[:4]]).update(
+            created_at=tickets[0].created_at
+        )
+    
+    def test_walks_all_pages_without_duplicates(self):
+        seen = []
+        url = reverse('support:search-tickets') + '?pagination=cursor&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(ticket['id'] for ticket in response.data['results'])
+            url = response.data['next']
+        
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), set(SupportTicket.objects.values_list('id', flat=True)))
+        
+        # Walking back from the last page returns the previous page
+        last = self.client.get(reverse('support:search-tickets'), {'pagination': 'cursor', 'page_size': 2})
+        second = self.client.get(last.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([t['id'] for t in back.data['results']], seen[:2])
+    
+    def test_pages_by_default(self):
+        response = self.client.get(reverse('support:search-tickets'), {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+    
+    @override_settings(SEARCH_LIST_LIMIT=5)
+    def test_plain_list_is_capped(self):
+        response = self.client.get(reverse('support:search-tickets'), {'pagination': 'none'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+    
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('support:search-tickets'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('support:search-tickets'), {'export': 'ndjson', 'q': 'Savol'})
+        
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertIn('"ticket_number"', lines[0])
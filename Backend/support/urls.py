@@ -25,5 +25,5 @@ urlpatterns = [
     
     # Statistics and search
     path('statistics/', views.support_statistics, name='support-statistics'),
-    path('search/', views.search_tickets, name='search-tickets'),
+    path('search/', views.SupportTicketSearchView.as_view(), name='search-tickets'),
 ] 
\ No newline at end of file
@@ -1,10 +1,19 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Avg, Count
+from django.db.models import Avg, Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Substr
 from datetime import timedelta
 
+from utils.conditional import ConditionalGetMixin
+from utils.exports import ExportMixin
+from utils.filters import filter_by_params
+from utils.pagination import KeysetPagination
+from utils.search import get_search_backend, search_queryset
+from utils.streaming import ndjson_response
+
 from .models import SupportTicket, SupportMessage, SupportCategory, SupportTemplate
 from .serializers import (
     SupportTicketSerializer, SupportTicketCreateSerializer, SupportTicketUpdateSerializer,
@@ -13,16 +22,54 @@ from .serializers import (
     SupportCategoryCreateSerializer, SupportTemplateSerializer, SupportTemplateCreateSerializer,
     SupportStatisticsSerializer
 )
+from .services import TicketStatisticsService
+
+
+def annotate_ticket_list(queryset):
+    """Load users and the latest message together with the tickets"""
+    latest_message = SupportMessage.objects.filter(ticket=OuterRef('pk')).order_by('-created_at', '-id')
+    return queryset.select_related('user', 'assigned_to').annotate(
+        # One character more than the preview length to detect truncation
+        latest_message_text=Subquery(latest_message.values(text=Substr('message', 1, 101))[:1]),
+        latest_message_created_at=Subquery(latest_message.values('created_at')[:1]),
+    )
 
 
-class SupportTicketListView(generics.ListCreateAPIView):
-    """List and create support tickets"""
+class SupportTicketListView(ConditionalGetMixin, ExportMixin, generics.ListCreateAPIView):
+    """List and create support tickets
+    
+    Filters: ids, status, priority, ticket_type, date_from, date_to. Pass
+    export=csv or export=xlsx to download every matching ticket.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    export_fields = (
+        'ticket_number', 'user__email', 'subject', 'ticket_type', 'priority', 'status',
+        'created_at', 'resolved_at', 'closed_at',
+    )
+    # Staff email addresses are only exported for staff
+    staff_export_fields = (
+        'ticket_number', 'user__email', 'subject', 'ticket_type', 'priority', 'status',
+        'assigned_to__email', 'created_at', 'resolved_at', 'closed_at',
+    )
+    export_filename = 'tickets'
+    
+    def get_export_fields(self):
+        if self.request.user.is_staff:
+            return self.staff_export_fields
+        return self.export_fields
     
     def get_queryset(self):
         if self.request.user.is_staff:
-            return SupportTicket.objects.all()
-        return SupportTicket.objects.filter(user=self.request.user)
+            queryset = SupportTicket.objects.all()
+        else:
+            queryset = SupportTicket.objects.filter(user=self.request.user)
+        
+        if self.request.method == 'GET':
+            queryset = filter_by_params(
+                queryset, self.request.query_params, 'created_at', ('status', 'priority', 'ticket_type')
+            )
+            queryset = annotate_ticket_list(queryset)
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -30,15 +77,20 @@ class SupportTicketListView(generics.ListCreateAPIView):
         return SupportTicketListSerializer
 
 
-class SupportTicketDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SupportTicketDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update and delete support ticket"""
     serializer_class = SupportTicketDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = {'messages': 'updated_at'}
+    detail_prefetch = (
+        Prefetch('messages', queryset=SupportMessage.objects.select_related('sender')),
+    )
     
     def get_queryset(self):
+        queryset = SupportTicket.objects.select_related('user', 'assigned_to')
         if self.request.user.is_staff:
-            return SupportTicket.objects.all()
-        return SupportTicket.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -208,68 +260,86 @@ def support_statistics(request):
     else:
         tickets = SupportTicket.objects.filter(user=user)
     
-    total_tickets = tickets.count()
-    open_tickets = tickets.filter(status='open').count()
-    in_progress_tickets = tickets.filter(status='in_progress').count()
-    resolved_tickets = tickets.filter(status='resolved').count()
-    closed_tickets = tickets.filter(status='closed').count()
-    urgent_tickets = tickets.filter(priority='urgent').count()
-    high_priority_tickets = tickets.filter(priority='high').count()
+    stats = TicketStatisticsService.rollup_summary(None if user.is_staff else user)
     
-    # Calculate average response time (for staff only)
-    average_response_time = None
+    # Response times are computed in the database (for staff only)
+    response_times = {
+        'average_response_time': None,
+        'median_response_time': None,
+        'p90_response_time': None,
+        'response_time_by_agent': None,
+    }
     if user.is_staff:
-        response_times = []
-        for ticket in tickets.filter(status__in=['resolved', 'closed']):
-            first_message = ticket.messages.filter(message_type='staff').first()
-            if first_message:
-                response_time = (first_message.created_at - ticket.created_at).total_seconds() / 3600  # hours
-                response_times.append(response_time)
-        
-        if response_times:
-            average_response_time = sum(response_times) / len(response_times)
+        summary = TicketStatisticsService.response_time_summary(tickets.filter(status__in=['resolved', 'closed']))
+        response_times.update({key: summary[key] for key in response_times})
     
     # Calculate customer satisfaction (placeholder)
     customer_satisfaction = 4.5  # This would be calculated from ratings
     
     return Response({
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'in_progress_tickets': in_progress_tickets,
-        'resolved_tickets': resolved_tickets,
-        'closed_tickets': closed_tickets,
-        'urgent_tickets': urgent_tickets,
-        'high_priority_tickets': high_priority_tickets,
-        'average_response_time': average_response_time,
+        'total_tickets': stats['total_tickets'],
+        'open_tickets': stats['open_tickets'],
+        'in_progress_tickets': stats['in_progress_tickets'],
+        'resolved_tickets': stats['resolved_tickets'],
+        'closed_tickets': stats['closed_tickets'],
+        'urgent_tickets': stats['urgent_priority_tickets'],
+        'high_priority_tickets': stats['high_priority_tickets'],
+        **response_times,
         'customer_satisfaction': customer_satisfaction,
     }, status=status.HTTP_200_OK)
 
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def search_tickets(request):
-    """Search support tickets"""
-    query = request.query_params.get('q', '')
-    status_filter = request.query_params.get('status', '')
-    priority_filter = request.query_params.get('priority', '')
-    
-    if request.user.is_staff:
-        tickets = SupportTicket.objects.all()
-    else:
-        tickets = SupportTicket.objects.filter(user=request.user)
+class SupportTicketSearchView(generics.ListAPIView):
+    """Search support tickets
     
-    if query:
-        tickets = tickets.filter(
-            Q(subject__icontains=query) |
-            Q(description__icontains=query) |
-            Q(ticket_number__icontains=query)
-        )
+    Results are keyset paginated, follow the cursor of the next/previous
+    links. pagination=none returns a plain list (the shape from before
+    pagination) of at most SEARCH_LIST_LIMIT tickets, and export=ndjson
+    streams every matching ticket as newline delimited JSON.
+    """
+    serializer_class = SupportTicketListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
-    if status_filter:
-        tickets = tickets.filter(status=status_filter)
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        status_filter = self.request.query_params.get('status', '')
+        priority_filter = self.request.query_params.get('priority', '')
+        
+        if self.request.user.is_staff:
+            tickets = SupportTicket.objects.all()
+        else:
+            tickets = SupportTicket.objects.filter(user=self.request.user)
+        
+        if status_filter:
+            tickets = tickets.filter(status=status_filter)
+        
+        if priority_filter:
+            tickets = tickets.filter(priority=priority_filter)
+        
+        # Full-text search, ranked by relevance
+        if query:
+            tickets = search_queryset(tickets, query)
+        
+        return annotate_ticket_list(tickets)
     
-    if priority_filter:
-        tickets = tickets.filter(priority=priority_filter)
+    def get_keyset_ordering(self):
+        # Ranked searches are paged by relevance instead of creation time
+        if self.request.query_params.get('q') and get_search_backend().ranked:
+            return ('-search_rank', '-id')
+        return self.keyset_ordering
     
-    serializer = SupportTicketListSerializer(tickets, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('export') == 'ndjson':
+            queryset = self.get_queryset().order_by(*self.get_keyset_ordering())
+            return ndjson_response(
+                queryset,
+                self.get_serializer_class(),
+                filename='tickets.ndjson',
+                context=self.get_serializer_context()
+            )
+        if request.query_params.get('pagination') == 'none':
+            queryset = self.filter_queryset(self.get_queryset()).order_by(*self.get_keyset_ordering())
+            return Response(self.get_serializer(queryset[:settings.SEARCH_LIST_LIMIT], many=True).data)
+        return super().list(request, *args, **kwargs)
@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import SlowRequestLog
+
+
+@admin.register(SlowRequestLog)
+class SlowRequestLogAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'query_count', 'duplicate_count', 'sql_ms']
+    list_filter = ['method', 'status_code', 'view_name', 'created_at']
+    search_fields = ['path', 'view_name']
+    readonly_fields = [field.name for field in SlowRequestLog._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
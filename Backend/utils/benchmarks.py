@@ -0,0 +1,286 @@
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from declarations.models import Declaration, DeclarationDocument
+from news.models import FAQ, CompanyInfo, News, NewsCategory, Service
+from orders.models import Order, OrderDocument
+from support.models import SupportCategory, SupportMessage, SupportTemplate, SupportTicket
+from users.models import Passport, UserDocument
+
+User = get_user_model()
+
+ROLES = ('staff', 'customer')
+
+# Routes left out of the API benchmark, with the reason shown in the report
+EXCLUDED_ROUTES = {
+    'orders:invoice-pdf': "renders a PDF",
+    'orders:export-invoices': "renders PDFs",
+    'declarations:generate-pdf': "renders a PDF",
+    'declarations:export-pdf': "renders PDFs",
+}
+
+# Model whose row fills the pk or slug of each detail route
+ROUTE_OBJECTS = {
+    'users:document-detail': UserDocument,
+    'orders:order-detail': Order,
+    'orders:document-detail': OrderDocument,
+    'declarations:declaration-detail': Declaration,
+    'declarations:document-detail': DeclarationDocument,
+    'news:admin-news-detail': News,
+    'news:public-news-detail': News,
+    'news:admin-category-detail': NewsCategory,
+    'news:admin-service-detail': Service,
+    'news:public-service-detail': Service,
+    'news:admin-company-info-detail': CompanyInfo,
+    'news:public-company-info-detail': CompanyInfo,
+    'news:admin-faq-detail': FAQ,
+    'support:ticket-detail': SupportTicket,
+    'support:message-detail': SupportMessage,
+    'support:category-detail': SupportCategory,
+    'support:template-detail': SupportTemplate,
+}
+
+# Model filling the other URL kwargs, by kwarg name
+KWARG_OBJECTS = {
+    'order_id': Order,
+    'declaration_id': Declaration,
+    'ticket_id': SupportTicket,
+    'message_id': SupportMessage,
+}
+
+# Customers are benchmarked on their own rows
+OWNER_LOOKUPS = {
+    Order: 'user',
+    OrderDocument: 'order__user',
+    Declaration: 'user',
+    DeclarationDocument: 'declaration__user',
+    SupportTicket: 'user',
+    SupportMessage: 'ticket__user',
+    UserDocument: 'user',
+}
+
+# Rows the public views show
+VISIBLE_FILTERS = {
+    News: {'status': 'published'},
+    Service: {'is_active': True},
+    CompanyInfo: {'is_active': True},
+    FAQ: {'is_active': True},
+}
+
+DEFAULT_THRESHOLDS = {
+    # Any extra query is a regression
+    'queries': 0,
+    # p95 latency may grow by this factor, ignoring changes below the floor
+    'latency_ratio': 1.5,
+    'latency_floor_ms': 5.0,
+    'memory_ratio': 1.5,
+    'memory_floor_kb': 256,
+}
+
+
+def api_routes(patterns=None, namespace=None, prefix=''):
+    """(route name, route, view class, kwarg names) of every DRF view in the URLconf
+    
+    The admin site is skipped, other plain Django views (media and static
+    files) are yielded with a view class of None.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            yield from api_routes(pattern.url_patterns, pattern.namespace or namespace, prefix + str(pattern.pattern))
+            continue
+        name = f'{namespace}:{pattern.name}' if namespace and pattern.name else pattern.name or str(pattern.pattern)
+        yield name, prefix + str(pattern.pattern), getattr(pattern.callback, 'cls', None), list(pattern.pattern.converters)
+
+
+class BenchmarkFixtures:
+    """Users the API is called as and the rows filling URL kwargs
+    
+    The customer is the owner of the newest declaration, so they also have
+    orders. A ticket, documents and a passport are added for them when
+    missing so every customer route has something to show.
+    """
+    
+    def __init__(self):
+        self.staff, _ = User.objects.get_or_create(
+            email='bench-staff@load.test',
+            defaults={'username': 'bench-staff', 'is_staff': True},
+        )
+        declaration = Declaration.objects.select_related('order', 'user').order_by('-id').first()
+        if declaration is None:
+            raise ValueError("Seed orders and declarations before benchmarking the API")
+        self.customer = declaration.user
+        self.ensure_customer_rows(declaration)
+        self.objects = {}
+    
+    def ensure_customer_rows(self, declaration):
+        customer = self.customer
+        ticket = SupportTicket.objects.filter(user=customer).first()
+        if ticket is None:
+            ticket = SupportTicket.objects.create(user=customer, subject='Yuklama', description='Benchmark')
+        if not ticket.messages.exists():
+            SupportMessage.objects.create(ticket=ticket, sender=customer, message='Benchmark')
+        if not OrderDocument.objects.filter(order=declaration.order).exists():
+            OrderDocument.objects.create(order=declaration.order, document_type='other', title='Benchmark', file='order_documents/benchmark.pdf')
+        if not DeclarationDocument.objects.filter(declaration=declaration).exists():
+            DeclarationDocument.objects.create(declaration=declaration, document_type='other', title='Benchmark', file='declaration_documents/benchmark.pdf')
+        if not UserDocument.objects.filter(user=customer).exists():
+            UserDocument.objects.create(user=customer, document_type='other', title='Benchmark', file='documents/benchmark.pdf')
+        # The passport view creates a passport on first access and fails
+        # without these required fields
+        today = timezone.localdate()
+        for user in (customer, self.staff):
+            if not Passport.objects.filter(user=user).exists():
+                Passport.objects.create(
+                    user=user,
+                    series='AA',
+                    number='1234567',
+                    issue_date=today.replace(year=today.year - 5),
+                    expiry_date=today.replace(year=today.year + 5),
+                    issuing_authority='IIV',
+                )
+    
+    def user(self, role):
+        return self.staff if role == 'staff' else self.customer
+    
+    def instance(self, model, role):
+        key = (model, role)
+        if key not in self.objects:
+            queryset = model._default_manager.filter(**VISIBLE_FILTERS.get(model, {}))
+            if role == 'customer' and model in OWNER_LOOKUPS:
+                queryset = queryset.filter(**{OWNER_LOOKUPS[model]: self.customer})
+            self.objects[key] = queryset.order_by('-pk').first()
+        return self.objects[key]
+    
+    def kwargs(self, name, kwarg_names, role):
+        """URL kwargs of the route for role, raising LookupError without rows"""
+        kwargs = {}
+        for kwarg in kwarg_names:
+            model = ROUTE_OBJECTS.get(name) if kwarg in ('pk', 'slug') else KWARG_OBJECTS.get(kwarg)
+            if model is None:
+                raise LookupError(f"no fixture for {kwarg}")
+            instance = self.instance(model, role)
+            if instance is None:
+                raise LookupError(f"no {model._meta.verbose_name} rows")
+            kwargs[kwarg] = getattr(instance, kwarg) if kwarg == 'slug' else instance.pk
+        return kwargs
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def fetch(client, path):
+    response = client.get(path)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure_endpoint(client, path, repeat):
+    """Query count, p50/p95 latency and peak Python memory of GET path
+    
+    The first request warms caches and lazy imports and is not counted.
+    Memory is traced in a separate request as tracemalloc slows it down.
+    """
+    fetch(client, path)
+    with CaptureQueriesContext(connection) as queries:
+        response = fetch(client, path)
+    # Counted now, the next request resets the query log
+    query_count = len(queries)
+    
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetch(client, path)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    
+    tracemalloc.start()
+    try:
+        fetch(client, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(fixtures, repeat=20, roles=ROLES, excluded=EXCLUDED_ROUTES, log=None):
+    """Benchmark every GET route of the URLconf for each role
+    
+    Returns {'endpoints': {'<route name> [<role>]': measurements},
+    'skipped': {'<route name>': reason}}.
+    """
+    clients = {}
+    for role in roles:
+        # Server errors are reported as a 500 status instead of raised
+        clients[role] = APIClient(raise_request_exception=False)
+        clients[role].force_authenticate(fixtures.user(role))
+    
+    endpoints = {}
+    skipped = {}
+    for name, route, view_class, kwarg_names in api_routes():
+        if name in excluded:
+            skipped[name] = excluded[name]
+            continue
+        if view_class is None:
+            skipped[name] = "not an API view"
+            continue
+        if not hasattr(view_class, 'get'):
+            skipped[name] = "no GET handler"
+            continue
+        for role in roles:
+            try:
+                kwargs = fixtures.kwargs(name, kwarg_names, role)
+            except LookupError as e:
+                skipped[f'{name} [{role}]'] = str(e)
+                continue
+            path = reverse(name, kwargs=kwargs)
+            result = {'path': path, **measure_endpoint(clients[role], path, repeat)}
+            endpoints[f'{name} [{role}]'] = result
+            if log:
+                log(f'{name} [{role}]', result)
+    return {'endpoints': endpoints, 'skipped': skipped}
+
+
+def compare_reports(baseline, report, thresholds=None):
+    """Regressions of report against a baseline report, as readable lines
+    
+    Endpoints missing from the baseline are new and not compared.
+    """
+    limits = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    regressions = []
+    for key, current in sorted(report['endpoints'].items()):
+        previous = baseline.get('endpoints', {}).get(key)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f"{key}: status {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries'] + limits['queries']:
+            regressions.append(f"{key}: {previous['queries']} -> {current['queries']} queries")
+        if (current['p95_ms'] > previous['p95_ms'] * limits['latency_ratio']
+                and current['p95_ms'] - previous['p95_ms'] > limits['latency_floor_ms']):
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if (current['peak_memory_kb'] > previous['peak_memory_kb'] * limits['memory_ratio']
+                and current['peak_memory_kb'] - previous['peak_memory_kb'] > limits['memory_floor_kb']):
+            regressions.append(f"{key}: peak memory {previous['peak_memory_kb']:.0f}KB -> {current['peak_memory_kb']:.0f}KB")
+    return regressions
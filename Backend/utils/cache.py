@@ -0,0 +1,136 @@
+import hashlib
+import logging
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def group_version_key(group):
+    return f'response-cache:version:{group}'
+
+
+def group_versions(cache, groups):
+    """Current version of each cache group, starting at 1"""
+    keys = [group_version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, timeout=None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def invalidate_cache_groups(*groups):
+    """Make every cached response of the groups stale by bumping their versions"""
+    cache = get_response_cache()
+    for group in groups:
+        key = group_version_key(group)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Version not cached yet (or evicted), any new value invalidates
+                cache.set(key, 2, timeout=None)
+        except Exception:
+            logger.exception(f"Failed to invalidate response cache group {group}")
+
+
+def response_cache_key(request, name, versions):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha1(f'{request.get_host()}{request.path}?{query}'.encode()).hexdigest()
+    version = '.'.join(str(value) for value in versions)
+    return f'response-cache:{name}:{version}:{digest}'
+
+
+def cached_response(request, name, groups, timeout, view):
+    """Serve a GET request from the response cache, calling view() on a miss
+    
+    The key contains the path, the sorted query string and the versions of
+    the given groups, so invalidate_cache_groups() drops exactly the
+    responses built from the changed models. Only the serialized data of
+    200 responses is stored; cache errors are logged and the view is served
+    uncached.
+    """
+    if request.method != 'GET':
+        return view()
+    
+    cache = get_response_cache()
+    try:
+        key = response_cache_key(request, name, group_versions(cache, groups))
+        data = cache.get(key)
+    except Exception:
+        logger.exception("Response cache unavailable")
+        return view()
+    
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+    
+    response = view()
+    if response.status_code == status.HTTP_200_OK:
+        if timeout is None:
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        try:
+            cache.set(key, response.data, timeout)
+        except Exception:
+            logger.exception("Failed to store response in cache")
+        response['X-Cache'] = 'MISS'
+    return response
+
+
+def cache_response(*groups, timeout=None):
+    """Cache a function view's responses, apply it below @api_view"""
+    def decorator(view_func):
+        name = f'{view_func.__module__}.{view_func.__qualname__}'
+        
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return cached_response(
+                request, name, groups, timeout,
+                lambda: view_func(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+class CachedResponseMixin:
+    """Cache GET responses of a generic view in the cache_groups groups"""
+    
+    cache_groups = ()
+    cache_timeout = None
+    
+    def get(self, request, *args, **kwargs):
+        name = f'{type(self).__module__}.{type(self).__qualname__}'
+        return cached_response(
+            request, name, self.cache_groups, self.cache_timeout,
+            lambda: super(CachedResponseMixin, self).get(request, *args, **kwargs)
+        )
+
+
+def register_cache_invalidation(model, *groups):
+    """Invalidate the cache groups whenever a row of the model is saved or deleted"""
+    def handle_change(sender, **kwargs):
+        if kwargs.get('raw', False):
+            return
+        invalidate_cache_groups(*groups)
+        # Again after commit, so readers between the write and the commit
+        # cannot leave the old rows cached
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: invalidate_cache_groups(*groups))
+    
+    uid = f'response_cache_{model._meta.label_lower}'
+    post_save.connect(handle_change, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handle_change, sender=model, weak=False, dispatch_uid=uid)
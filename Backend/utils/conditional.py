@@ -0,0 +1,164 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import get_response_cache, group_versions
+
+
+def latest_prefetch(lookup, queryset, limit=None):
+    """Prefetch of only the first rows of a relation into latest_<lookup>
+    
+    Long-lived objects collect hundreds of history rows, the detail payload
+    keeps the newest DETAIL_HISTORY_LIMIT (in the queryset's ordering) and
+    the full history stays available from the paginated list endpoint of
+    the relation. Sliced prefetches need their own to_attr.
+    """
+    return Prefetch(
+        lookup,
+        queryset=queryset[:limit or settings.DETAIL_HISTORY_LIMIT],
+        to_attr=f'latest_{lookup}'
+    )
+
+
+class ConditionalGetMixin:
+    """ETag support for generic list and detail views
+    
+    The ETag is computed with at most one aggregate query (MAX of
+    conditional_field and the row count, plus the same for each relation in
+    conditional_related) instead of serializing the body, and a 304 is
+    returned when the client's copy is still current.
+    
+    No Last-Modified is sent or honored: in whole seconds it would not
+    change when a row is deleted or updated twice in a second, while the
+    ETag includes microseconds and row counts. Lists also cached with CachedResponseMixin take their ETag from
+    the versions of its cache_groups, which change with every write to the
+    cached models, so neither a 304 nor a cache hit runs a query.
+    
+    Keyset (?pagination=cursor) and count-less (?count=false) pages exist
+    to avoid scanning the whole list, so they skip the aggregate and take
+    their ETag from the serialized page, which saves the transfer but not
+    the page query.
+    
+    conditional_related maps relation names shown in the detail payload to
+    their timestamp field, e.g. {'messages': 'updated_at'}. Their values are
+    subqueries of the query loading the object, so a 304 costs one query,
+    and detail_prefetch (prefetch_related lookups or Prefetch objects) is
+    only loaded when the body is serialized. Lists ignore it, joining every
+    related row into the aggregate costs more than the page.
+    """
+    
+    conditional_field = 'updated_at'
+    conditional_related = {}
+    detail_prefetch = ()
+    annotate_conditional = False
+    
+    def get_conditional_annotations(self, model):
+        """Last change and row count of each related table, per object"""
+        annotations = {}
+        for relation, field in self.conditional_related.items():
+            remote_field = model._meta.get_field(relation).field
+            rows = remote_field.model._default_manager.filter(
+                **{remote_field.name: OuterRef('pk')}
+            ).order_by().values(remote_field.name)
+            annotations[f'{relation}_last_modified'] = Subquery(rows.annotate(value=Max(field)).values('value'))
+            annotations[f'{relation}_count'] = Coalesce(Subquery(rows.annotate(value=Count('pk')).values('value')), 0)
+        return annotations
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.annotate_conditional and self.conditional_related:
+            queryset = queryset.annotate(**self.get_conditional_annotations(queryset.model))
+        return queryset
+    
+    def get_cached_state(self):
+        """Response cache versions of the view's cache_groups, or None"""
+        groups = getattr(self, 'cache_groups', ())
+        if not groups:
+            return None
+        try:
+            return {'cache_versions': '.'.join(str(version) for version in group_versions(get_response_cache(), groups))}
+        except Exception:
+            # Cache unavailable, the aggregate query decides
+            return None
+    
+    def get_conditional_state(self, queryset=None, instance=None):
+        """Values identifying the current version of the list or instance"""
+        if instance is not None:
+            state = {'last_modified': getattr(instance, self.conditional_field), 'count': 1}
+            for relation in self.conditional_related:
+                for key in (f'{relation}_last_modified', f'{relation}_count'):
+                    state[key] = getattr(instance, key)
+            return state
+        
+        return queryset.order_by().aggregate(last_modified=Max(self.conditional_field), count=Count('pk'))
+    
+    def uses_list_aggregate(self, request):
+        """Whether the list validators come from the aggregate query"""
+        get_mode = getattr(self.paginator, 'get_mode', None)
+        return get_mode is None or get_mode(request) == 'page'
+    
+    def get_etag(self, request, state):
+        parts = [
+            type(self).__qualname__,
+            str(request.user.pk),
+            request.accepted_renderer.format,
+            request.get_full_path(),
+        ]
+        for key, value in sorted(state.items()):
+            parts.append(f'{key}={value.isoformat() if hasattr(value, "isoformat") else value}')
+        return quote_etag(hashlib.sha1('|'.join(parts).encode()).hexdigest())
+    
+    def get_page(self, request, *args, **kwargs):
+        """Page response with an ETag derived from its serialized body"""
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != 200 or getattr(response, 'data', None) is None:
+            return response
+        
+        content = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+        etag = self.get_etag(request, {'content': hashlib.sha1(content.encode()).hexdigest()})
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        response['ETag'] = etag
+        return response
+    
+    def get(self, request, *args, **kwargs):
+        instance = None
+        if (self.lookup_url_kwarg or self.lookup_field) in kwargs:
+            # The related validators are loaded with the object
+            self.annotate_conditional = True
+            instance = self.get_object()
+            state = self.get_conditional_state(instance=instance)
+        else:
+            state = self.get_cached_state()
+            if state is None:
+                if not self.uses_list_aggregate(request):
+                    return self.get_page(request, *args, **kwargs)
+                state = self.get_conditional_state(queryset=self.filter_queryset(self.get_queryset()))
+        
+        etag = self.get_etag(request, state)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        
+        if instance is not None:
+            if self.detail_prefetch:
+                prefetch_related_objects([instance], *self.detail_prefetch)
+            response = Response(self.get_serializer(instance).data)
+        else:
+            # The pagination reuses the row count instead of a COUNT(*) query
+            self.known_count = state.get('count')
+            response = super().get(request, *args, **kwargs)
+        
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,33 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def filter_by_params(queryset, params, date_field, fields=('status',)):
+    """Filter a queryset by the common list/export query parameters
+    
+    ids: comma separated primary keys
+    <field>: exact match for each of fields, e.g. status=approved
+    date_from, date_to: inclusive YYYY-MM-DD bounds on date_field
+    """
+    ids = params.get('ids')
+    if ids:
+        try:
+            queryset = queryset.filter(pk__in=[int(value) for value in ids.split(',') if value.strip()])
+        except ValueError:
+            raise ValidationError({'ids': "Vergul bilan ajratilgan raqamlar bo'lishi kerak"})
+    
+    for field in fields:
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    
+    for param, lookup in [('date_from', 'gte'), ('date_to', 'lte')]:
+        value = params.get(param)
+        if not value:
+            continue
+        date = parse_date(value)
+        if date is None:
+            raise ValidationError({param: "Sana YYYY-MM-DD formatida bo'lishi kerak"})
+        queryset = queryset.filter(**{f'{date_field}__date__{lookup}': date})
+    
+    return queryset
@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Marks keys whose loader returned nothing, so misses are cached as well
+MISSING = object()
+
+
+class VersionedLocalCache:
+    """Process-local dict invalidated across processes by a shared version counter
+    
+    Values are kept in memory of this process. invalidate() clears them and
+    bumps a counter in the shared Django cache (Redis in production); other
+    processes compare that counter at most every check_interval seconds and
+    drop their values when it changed.
+    """
+    
+    def __init__(self, name, cache_alias='default', check_interval=1.0):
+        self.name = name
+        self.cache_alias = cache_alias
+        self.check_interval = check_interval
+        self._values = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def version_key(self):
+        return f'local-cache:{self.name}:version'
+    
+    def shared_version(self):
+        try:
+            return caches[self.cache_alias].get_or_set(self.version_key, 1, timeout=None)
+        except Exception:
+            logger.exception(f"Shared version of {self.name} cache unavailable")
+            return self._version
+    
+    def sync(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        version = self.shared_version()
+        with self._lock:
+            if version != self._version:
+                self._values.clear()
+                self._version = version
+            self._checked_at = now
+    
+    def get(self, key, loader):
+        """Cached value for key, calling loader() on a miss"""
+        self.sync()
+        value = self._values.get(key, MISSING)
+        if value is MISSING:
+            value = loader()
+            with self._lock:
+                self._values[key] = value
+        return value
+    
+    def invalidate(self):
+        with self._lock:
+            self._values.clear()
+            self._version = None
+        
+        cache = caches[self.cache_alias]
+        try:
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.set(self.version_key, 2, timeout=None)
+        except Exception:
+            logger.exception(f"Failed to publish invalidation of {self.name} cache")
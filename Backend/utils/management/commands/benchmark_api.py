@@ -0,0 +1,129 @@
+import json
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from declarations.models import Declaration
+from news.models import News
+from orders.models import Order
+from support.models import SupportMessage, SupportTicket
+from utils.benchmarks import DEFAULT_THRESHOLDS, ROLES, BenchmarkFixtures, compare_reports, run_benchmarks
+from utils.seeding import DatasetSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Call every GET endpoint of the API through the DRF test client and record query count, "
+        "p50/p95 latency and peak memory. Runs in a test database created from the migrations and "
+        "destroyed afterwards, the configured database is not touched."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database and its rows for the next run (on SQLite this needs a TEST NAME, the default test database is in memory)")
+        parser.add_argument('--skip-seed', action='store_true', help="Benchmark the rows kept by a previous --keepdb run")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+        parser.add_argument('--json', dest='json_path', help="Write the report to this file")
+        parser.add_argument('--baseline', help="Report of a previous run, fail on regressions against it")
+        parser.add_argument('--max-extra-queries', type=int, default=DEFAULT_THRESHOLDS['queries'])
+        parser.add_argument('--latency-ratio', type=float, default=DEFAULT_THRESHOLDS['latency_ratio'])
+        parser.add_argument('--memory-ratio', type=float, default=DEFAULT_THRESHOLDS['memory_ratio'])
+    
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        
+        # Seeding and the fixtures' staff user, tickets and documents go to a
+        # test database, never to the configured one
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            self.benchmark(options, baseline)
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0, keepdb=options['keepdb'])
+    
+    def benchmark(self, options, baseline):
+        if not options['skip_seed']:
+            self.seed(options)
+        
+        # Allows the test client's host and keeps mail in memory
+        setup_test_environment()
+        # Expected 403/404 responses would log a warning each
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            fixtures = BenchmarkFixtures()
+            started = time.perf_counter()
+            results = run_benchmarks(fixtures, repeat=options['repeat'], roles=options['roles'], log=self.log)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            request_logger.setLevel(level)
+            teardown_test_environment()
+        
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'repeat': options['repeat'],
+            'dataset': {
+                model._meta.label: model.objects.count()
+                for model in (Order, Declaration, SupportTicket, SupportMessage, News)
+            },
+            **results,
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmarked {len(results['endpoints'])} endpoints in {time.perf_counter() - started:.1f}s, "
+            f"skipped {len(results['skipped'])}"
+        ))
+        
+        if options['json_path']:
+            with open(options['json_path'], 'w') as report_file:
+                json.dump(report, report_file, indent=2, sort_keys=True)
+        
+        errors = [key for key, result in results['endpoints'].items() if result['status'] >= 500]
+        regressions = []
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, {
+                'queries': options['max_extra_queries'],
+                'latency_ratio': options['latency_ratio'],
+                'memory_ratio': options['memory_ratio'],
+            })
+        for line in regressions:
+            self.stderr.write(line)
+        if errors or regressions:
+            raise CommandError(f"{len(errors)} endpoints failed, {len(regressions)} regressions")
+    
+    def seed(self, options):
+        seeder = DatasetSeeder(seed=options['seed'], batch_size=options['batch_size'])
+        orders_count = options['orders']
+        started = time.perf_counter()
+        
+        users = seeder.seed_users(options['users'])
+        orders = seeder.seed_orders(users, orders_count)
+        seeder.seed_declarations(orders, max(orders_count // 10, 1))
+        del orders
+        seeder.seed_tickets(users, max(orders_count // 20, 1))
+        seeder.seed_news(users[0], max(orders_count // 1000, 10))
+        seeder.seed_site_content(20)
+        seeder.refresh_derived()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {orders_count} orders in {time.perf_counter() - started:.1f}s"
+        ))
+    
+    def log(self, key, result):
+        self.stdout.write(
+            f"{key:<55} {result['status']:>3} {result['queries']:>3}q "
+            f"p50 {result['p50_ms']:>8.2f}ms p95 {result['p95_ms']:>8.2f}ms {result['peak_memory_kb']:>8.0f}KB"
+        )
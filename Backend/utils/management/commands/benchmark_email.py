@@ -0,0 +1,108 @@
+import socketserver
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from utils.models import EmailLog, EmailTemplate
+from utils.services import EmailService
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts and discards every message"""
+    
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+    
+    def handle(self):
+        # Simulated connection setup cost (network round trips, TLS, auth)
+        time.sleep(self.server.connect_latency)
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, connect_latency):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connect_latency = connect_latency
+        self.messages = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-message send_email with batched send_bulk against a local SMTP sink. "
+        "Creates EmailLog rows, run it against a scratch database."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--connect-latency-ms', type=float, default=20, help="Simulated SMTP connection setup time")
+        parser.add_argument('--skip-single', action='store_true', help="Only benchmark send_bulk")
+    
+    def handle(self, *args, **options):
+        sink = SMTPSink(options['connect_latency_ms'] / 1000)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        
+        template, _ = EmailTemplate.objects.get_or_create(
+            template_type='newsletter',
+            name='Benchmark newsletter',
+            defaults={'subject': 'Yangiliklar {{number}}', 'content': 'Hurmatli {{user_name}}, yangi xabarlar: {{number}}'},
+        )
+        count = options['messages']
+        recipients = [
+            (f'bench{number}@load.test', {'user_name': f'Mijoz {number}', 'number': number})
+            for number in range(count)
+        ]
+        
+        smtp = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': sink.server_address[1],
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+        try:
+            with override_settings(**smtp):
+                if not options['skip_single']:
+                    started = time.perf_counter()
+                    for recipient, context in recipients:
+                        EmailService.send_email('newsletter', recipient, context)
+                    self.report('send_email (connection per message)', count, time.perf_counter() - started)
+                
+                started = time.perf_counter()
+                totals = EmailService.send_bulk('newsletter', recipients, batch_size=options['batch_size'])
+                self.report(f"send_bulk (batches of {options['batch_size']})", totals['sent'], time.perf_counter() - started)
+        finally:
+            sink.shutdown()
+            sink.server_close()
+        
+        EmailLog.objects.filter(template=template, recipient__endswith='@load.test').delete()
+        self.stdout.write(f"SMTP sink received {sink.messages} messages")
+    
+    def report(self, label, sent, elapsed):
+        self.stdout.write(f"{label}: {sent} messages in {elapsed:.2f}s, {sent / elapsed:.0f} msg/s")
@@ -0,0 +1,158 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from declarations.models import Declaration, DeclarationStatusUpdate
+from news.models import News
+from orders.models import Order, OrderStatusUpdate
+from support.models import SupportMessage, SupportTicket
+from support.views import annotate_ticket_list
+from utils.seeding import DatasetSeeder
+
+User = get_user_model()
+
+# Models whose Meta.indexes are dropped for the "before" measurement
+INDEXED_MODELS = [Order, OrderStatusUpdate, Declaration, DeclarationStatusUpdate, SupportTicket, SupportMessage, News]
+
+
+def hot_queries():
+    """Representative list queries, built from existing rows"""
+    user = Order.objects.values_list('user_id', flat=True).order_by('-id').first()
+    order = Order.objects.order_by('-id').first()
+    declaration = Declaration.objects.order_by('-id').first()
+    ticket = SupportTicket.objects.order_by('-id').first()
+    
+    return {
+        'orders of a user': Order.objects.filter(user_id=user).order_by('-order_date')[:20],
+        'orders of a user by status': Order.objects.filter(user_id=user, status='pending').order_by('-order_date')[:20],
+        'orders by status': Order.objects.filter(status='processing').order_by('-order_date')[:20],
+        'order status history': OrderStatusUpdate.objects.filter(order=order).order_by('-updated_at')[:20],
+        'declarations of a user': Declaration.objects.filter(user_id=user).order_by('-created_at')[:20],
+        'declarations by status': Declaration.objects.filter(status='submitted').order_by('-created_at')[:20],
+        'declaration status history': DeclarationStatusUpdate.objects.filter(declaration=declaration).order_by('-updated_at')[:20],
+        'tickets of a user with latest message': annotate_ticket_list(SupportTicket.objects.filter(user_id=user))[:20],
+        'tickets by status': SupportTicket.objects.filter(status='open').order_by('-created_at')[:20],
+        'staff messages of a ticket': SupportMessage.objects.filter(ticket=ticket, message_type='staff').order_by('created_at'),
+        'published news': News.objects.filter(status='published').order_by('-published_at', '-created_at')[:20],
+    }
+
+
+def measure(queryset, repeat):
+    """Median and p95 latency of evaluating a queryset, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large synthetic dataset and compare query plans and latency of hot list "
+        "queries without and with the composite indexes. Runs in a test database created from "
+        "the migrations and destroyed afterwards, unless --in-place is given."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database and its rows for the next run (on SQLite this needs a TEST NAME, the default test database is in memory)")
+        parser.add_argument('--in-place', action='store_true', help="Seed rows into and drop the indexes of the configured database instead, only for a scratch database")
+        parser.add_argument('--skip-seed', action='store_true', help="Benchmark the rows already in the database")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', dest='json_path', help="Write the results to this file")
+    
+    def handle(self, *args, **options):
+        if options['in_place']:
+            self.benchmark(options)
+            return
+        
+        # Seeding and dropping the indexes happen in a test database, the
+        # configured one is only used with --in-place
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0, keepdb=options['keepdb'])
+    
+    def benchmark(self, options):
+        if not options['skip_seed']:
+            self.seed(options)
+        if not Order.objects.exists():
+            raise CommandError("No orders to benchmark")
+        
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        
+        queries = hot_queries()
+        results = {name: {} for name in queries}
+        
+        set_indexes(False)
+        try:
+            self.run_phase('without indexes', queries, results, options['repeat'])
+        finally:
+            set_indexes(True)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.run_phase('with indexes', queries, results, options['repeat'])
+        
+        self.stdout.write('')
+        self.stdout.write(f"{'query':<42} {'before p50':>11} {'after p50':>11} {'speedup':>8}")
+        for name, phases in results.items():
+            before = phases['without indexes']['median_ms']
+            after = phases['with indexes']['median_ms']
+            speedup = before / after if after else 0
+            self.stdout.write(f"{name:<42} {before:>9.2f}ms {after:>9.2f}ms {speedup:>7.1f}x")
+        
+        if options['json_path']:
+            with open(options['json_path'], 'w') as report:
+                json.dump({'vendor': connection.vendor, 'orders': Order.objects.count(), 'queries': results}, report, indent=2)
+    
+    def seed(self, options):
+        seeder = DatasetSeeder(seed=options['seed'], batch_size=options['batch_size'])
+        orders_count = options['orders']
+        started = time.perf_counter()
+        
+        users = seeder.seed_users(options['users'])
+        orders = seeder.seed_orders(users, orders_count)
+        seeder.seed_declarations(orders, orders_count // 10)
+        del orders
+        seeder.seed_tickets(users, orders_count // 20)
+        seeder.seed_news(users[0], max(orders_count // 1000, 10))
+        seeder.refresh_derived()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {orders_count} orders in {time.perf_counter() - started:.1f}s"
+        ))
+    
+    def run_phase(self, phase, queries, results, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {phase} =="))
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            timing = measure(queryset, repeat)
+            results[name][phase] = {'plan': plan, **timing}
+            self.stdout.write(f"{name}: p50 {timing['median_ms']:.2f}ms, p95 {timing['p95_ms']:.2f}ms")
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
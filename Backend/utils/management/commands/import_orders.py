@@ -0,0 +1,42 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.services import OrderImportService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import orders of one client from a CSV or JSON file in batches and report the throughput"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Email or id of the client owning the orders")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Detected from the file extension by default")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--show-errors', type=int, default=20, help="Number of row errors to print")
+    
+    def handle(self, *args, **options):
+        lookup = {'pk': options['user']} if options['user'].isdigit() else {'email': options['user']}
+        try:
+            user = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+        
+        import_format = options['format'] or ('json' if options['path'].lower().endswith('.json') else 'csv')
+        try:
+            with open(options['path'], 'rb') as source:
+                rows = OrderImportService.parse(source.read(), import_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        
+        report = OrderImportService.import_rows(rows, user, batch_size=options['batch_size'])
+        
+        for error in report['errors'][:options['show_errors']]:
+            self.stdout.write(self.style.WARNING(f"row {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} orders created, {report['failed']} rows failed "
+            f"in {report['elapsed_seconds']:.2f}s ({report['rows_per_second']} rows/s)"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from utils.search import SEARCH_INDEXES, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild full-text search indexes for news, tickets and declarations"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            help="Indexed models to rebuild (e.g. news.News), all by default"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        indexes = SEARCH_INDEXES
+        if options['models']:
+            unknown = set(options['models']) - set(SEARCH_INDEXES)
+            if unknown:
+                raise CommandError(f"No search index for: {', '.join(sorted(unknown))}")
+            indexes = {label: SEARCH_INDEXES[label] for label in options['models']}
+        
+        backend = get_search_backend(connection)
+        for label, index in indexes.items():
+            backend.create_index(index, connection)
+            count = backend.rebuild(index, connection, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{label}: {count} rows indexed"))
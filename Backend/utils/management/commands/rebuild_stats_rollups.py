@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.rollups import ROLLUP_SPECS
+
+
+class Command(BaseCommand):
+    help = "Rebuild statistics rollup tables from order, declaration and ticket rows"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            help="Rollup models to rebuild (e.g. orders.OrderStatsRollup), all by default"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        specs = ROLLUP_SPECS
+        if options['models']:
+            labels = {label.lower() for label in options['models']}
+            specs = [spec for spec in ROLLUP_SPECS if spec.rollup_model._meta.label_lower in labels]
+            if len(specs) != len(labels):
+                raise CommandError(f"Unknown rollup model in: {', '.join(options['models'])}")
+        
+        for spec in specs:
+            created = spec.rebuild(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{spec.rollup_model._meta.label}: {created} rows"))
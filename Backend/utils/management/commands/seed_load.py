@@ -0,0 +1,260 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from declarations.models import Declaration, DeclarationStatusUpdate
+from news.models import News
+from orders.models import Order, OrderStatusUpdate
+from support.models import SupportMessage, SupportTicket
+from utils.seeding import DatasetSeeder
+
+User = get_user_model()
+
+# Options taking a distribution, with the choices they weight
+DISTRIBUTIONS = {
+    'order_status': Order.ORDER_STATUS_CHOICES,
+    'delivery_status': Order.DELIVERY_STATUS_CHOICES,
+    'declaration_status': Declaration.DECLARATION_STATUS_CHOICES,
+    'ticket_status': SupportTicket.STATUS_CHOICES,
+    'ticket_priority': SupportTicket.PRIORITY_CHOICES,
+}
+
+
+def parse_weights(value, choices):
+    """'pending=5,delivered=2' as weights aligned with choices, unlisted choices get 0"""
+    if not value:
+        return None
+    weights = dict.fromkeys((key for key, _ in choices), 0.0)
+    for part in value.split(','):
+        key, _, weight = part.partition('=')
+        key = key.strip()
+        if key not in weights:
+            raise ValueError(f"unknown choice {key!r}, expected one of {', '.join(weights)}")
+        try:
+            weights[key] = float(weight)
+        except ValueError:
+            raise ValueError(f"weight of {key!r} is not a number")
+    if not any(weights.values()):
+        raise ValueError("at least one weight must be positive")
+    return list(weights.values())
+
+
+def split(total, chunk_size):
+    """(index, start, end) of consecutive chunks of at most chunk_size"""
+    return [
+        (index, start, min(start + chunk_size, total))
+        for index, start in enumerate(range(0, total, chunk_size))
+    ]
+
+
+# Worker processes. Each chunk gets its own seed derived from --seed and
+# its index, so the data does not depend on the number of workers.
+
+_worker = {}
+
+
+def init_worker(options, user_ids=(), close_connections=True):
+    if not apps.ready:
+        # Spawned workers start without Django
+        import django
+        django.setup()
+    if close_connections:
+        # Forked workers must not share the parent's connection
+        connections.close_all()
+    _worker['options'] = options
+    _worker['users'] = [User(pk=pk) for pk in user_ids]
+
+
+def chunk_seeder(phase, index):
+    options = _worker['options']
+    return DatasetSeeder(seed=f"{options['seed']}:{phase}:{index}", batch_size=options['batch_size'], now=options['now'])
+
+
+def seed_users_chunk(task):
+    index, start, count = task
+    chunk_seeder('users', index).seed_users(count, start=start)
+    return {'users': count}
+
+
+def seed_orders_chunk(task):
+    """Orders with their status updates, declarations and tickets of one chunk"""
+    options = _worker['options']
+    users = _worker['users']
+    seeder = chunk_seeder('orders', task['index'])
+    
+    orders = seeder.seed_orders(
+        users,
+        task['orders'],
+        status_weights=options['order_status'],
+        updates_per_order=options['updates_per_order'],
+        delivery_weights=options['delivery_status'],
+        start=task['order_start'],
+    )
+    if task['declarations']:
+        seeder.seed_declarations(
+            orders,
+            task['declarations'],
+            status_weights=options['declaration_status'],
+            start=task['declaration_start'],
+        )
+    if task['tickets']:
+        seeder.seed_tickets(
+            users,
+            task['tickets'],
+            messages_per_ticket=options['messages_per_ticket'],
+            status_weights=options['ticket_status'],
+            priority_weights=options['ticket_priority'],
+            start=task['ticket_start'],
+        )
+    return {'orders': task['orders'], 'declarations': task['declarations'], 'tickets': task['tickets']}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, orders, status updates, declarations, tickets with messages and news "
+        "for load tests, with bulk_create in parallel worker processes. Run it against a scratch database."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--declarations-per-order', type=float, default=0.1)
+        parser.add_argument('--tickets-per-order', type=float, default=0.05)
+        parser.add_argument('--updates-per-order', type=int, default=1, help="Average status updates per order")
+        parser.add_argument('--messages-per-ticket', type=int, default=3, help="Average messages per ticket")
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT")
+        parser.add_argument('--chunk-size', type=int, default=50000, help="Orders (or users) per worker task")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--skip-derived', action='store_true', help="Do not rebuild rollups and search indexes")
+        for name, choices in DISTRIBUTIONS.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                help=f"Weights such as {choices[0][0]}=5,{choices[1][0]}=1, default uniform"
+            )
+    
+    def handle(self, *args, **options):
+        worker_options = {
+            'seed': options['seed'],
+            'batch_size': options['batch_size'],
+            'now': timezone.now(),
+            'updates_per_order': options['updates_per_order'],
+            'messages_per_ticket': options['messages_per_ticket'],
+        }
+        for name, choices in DISTRIBUTIONS.items():
+            try:
+                worker_options[name] = parse_weights(options[name], choices)
+            except ValueError as e:
+                raise CommandError(f"--{name.replace('_', '-')}: {e}")
+        
+        workers = max(options['workers'], 1)
+        if connection.vendor == 'sqlite':
+            if workers > 1:
+                self.stdout.write("SQLite allows one writer at a time, seeding in this process")
+            workers = 1
+            if not connection.in_atomic_block:
+                # Scratch data, no need to wait for each commit to reach the disk
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA synchronous = OFF')
+        
+        started = time.perf_counter()
+        seeder = DatasetSeeder(seed=options['seed'], batch_size=options['batch_size'], now=worker_options['now'])
+        chunk_size = max(options['chunk_size'], 1)
+        
+        if options['users']:
+            start = seeder.next_number(User.objects, 'email', 'load')
+            tasks = [(index, start + first, end - first) for index, first, end in split(options['users'], chunk_size)]
+            self.run_phase('users', seed_users_chunk, tasks, workers, worker_options)
+        
+        user_ids = list(User.objects.filter(email__endswith='@load.test').values_list('pk', flat=True))
+        if options['orders'] and not user_ids:
+            raise CommandError("No seeded users to own the orders, pass --users")
+        
+        if options['orders']:
+            tasks = self.order_tasks(seeder, options, chunk_size)
+            self.run_phase('orders', seed_orders_chunk, tasks, workers, worker_options, user_ids)
+        
+        if options['news']:
+            phase_started = time.perf_counter()
+            author = User.objects.filter(pk__in=user_ids[:1]).first() or User.objects.filter(is_staff=True).first()
+            if author is None:
+                raise CommandError("No user to author the news, pass --users")
+            DatasetSeeder(seed=f"{options['seed']}:news", batch_size=options['batch_size'], now=worker_options['now']).seed_news(author, options['news'])
+            self.report('news', {'news': options['news']}, time.perf_counter() - phase_started)
+        
+        if not options['skip_derived']:
+            phase_started = time.perf_counter()
+            seeder.refresh_derived()
+            self.stdout.write(f"Rebuilt rollups and search indexes in {time.perf_counter() - phase_started:.1f}s")
+        
+        totals = ', '.join(
+            f"{model._meta.verbose_name_plural}: {model.objects.count()}"
+            for model in (User, Order, OrderStatusUpdate, Declaration, DeclarationStatusUpdate, SupportTicket, SupportMessage, News)
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s. {totals}"))
+    
+    def order_tasks(self, seeder, options, chunk_size):
+        """Chunks of orders with the declarations and tickets created alongside
+        
+        Declaration and ticket numbers are derived from the order range, so
+        each chunk knows its numbers without coordinating with the others.
+        """
+        order_base = seeder.next_number(Order.objects, 'order_number', 'LO-')
+        declaration_base = seeder.next_number(Declaration.objects, 'declaration_number', 'LD-')
+        ticket_base = seeder.next_number(SupportTicket.objects, 'ticket_number', 'LT-')
+        declaration_ratio = options['declarations_per_order']
+        ticket_ratio = options['tickets_per_order']
+        
+        tasks = []
+        for index, first, end in split(options['orders'], chunk_size):
+            declarations = (int(first * declaration_ratio), int(end * declaration_ratio))
+            tickets = (int(first * ticket_ratio), int(end * ticket_ratio))
+            tasks.append({
+                'index': index,
+                'orders': end - first,
+                'order_start': order_base + first,
+                'declarations': declarations[1] - declarations[0],
+                'declaration_start': declaration_base + declarations[0],
+                'tickets': tickets[1] - tickets[0],
+                'ticket_start': ticket_base + tickets[0],
+            })
+        return tasks
+    
+    def run_phase(self, phase, function, tasks, workers, worker_options, user_ids=()):
+        started = time.perf_counter()
+        totals = {}
+        
+        def add(counts):
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+        
+        if workers == 1 or len(tasks) == 1:
+            init_worker(worker_options, user_ids, close_connections=False)
+            for task in tasks:
+                add(function(task))
+        else:
+            # Children must open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                initializer=init_worker,
+                initargs=(worker_options, user_ids)
+            ) as executor:
+                for counts in executor.map(function, tasks):
+                    add(counts)
+                    self.stdout.write(f"  {phase}: {totals} ({time.perf_counter() - started:.0f}s)")
+        self.report(phase, totals, time.perf_counter() - started)
+    
+    def report(self, phase, totals, elapsed):
+        rows = sum(totals.values())
+        self.stdout.write(
+            f"Seeded {phase} ({', '.join(f'{key}: {value}' for key, value in totals.items())}) "
+            f"in {elapsed:.1f}s, {rows / elapsed if elapsed else 0:.0f} rows/s"
+        )
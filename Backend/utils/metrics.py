@@ -0,0 +1,341 @@
+import atexit
+import copy
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cached detail view to a slow export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# SMTP and SMS gateway round trips, PDF renders
+DELIVERY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """Metric family with one child per combination of label values"""
+    
+    type = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        self.registry = None
+    
+    def new_child(self):
+        raise NotImplementedError
+    
+    def empty(self):
+        """Metric family with the same definition and no values"""
+        family = copy.copy(self)
+        family.children = {}
+        family.lock = threading.Lock()
+        family.registry = None
+        return family
+    
+    def labels(self, *values):
+        """Child of the label values, created on first use"""
+        if self.registry is not None:
+            self.registry.start_writer()
+        return self.child(tuple(str(value) for value in values))
+    
+    def child(self, key):
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames)}")
+            with self.lock:
+                child = self.children.setdefault(key, self.new_child())
+        return child
+    
+    def samples(self):
+        raise NotImplementedError
+    
+    def dump(self):
+        """Values of the children, as JSON-compatible [label values, value] pairs"""
+        return [[list(key), child.dump()] for key, child in list(self.children.items())]
+    
+    def load(self, items):
+        """Add dumped values to the children"""
+        for key, value in items:
+            self.child(tuple(key)).add(value)
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{name}{labels} {format_value(value)}' for name, labels, value in self.samples())
+        return '\n'.join(lines)
+    
+    def clear(self):
+        with self.lock:
+            self.children.clear()
+
+
+class CounterValue:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+    
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+    
+    def dump(self):
+        return self.value
+    
+    def add(self, value):
+        self.inc(value)
+
+
+class Counter(Metric):
+    type = 'counter'
+    
+    def new_child(self):
+        return CounterValue()
+    
+    def samples(self):
+        for key, child in sorted(self.children.items()):
+            yield self.name, format_labels(self.labelnames, key), child.value
+
+
+class HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Observations per bucket, made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+    
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+    
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum
+    
+    def dump(self):
+        return self.snapshot()
+    
+    def add(self, value):
+        counts, total = value
+        with self.lock:
+            self.counts = [own + other for own, other in zip(self.counts, counts)]
+            self.sum += total
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def new_child(self):
+        return HistogramValue(self.buckets)
+    
+    def samples(self):
+        for key, child in sorted(self.children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', format_labels(self.labelnames, key, [('le', format_value(bound))]), cumulative
+            yield f'{self.name}_sum', format_labels(self.labelnames, key), total
+            yield f'{self.name}_count', format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    """Metrics in the Prometheus text exposition format
+    
+    Values live in process memory. With METRICS_DIR set every process (the
+    server's workers and Celery workers) also writes them to
+    METRICS_DIR/<pid>.json every METRICS_WRITE_INTERVAL seconds, and
+    collect() adds up the files of all processes, so a scrape sees the same
+    totals whichever worker answers it. Files of exited processes are kept
+    as their counts are part of the totals, the directory is emptied when
+    the whole service restarts.
+    """
+    
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.writer_pid = None
+    
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        metric.registry = self
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self):
+        return ''.join(f'{metric.render()}\n' for metric in self.metrics.values())
+    
+    def clear(self):
+        for metric in self.metrics.values():
+            metric.clear()
+    
+    # Aggregation across processes
+    
+    def dump(self):
+        return {name: metric.dump() for name, metric in self.metrics.items()}
+    
+    def empty(self):
+        """Registry with the same metrics and no values"""
+        registry = Registry()
+        registry.metrics = {name: metric.empty() for name, metric in self.metrics.items()}
+        return registry
+    
+    def write(self, directory):
+        """Write the values of this process to its file in directory"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as values_file:
+            json.dump(self.dump(), values_file)
+        # Readers never see a partly written file
+        os.replace(f'{path}.tmp', path)
+    
+    def collect(self):
+        """Registry with the values of every process, or this one without METRICS_DIR"""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self
+        
+        self.write(directory)
+        collected = self.empty()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as values_file:
+                    values = json.load(values_file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics file {name}: {str(e)}")
+                continue
+            for metric_name, items in values.items():
+                if metric_name in collected.metrics:
+                    collected.metrics[metric_name].load(items)
+        return collected
+    
+    def start_writer(self):
+        """Start the thread writing this process's values, once per process"""
+        pid = os.getpid()
+        if self.writer_pid == pid or not settings.METRICS_DIR:
+            return
+        with self.lock:
+            if self.writer_pid == pid:
+                return
+            if self.writer_pid is not None:
+                # Forked from a process that writes its own file, the
+                # inherited values would be counted twice
+                self.clear()
+            self.writer_pid = pid
+        threading.Thread(target=self.write_periodically, name='metrics-writer', daemon=True).start()
+    
+    def write_periodically(self):
+        atexit.register(self.write_current)
+        while True:
+            time.sleep(settings.METRICS_WRITE_INTERVAL)
+            self.write_current()
+    
+    def write_current(self):
+        directory = settings.METRICS_DIR
+        if not directory or self.writer_pid != os.getpid():
+            return
+        try:
+            self.write(directory)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {directory}: {str(e)}")
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'http_requests_total',
+    "HTTP requests by URL name, method and status code",
+    ['view', 'method', 'status'],
+)
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds',
+    "Time spent in the view and middleware, by URL name",
+    ['view', 'method'],
+)
+db_queries = registry.histogram(
+    'http_request_db_queries',
+    "SQL statements run per request, by URL name",
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_duration = registry.histogram(
+    'http_request_db_duration_seconds',
+    "Time spent in SQL per request, by URL name",
+    ['view'],
+)
+email_messages = registry.counter(
+    'email_messages_total',
+    "Emails handed to SMTP, by status (sent or failed)",
+    ['status'],
+)
+email_send_duration = registry.histogram(
+    'email_send_duration_seconds',
+    "SMTP delivery time of one email",
+    buckets=DELIVERY_BUCKETS,
+)
+sms_messages = registry.counter(
+    'sms_messages_total',
+    "SMS messages by status (sent or failed)",
+    ['status'],
+)
+sms_send_duration = registry.histogram(
+    'sms_send_duration_seconds',
+    "Gateway round trip of one SMS message",
+    buckets=DELIVERY_BUCKETS,
+)
+pdf_renders = registry.counter(
+    'pdf_renders_total',
+    "PDF documents by template type and result (rendered, cached or failed)",
+    ['template', 'result'],
+)
+pdf_render_duration = registry.histogram(
+    'pdf_render_duration_seconds',
+    "Time from submitting a PDF to its file being stored, by template type",
+    ['template'],
+    buckets=DELIVERY_BUCKETS,
+)
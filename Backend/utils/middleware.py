@@ -0,0 +1,210 @@
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with its values replaced, so repeats of one query with other
+    parameters (the N+1 pattern) group together"""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql.replace('%s', '?'))
+    sql = PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper timing every statement of a request"""
+    
+    def __init__(self):
+        self.queries = []
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+
+class RequestProfile:
+    """Query count, SQL time, duplicated and slowest statements of a request"""
+    
+    def __init__(self, queries, duration_ms, top=5):
+        self.duration_ms = duration_ms
+        self.query_count = len(queries)
+        self.sql_ms = sum(ms for _, ms in queries)
+        
+        groups = {}
+        for sql, ms in queries:
+            group = groups.setdefault(fingerprint(sql), [0, 0.0])
+            group[0] += 1
+            group[1] += ms
+        repeated = sorted(
+            ((sql, count, ms) for sql, (count, ms) in groups.items() if count > 1),
+            key=lambda item: (-item[1], -item[2])
+        )
+        # Executions beyond the first of each repeated statement
+        self.duplicate_count = sum(count - 1 for _, count, _ in repeated)
+        self.duplicates = [
+            {'sql': sql[:1000], 'count': count, 'ms': round(ms, 2)}
+            for sql, count, ms in repeated[:top]
+        ]
+        self.slowest = [
+            {'sql': sql[:1000], 'ms': round(ms, 2)}
+            for sql, ms in sorted(queries, key=lambda item: -item[1])[:top]
+        ]
+    
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.sql_ms:.2f};desc="{self.query_count} queries"',
+            f'db-dup;desc="{self.duplicate_count} duplicated"',
+            f'app;dur={self.duration_ms:.2f}',
+        ]
+        if self.slowest:
+            metrics.insert(1, f'db-slowest;dur={self.slowest[0]["ms"]:.2f}')
+        return ', '.join(metrics)
+
+
+class SQLProfilingMiddleware:
+    """Profile the SQL of every request when settings.SQL_PROFILING is on
+    
+    Each statement on every database connection is timed with an
+    execute_wrapper. The totals go to the Server-Timing header (visible in
+    the browser's network panel) and to a JSON log line, and requests
+    slower than SQL_PROFILING_SLOW_MS or running at least
+    SQL_PROFILING_SLOW_QUERIES queries are saved as SlowRequestLog rows.
+    Queries run while a streaming response is consumed are not counted.
+    Disabled, the middleware removes itself from the chain.
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SQL_PROFILING_SLOW_MS', 500)
+        self.slow_queries = getattr(settings, 'SQL_PROFILING_SLOW_QUERIES', 50)
+        self.buffer_size = getattr(settings, 'SQL_PROFILING_BUFFER_SIZE', 200)
+    
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        profile = RequestProfile(recorder.queries, (time.perf_counter() - started) * 1000)
+        
+        server_timing = profile.server_timing()
+        if response.has_header('Server-Timing'):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response['Server-Timing'] = server_timing
+        
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else ''
+        slow = profile.duration_ms >= self.slow_ms or profile.query_count >= self.slow_queries
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'duration_ms': round(profile.duration_ms, 2),
+            'queries': profile.query_count,
+            'sql_ms': round(profile.sql_ms, 2),
+            'duplicates': profile.duplicates,
+            'slowest': profile.slowest,
+        }))
+        
+        if slow:
+            self.save(request, response, view_name, profile)
+        return response
+    
+    def save(self, request, response, view_name, profile):
+        from .models import SlowRequestLog
+        
+        user = getattr(request, 'user', None)
+        try:
+            SlowRequestLog.record(
+                self.buffer_size,
+                method=request.method,
+                path=request.get_full_path()[:500],
+                view_name=view_name[:200],
+                status_code=response.status_code,
+                duration_ms=profile.duration_ms,
+                sql_ms=profile.sql_ms,
+                query_count=profile.query_count,
+                duplicate_count=profile.duplicate_count,
+                duplicates=profile.duplicates,
+                slowest_queries=profile.slowest,
+                user=user if user is not None and user.is_authenticated else None,
+            )
+        except Exception as e:
+            logger.error(f"Failed to save slow request {request.path}: {str(e)}")
+
+
+class QueryCounter:
+    """execute_wrapper counting and timing statements for the metrics"""
+    
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Request count, latency and SQL histograms for the /metrics endpoint
+    
+    Requests are labelled with the URL name of the view in the
+    METRICS_NAMESPACES apps, every other route with "other", which keeps the
+    number of series bounded. Recording costs a few counter updates per
+    request. Placed first in MIDDLEWARE so the latency covers the whole chain.
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.namespaces = set(getattr(settings, 'METRICS_NAMESPACES', ()))
+    
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        
+        view = self.view_label(request)
+        metrics.http_requests.labels(view, request.method, response.status_code).inc()
+        metrics.http_request_duration.labels(view, request.method).observe(duration)
+        metrics.db_queries.labels(view).observe(counter.count)
+        metrics.db_duration.labels(view).observe(counter.seconds)
+        return response
+    
+    def view_label(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or match.namespace not in self.namespaces:
+            return 'other'
+        return match.view_name
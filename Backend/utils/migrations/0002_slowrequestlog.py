@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequestLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Metod')),
+                ('path', models.CharField(max_length=500, verbose_name="Yo'l")),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Holat kodi')),
+                ('duration_ms', models.FloatField(verbose_name='Davomiyligi (ms)')),
+                ('sql_ms', models.FloatField(verbose_name='SQL vaqti (ms)')),
+                ('query_count', models.PositiveIntegerField(verbose_name="So'rovlar soni")),
+                ('duplicate_count', models.PositiveIntegerField(default=0, verbose_name="Takroriy so'rovlar")),
+                ('duplicates', models.JSONField(default=list, verbose_name="Takroriy so'rovlar")),
+                ('slowest_queries', models.JSONField(default=list, verbose_name="Eng sekin so'rovlar")),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': "Sekin so'rov",
+                'verbose_name_plural': "Sekin so'rovlar",
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -201,3 +201,67 @@ class PDFLog(models.Model):
     
     def __str__(self):
         return f"{self.template.name} - {self.status}"
+
+
+class SlowRequestLog(models.Model):
+    """Slow request recorded by SQLProfilingMiddleware
+    
+    Only the newest SQL_PROFILING_BUFFER_SIZE rows are kept.
+    """
+    
+    method = models.CharField(max_length=10, verbose_name="Metod")
+    path = models.CharField(max_length=500, verbose_name="Yo\'l")
+    view_name = models.CharField(max_length=200, blank=True, verbose_name="View")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Holat kodi")
+    
+    # Timings in milliseconds
+    duration_ms = models.FloatField(verbose_name="Davomiyligi (ms)")
+    sql_ms = models.FloatField(verbose_name="SQL vaqti (ms)")
+    query_count = models.PositiveIntegerField(verbose_name="So\'rovlar soni")
+    duplicate_count = models.PositiveIntegerField(default=0, verbose_name="Takroriy so\'rovlar")
+    duplicates = models.JSONField(default=list, verbose_name="Takroriy so\'rovlar")
+    slowest_queries = models.JSONField(default=list, verbose_name="Eng sekin so\'rovlar")
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Foydalanuvchi")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
+    
+    class Meta:
+        verbose_name = "Sekin so\'rov"
+        verbose_name_plural = "Sekin so\'rovlar"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration_ms:.0f}ms"
+    
+    @classmethod
+    def record(cls, buffer_size, **fields):
+        """Save a slow request and drop the rows beyond the newest buffer_size"""
+        log = cls.objects.create(**fields)
+        oldest_kept = list(cls.objects.order_by('-id').values_list('id', flat=True)[buffer_size - 1:buffer_size])
+        if oldest_kept:
+            cls.objects.filter(id__lt=oldest_kept[0]).delete()
+        return log
+
+
+class StatsRollup(models.Model):
+    """Base model for incrementally maintained daily statistics rollups
+    
+    Rows with an empty user hold the global totals across all users.
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Foydalanuvchi"
+    )
+    date = models.DateField(verbose_name="Sana")
+    count = models.IntegerField(default=0, verbose_name="Soni")
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+    
+    class Meta:
+        abstract = True
+        ordering = ['-date']
@@ -0,0 +1,334 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime, timezone as dt_timezone
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (cursor) pagination over an ordering that ends with a unique field
+    
+    Pages are selected with a WHERE clause on the last row of the previous
+    page instead of OFFSET, and no COUNT(*) query is issued, so every page
+    costs the same regardless of depth.
+    
+    The ordering comes from the view (get_keyset_ordering() or
+    keyset_ordering), otherwise from the queryset/model ordering with
+    related fields left out and id appended as tie-breaker.
+    """
+    
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = "Noto'g'ri kursor"
+    
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            return tuple(view.get_keyset_ordering())
+        if hasattr(view, 'keyset_ordering'):
+            return tuple(view.keyset_ordering)
+        return self.default_ordering(queryset)
+    
+    def default_ordering(self, queryset):
+        """Queryset ordering restricted to fields usable in a keyset
+        
+        Annotations (such as search_rank) are kept as they are. Nullable
+        fields are replaced by a null-safe annotation, see null_safe().
+        """
+        meta = queryset.model._meta
+        ordering = []
+        for field in queryset.query.order_by or meta.ordering:
+            if not isinstance(field, str):
+                continue
+            name = field.lstrip('-')
+            if name == 'pk' or name == meta.pk.name:
+                ordering.append(field)
+                return tuple(ordering)
+            if name in queryset.query.annotations:
+                ordering.append(field)
+                continue
+            if '__' in name or name == '?':
+                continue
+            model_field = meta.get_field(name)
+            if model_field.null:
+                alias = self.null_safe(queryset, model_field)
+                if alias is None:
+                    continue
+                field = field.replace(name, alias)
+            ordering.append(field)
+        
+        descending = bool(ordering) and ordering[0].startswith('-')
+        ordering.append('-id' if descending else 'id')
+        return tuple(ordering)
+    
+    def null_safe(self, queryset, field):
+        """Alias of field with NULL replaced by a value sorting where the
+        database sorts NULL, so cursor pages keep the order of page numbers
+        
+        Returns None for field types without such a value.
+        """
+        largest = connections[queryset.db].features.nulls_order_largest
+        if isinstance(field, models.DateTimeField):
+            sentinel = datetime.max if largest else datetime.min
+            if settings.USE_TZ:
+                sentinel = sentinel.replace(tzinfo=dt_timezone.utc)
+        elif isinstance(field, models.DateField):
+            sentinel = date.max if largest else date.min
+        elif isinstance(field, (models.IntegerField, models.FloatField, models.DecimalField)):
+            # Beyond any value the column holds in practice
+            sentinel = 2 ** 62 if largest else -2 ** 62
+        else:
+            return None
+        alias = f'keyset_{field.name}'
+        self.annotations[alias] = Coalesce(field.name, Value(sentinel, output_field=field), output_field=field)
+        return alias
+    
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+    
+    # Cursor encoding
+    
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': int(reverse)}, default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering_fields):
+            raise NotFound(self.invalid_cursor_message)
+        
+        try:
+            values = [field.to_python(value) for field, value in zip(self.model_fields, values)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+    
+    # Filtering
+    
+    def keyset_filter(self, values, reverse):
+        """Rows strictly after (or before, when reverse) the given position"""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering_fields):
+            forward = descending != reverse
+            step = Q(**{f'{name}__{"lt" if forward else "gt"}': values[index]})
+            for previous_index in range(index):
+                step &= Q(**{self.field_names[previous_index]: values[previous_index]})
+            condition |= step
+        return condition
+    
+    def row_position(self, row):
+        position = []
+        for name in self.field_names:
+            value = getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+    
+    def get_field(self, queryset, name):
+        """Model field or annotation output field used to parse cursor values"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        meta = queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+        
+        self.annotations = {}
+        ordering = self.get_ordering(request, queryset, view)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        self.ordering_fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.field_names = [name for name, _ in self.ordering_fields]
+        self.model_fields = [self.get_field(queryset, name) for name in self.field_names]
+        
+        values, reverse = self.decode_cursor(request)
+        
+        order_by = [
+            f'{"-" if descending != reverse else ""}{name}' for name, descending in self.ordering_fields
+        ]
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+        
+        # Fetch one extra row to know whether another page exists
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+        
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        self.first_position = self.row_position(rows[0]) if rows else None
+        self.last_position = self.row_position(rows[-1]) if rows else None
+        return rows
+    
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.last_position, False))
+    
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.first_position, True))
+    
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator that reuses a row count the view has already computed"""
+    
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_count = count
+    
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return super().count
+
+
+class StandardPagination(PageNumberPagination):
+    """Default pagination of list endpoints
+    
+    Page numbers with a total count by default. ?pagination=cursor (or a
+    cursor parameter) switches to keyset pagination, and ?count=false keeps
+    page numbers but skips the COUNT(*) query, returning count as null.
+    Views that already counted the rows can set known_count to reuse it.
+    """
+    
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    keyset_class = KeysetPagination
+    
+    def get_mode(self, request):
+        """'cursor', 'uncounted' or 'page', from the query parameters"""
+        use_keyset = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+        if use_keyset:
+            return 'cursor'
+        if request.query_params.get(self.count_query_param, '').lower() in ('0', 'false', 'no'):
+            return 'uncounted'
+        return 'page'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.counted = True
+        
+        mode = self.get_mode(request)
+        if mode == 'cursor':
+            self.keyset = self.keyset_class()
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        
+        if mode == 'uncounted':
+            self.counted = False
+            return self.paginate_without_count(queryset, request, view)
+        
+        self.django_paginator_class = partial(KnownCountPaginator, count=getattr(view, 'known_count', None))
+        return super().paginate_queryset(queryset, request, view)
+    
+    def paginate_without_count(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message="Invalid page."))
+        
+        # One extra row tells whether a next page exists
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and page_number > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message="That page contains no results"))
+        
+        self.request = request
+        self.page_number = page_number
+        self.has_next = len(rows) > page_size
+        self.display_page_controls = False
+        return rows[:page_size]
+    
+    def get_next_link(self):
+        if self.counted:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+    
+    def get_previous_link(self):
+        if self.counted:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.counted:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,177 @@
+import hashlib
+import html
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TAG_RE = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.S | re.I)
+BLOCK_RE = re.compile(r'<(br|/p|/div|/h\d|/li|/tr)\b[^>]*>', re.I)
+
+
+# Renderers, called in the worker processes with the HTML of one document
+
+def fetch_resource(url, **kwargs):
+    """WeasyPrint URL fetcher limited to data: URLs and PDF_ALLOWED_HOSTS
+    
+    Templates and their values must not make the renderer read local files
+    (file://) or reach internal services.
+    """
+    parts = urlsplit(url)
+    allowed = parts.scheme == 'data' or (
+        parts.scheme in ('http', 'https') and parts.hostname in settings.PDF_ALLOWED_HOSTS
+    )
+    if not allowed:
+        raise ValueError(f"PDF resource {url} is not allowed")
+    
+    from weasyprint import default_url_fetcher
+    return default_url_fetcher(url, **kwargs)
+
+
+def render_weasyprint(html_content):
+    # Imported lazily, WeasyPrint needs the Pango system libraries
+    from weasyprint import HTML
+    return HTML(string=html_content, url_fetcher=fetch_resource).write_pdf()
+
+
+def render_text(html_content):
+    """Plain text rendering of the HTML with ReportLab, for hosts without Pango"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    
+    text = html.unescape(TAG_RE.sub('', BLOCK_RE.sub('\n', html_content)))
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+    y = height - 50
+    for line in lines:
+        if y < 50:
+            pdf.showPage()
+            y = height - 50
+        pdf.drawString(50, y, line[:110])
+        y -= 16
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_html(html_content, renderer):
+    return import_string(renderer)(html_content)
+
+
+# Worker pool
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_pdf_executor():
+    """Shared process pool of PDF_WORKERS processes, None renders in-process"""
+    global _executor
+    workers = getattr(settings, 'PDF_WORKERS', 0)
+    if not workers:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def shutdown_pdf_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+# Content-addressed storage
+
+class StoredPDF:
+    """PDF file saved in default_storage"""
+    
+    def __init__(self, path, size, cached, duration=0.0):
+        self.path = path
+        self.size = size
+        self.cached = cached
+        # Seconds from render_pdf() to the file being stored
+        self.duration = duration
+
+
+def get_renderer():
+    return getattr(settings, 'PDF_RENDERER', 'utils.pdf.render_weasyprint')
+
+
+def pdf_storage_path(html_content, renderer=None):
+    """Storage name of the PDF of html_content, the same HTML maps to the same file
+    
+    The HTML already contains the template version (its text and styles)
+    and the context values, so identical documents share one file.
+    """
+    digest = hashlib.sha256(f'{renderer or get_renderer()}\n{html_content}'.encode()).hexdigest()
+    directory = getattr(settings, 'PDF_CACHE_DIR', 'pdf')
+    return f'{directory}/{digest[:2]}/{digest}.pdf'
+
+
+def render_pdf(html_content):
+    """Future of the StoredPDF for html_content
+    
+    A PDF rendered before is served from storage. Otherwise the HTML is
+    rendered in the worker pool and the bytes saved to default_storage
+    (MEDIA_ROOT) once the worker is done, so the caller can submit many
+    documents before waiting for any of them.
+    """
+    started = time.perf_counter()
+    renderer = get_renderer()
+    path = pdf_storage_path(html_content, renderer)
+    result = Future()
+    
+    if default_storage.exists(path):
+        result.set_result(StoredPDF(path, default_storage.size(path), cached=True))
+        return result
+    
+    def store(rendered):
+        try:
+            content = rendered.result()
+            if default_storage.exists(path):
+                # Rendered concurrently by another request
+                name = path
+            else:
+                name = default_storage.save(path, ContentFile(content))
+            result.set_result(StoredPDF(name, len(content), cached=False, duration=time.perf_counter() - started))
+        except Exception as e:
+            result.set_exception(e)
+    
+    executor = get_pdf_executor()
+    if executor is None:
+        rendered = Future()
+        try:
+            rendered.set_result(render_html(html_content, renderer))
+        except Exception as e:
+            rendered.set_exception(e)
+        store(rendered)
+    else:
+        executor.submit(render_html, html_content, renderer).add_done_callback(store)
+    return result
+
+
+def pdf_file_response(pdf_log, filename):
+    """Download response streaming the stored file of a generated PDFLog"""
+    return FileResponse(
+        default_storage.open(pdf_log.file_path, 'rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type='application/pdf'
+    )
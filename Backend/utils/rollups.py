@@ -0,0 +1,217 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Registered rollup specs, used by the rebuild command
+ROLLUP_SPECS = []
+
+
+def rollup_date(value):
+    """Local calendar date used as the rollup bucket for a timestamp"""
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def apply_rollup_delta(rollup_model, user_id, date, dimensions, count, values=None):
+    """Add count/values to the user's bucket and the global bucket"""
+    values = values or {}
+    
+    for scope_user_id in (user_id, None):
+        lookup = {'user_id': scope_user_id, 'date': date, **dimensions}
+        updates = {'count': F('count') + count}
+        for field, amount in values.items():
+            updates[field] = F(field) + amount
+        
+        if rollup_model.objects.filter(**lookup).update(**updates):
+            continue
+        
+        # A decrement without an existing bucket means the row was recorded
+        # before rollups existed or the user is being deleted
+        if count < 0:
+            continue
+        
+        try:
+            with transaction.atomic():
+                rollup_model.objects.create(count=count, **values, **lookup)
+        except IntegrityError:
+            # Created concurrently by another request
+            rollup_model.objects.filter(**lookup).update(**updates)
+
+
+class RollupSpec:
+    """Describe how rows of a source model are counted in a rollup model
+    
+    dimensions are field names copied from the source row into the rollup,
+    value_fields maps rollup sum columns to source fields.
+    
+    A save moves the row from the bucket stored in the database to the one
+    of the instance. Inside a transaction the stored row is read with
+    SELECT ... FOR UPDATE, so concurrent saves of the same row are applied
+    one after the other. Saves in autocommit mode cannot hold that lock and
+    two of them racing on one row can leave a bucket off by one; the
+    rebuild_stats_rollups command recomputes the tables from the rows.
+    """
+    
+    def __init__(self, source_model, rollup_model, date_field, dimensions, value_fields=None):
+        self.source_model = source_model
+        self.rollup_model = rollup_model
+        self.date_field = date_field
+        self.dimensions = list(dimensions)
+        self.value_fields = dict(value_fields or {})
+        self.tracked_fields = ['user_id', date_field, *self.dimensions, *self.value_fields.values()]
+    
+    def snapshot(self, instance, stored=False):
+        """Bucket and values of an instance, or None if it is not counted
+        
+        Instances without a pk are not counted unless stored is set, for
+        rows inserted by bulk_create on backends that do not return pks.
+        """
+        if (instance.pk is None and not stored) or getattr(instance, self.date_field) is None:
+            return None
+        
+        dimensions = {field: getattr(instance, field) for field in self.dimensions}
+        values = {
+            rollup_field: getattr(instance, source_field) or 0
+            for rollup_field, source_field in self.value_fields.items()
+        }
+        return (instance.user_id, rollup_date(getattr(instance, self.date_field)), dimensions, values)
+    
+    def apply(self, old, new):
+        """Move a row from the old bucket to the new one"""
+        if old == new:
+            return
+        
+        if old is not None:
+            user_id, date, dimensions, values = old
+            apply_rollup_delta(
+                self.rollup_model, user_id, date, dimensions, -1,
+                {field: -value for field, value in values.items()}
+            )
+        
+        if new is not None:
+            user_id, date, dimensions, values = new
+            apply_rollup_delta(self.rollup_model, user_id, date, dimensions, 1, values)
+    
+    def apply_bulk(self, old_rows, new_rows):
+        """Apply changes made with bulk_create or queryset.update()
+        
+        old_rows/new_rows are lists of snapshots, None for rows that are not
+        counted; deltas are merged per bucket so that each bucket is written
+        once.
+        """
+        deltas = {}
+        for rows, sign in ((old_rows, -1), (new_rows, 1)):
+            for user_id, date, dimensions, values in filter(None, rows):
+                key = (user_id, date, tuple(sorted(dimensions.items())))
+                count, sums = deltas.get(key, (0, {}))
+                for field, value in values.items():
+                    sums[field] = sums.get(field, 0) + sign * value
+                deltas[key] = (count + sign, sums)
+        
+        for (user_id, date, dimensions), (count, sums) in deltas.items():
+            if count == 0 and not any(sums.values()):
+                continue
+            apply_rollup_delta(self.rollup_model, user_id, date, dict(dimensions), count, sums)
+    
+    # Signal handlers
+    
+    def handle_pre_save(self, sender, instance, raw=False, using=None, **kwargs):
+        if raw or instance.pk is None:
+            return
+        
+        # The bucket the row is counted in now, read only when a row is
+        # saved so that loading rows (lists, exports) costs nothing
+        rows = sender._base_manager.using(using)
+        if transaction.get_connection(using).in_atomic_block:
+            # Locked until the save's transaction ends, after post_save
+            rows = rows.select_for_update()
+        stored = rows.filter(pk=instance.pk).first()
+        instance._rollup_snapshot = self.snapshot(stored) if stored else None
+    
+    def handle_post_save(self, sender, instance, created=False, raw=False, **kwargs):
+        if raw:
+            return
+        
+        old = instance.__dict__.pop('_rollup_snapshot', None)
+        self.apply(None if created else old, self.snapshot(instance))
+    
+    def handle_post_delete(self, sender, instance, **kwargs):
+        self.apply(self.snapshot(instance), None)
+    
+    def connect(self):
+        uid = f'rollup_{self.rollup_model._meta.label_lower}'
+        pre_save.connect(self.handle_pre_save, sender=self.source_model, weak=False, dispatch_uid=uid)
+        post_save.connect(self.handle_post_save, sender=self.source_model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.handle_post_delete, sender=self.source_model, weak=False, dispatch_uid=uid)
+    
+    # Rebuild
+    
+    def rebuild(self, batch_size=1000):
+        """Recompute the rollup table from the source rows"""
+        with transaction.atomic():
+            self.rollup_model.objects.all().delete()
+            
+            sums = {field: Sum(source) for field, source in self.value_fields.items()}
+            base = (
+                self.source_model._base_manager.order_by()
+                .annotate(rollup_date=TruncDate(self.date_field))
+            )
+            
+            created = 0
+            for group_fields, with_user in ((['user_id'], True), ([], False)):
+                rows = base.values(*group_fields, 'rollup_date', *self.dimensions).annotate(
+                    rollup_count=Count('pk'), **sums
+                )
+                
+                batch = []
+                for row in rows.iterator(chunk_size=batch_size):
+                    batch.append(self.rollup_model(
+                        user_id=row['user_id'] if with_user else None,
+                        date=row['rollup_date'],
+                        count=row['rollup_count'],
+                        **{field: row[field] for field in self.dimensions},
+                        **{field: row[field] or 0 for field in self.value_fields},
+                    ))
+                    if len(batch) >= batch_size:
+                        self.rollup_model.objects.bulk_create(batch)
+                        created += len(batch)
+                        batch = []
+                
+                if batch:
+                    self.rollup_model.objects.bulk_create(batch)
+                    created += len(batch)
+        
+        logger.info(f"Rebuilt {self.rollup_model._meta.label} with {created} rows")
+        return created
+
+
+def register_rollup(source_model, rollup_model, date_field, dimensions, value_fields=None):
+    """Create, connect and register a rollup spec"""
+    spec = RollupSpec(source_model, rollup_model, date_field, dimensions, value_fields)
+    spec.connect()
+    ROLLUP_SPECS.append(spec)
+    return spec
+
+
+def get_rollup_spec(rollup_model):
+    for spec in ROLLUP_SPECS:
+        if spec.rollup_model is rollup_model:
+            return spec
+    raise LookupError(f"No rollup registered for {rollup_model._meta.label}")
+
+
+def aggregate_rollup(rollup_model, user=None, date_from=None, date_to=None, **aggregates):
+    """Aggregate rollup buckets of one user, or the global buckets when user is None"""
+    queryset = rollup_model.objects.filter(user=user)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset.aggregate(**aggregates)
@@ -0,0 +1,281 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+# Apostrophe variants used in Uzbek Latin (oʻ, gʻ, sanʼat, ...). They are
+# removed before indexing and querying so that "o'zbek", "oʻzbek" and
+# "ozbek" all produce the same token instead of being split in two.
+APOSTROPHES = "'`´ʻʼ‘’"
+APOSTROPHE_TABLE = str.maketrans('', '', APOSTROPHES)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Registered search indexes, keyed by model label
+SEARCH_INDEXES = {}
+
+
+def normalize_text(value):
+    """Text as stored in the search index"""
+    return str(value or '').translate(APOSTROPHE_TABLE)
+
+
+def query_terms(query):
+    """Search terms of a user query"""
+    return TOKEN_RE.findall(normalize_text(query).lower())
+
+
+class SearchIndex:
+    """Full-text index over text fields of a model"""
+    
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = list(fields)
+    
+    @property
+    def db_table(self):
+        return self.model._meta.db_table
+    
+    @property
+    def index_table(self):
+        return f'{self.db_table}_fts'
+    
+    @property
+    def pk_column(self):
+        return self.model._meta.pk.column
+    
+    def columns(self):
+        return [self.model._meta.get_field(field).column for field in self.fields]
+    
+    def document(self, instance):
+        return [normalize_text(getattr(instance, field)) for field in self.fields]
+
+
+class LikeSearchBackend:
+    """Fallback backend using icontains lookups, without ranking"""
+    
+    ranked = False
+    
+    def create_index(self, index, connection):
+        pass
+    
+    def drop_index(self, index, connection):
+        pass
+    
+    def update(self, index, instance, connection):
+        pass
+    
+    def remove(self, index, pk, connection):
+        pass
+    
+    def rebuild(self, index, connection, batch_size=1000):
+        return 0
+    
+    def search(self, index, queryset, query):
+        condition = Q()
+        for field in index.fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+
+class SQLiteFTSBackend(LikeSearchBackend):
+    """SQLite FTS5 virtual tables kept in sync from model signals"""
+    
+    ranked = True
+    
+    def create_index(self, index, connection):
+        columns = ', '.join(index.columns())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{index.index_table}" '
+                f'USING fts5({columns}, tokenize="unicode61 remove_diacritics 2")'
+            )
+    
+    def drop_index(self, index, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{index.index_table}"')
+    
+    def update(self, index, instance, connection):
+        columns = index.columns()
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO "{index.index_table}" (rowid, {", ".join(columns)}) VALUES ({placeholders})',
+                [instance.pk, *index.document(instance)]
+            )
+    
+    def remove(self, index, pk, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{index.index_table}" WHERE rowid = %s', [pk])
+    
+    def rebuild(self, index, connection, batch_size=1000):
+        columns = index.columns()
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        insert = f'INSERT INTO "{index.index_table}" (rowid, {", ".join(columns)}) VALUES ({placeholders})'
+        
+        count = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{index.index_table}"')
+            rows = index.model._base_manager.order_by().values_list('pk', *index.fields)
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append([row[0], *(normalize_text(value) for value in row[1:])])
+                if len(batch) >= batch_size:
+                    cursor.executemany(insert, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                count += len(batch)
+        return count
+    
+    def match_expression(self, query):
+        # Every term is a quoted prefix query, terms are AND-ed
+        terms = query_terms(query)
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    
+    def search(self, index, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        
+        table = f'"{index.index_table}"'
+        outer_pk = f'"{index.db_table}"."{index.pk_column}"'
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [expression])
+        ).annotate(
+            # bm25 is lower for better matches, negate it so higher is better
+            search_rank=RawSQL(
+                f'(SELECT -rank FROM {table} WHERE {table} MATCH %s AND rowid = {outer_pk})',
+                [expression],
+                output_field=FloatField()
+            )
+        )
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """PostgreSQL tsvector generated column with a GIN index"""
+    
+    ranked = True
+    config = 'simple'
+    
+    def vector_sql(self, index):
+        parts = " || ' ' || ".join(f'coalesce("{column}", \'\')' for column in index.columns())
+        quoted = APOSTROPHES.replace("'", "''")
+        return f"to_tsvector('{self.config}', translate({parts}, '{quoted}', ''))"
+    
+    def create_index(self, index, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE "{index.db_table}" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({self.vector_sql(index)}) STORED'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index.db_table}_search_gin" '
+                f'ON "{index.db_table}" USING GIN (search_vector)'
+            )
+    
+    def drop_index(self, index, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS "{index.db_table}_search_gin"')
+            cursor.execute(f'ALTER TABLE "{index.db_table}" DROP COLUMN IF EXISTS search_vector')
+    
+    def tsquery(self, query):
+        # Terms only contain word characters, each one is a prefix match
+        return ' & '.join(f'{term}:*' for term in query_terms(query))
+    
+    def search(self, index, queryset, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        
+        vector = f'"{index.db_table}".search_vector'
+        return queryset.filter(
+            RawSQL(f"{vector} @@ to_tsquery('{self.config}', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({vector}, to_tsquery('{self.config}', %s))",
+                [tsquery],
+                output_field=FloatField()
+            )
+        )
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+# Backend instances per (database alias, SEARCH_BACKEND setting)
+_backends = {}
+
+
+def get_search_backend(connection=None):
+    """Search backend for the configured database engine"""
+    connection = connection or default_connection
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    key = (connection.alias, name)
+    
+    if key not in _backends:
+        if name == 'like':
+            backend = LikeSearchBackend()
+        elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+            backend = SQLiteFTSBackend()
+        elif connection.vendor == 'postgresql':
+            backend = PostgresSearchBackend()
+        else:
+            backend = LikeSearchBackend()
+        _backends[key] = backend
+    return _backends[key]
+
+
+def create_search_index(index, connection, rebuild=True):
+    """Create the index storage and fill it from existing rows (used by migrations)"""
+    backend = get_search_backend(connection)
+    backend.create_index(index, connection)
+    if rebuild:
+        backend.rebuild(index, connection)
+
+
+def drop_search_index(index, connection):
+    get_search_backend(connection).drop_index(index, connection)
+
+
+def register_search_index(model, fields):
+    """Register a model's text fields and keep its index in sync on save/delete"""
+    index = SearchIndex(model, fields)
+    SEARCH_INDEXES[model._meta.label] = index
+    
+    def handle_post_save(sender, instance, raw=False, **kwargs):
+        if not raw:
+            get_search_backend().update(index, instance, default_connection)
+    
+    def handle_post_delete(sender, instance, **kwargs):
+        get_search_backend().remove(index, instance.pk, default_connection)
+    
+    uid = f'search_index_{model._meta.label_lower}'
+    post_save.connect(handle_post_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handle_post_delete, sender=model, weak=False, dispatch_uid=uid)
+    return index
+
+
+def search_queryset(queryset, query):
+    """Filter a queryset by a full-text query
+    
+    Ranked backends annotate search_rank (higher is better) and order by it.
+    """
+    index = SEARCH_INDEXES.get(queryset.model._meta.label)
+    if index is None:
+        raise LookupError(f"No search index registered for {queryset.model._meta.label}")
+    
+    backend = get_search_backend()
+    results = backend.search(index, queryset, query)
+    if backend.ranked:
+        results = results.order_by('-search_rank', '-pk')
+    return results
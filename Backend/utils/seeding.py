@@ -0,0 +1,304 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from declarations.models import Declaration
+from news.models import FAQ, CompanyInfo, News, NewsCategory, Service
+from orders.models import Order, OrderStatusUpdate
+from support.models import SupportCategory, SupportMessage, SupportTemplate, SupportTicket
+
+from .rollups import ROLLUP_SPECS
+from .search import SEARCH_INDEXES, get_search_backend
+
+User = get_user_model()
+
+PRODUCTS = [
+    'Smartfon', 'Noutbuk', 'Kir yuvish mashinasi', 'Televizor', 'Muzlatkich',
+    'Avtomobil ehtiyot qismlari', 'Kiyim-kechak', 'Poyabzal', 'Kosmetika', 'Kitoblar',
+]
+CITIES = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Namangan', 'Fargʻona', 'Nukus', 'Qarshi']
+WORDS = [
+    'bojxona', 'yetkazish', 'buyurtma', 'deklaratsiya', 'toʻlov', 'hujjat', 'tezkor',
+    'xalqaro', 'ombor', 'yuk', 'kuryer', 'xizmat', 'mijoz', 'narx', 'muddat', 'oʻzgarish',
+]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Keep auto_now/auto_now_add values set on the instances during bulk_create"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class DatasetSeeder:
+    """Generate synthetic rows with bulk_create for benchmarks and load tests
+    
+    Rows are numbered with fixed prefixes (load<N>@load.test, LO-/LD-/LT-<N>)
+    continuing after previously seeded rows, or from an explicit start so
+    several seeders can fill disjoint ranges. The same seed and now always
+    produce the same data. bulk_create skips model signals, call
+    refresh_derived() afterwards to rebuild rollups and search indexes.
+    """
+    
+    def __init__(self, seed=42, batch_size=5000, days=365, now=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+        self.now = now or timezone.now()
+        self.password = make_password(None)
+    
+    def timestamp(self):
+        """Random moment within the last self.days days"""
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+    
+    def weighted(self, choices, weights=None):
+        values = [value for value, _ in choices]
+        return self.rng.choices(values, weights=weights)[0]
+    
+    def write(self, model, rows):
+        """bulk_create rows from an iterable in batches, returning the saved instances"""
+        created = []
+        batch = []
+        with explicit_timestamps(model), transaction.atomic():
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    created.extend(model.objects.bulk_create(batch))
+                    batch = []
+            if batch:
+                created.extend(model.objects.bulk_create(batch))
+        return created
+    
+    @staticmethod
+    def next_number(queryset, field, prefix):
+        return queryset.filter(**{f'{field}__startswith': prefix}).count()
+    
+    # Generators
+    
+    def seed_users(self, count, start=None):
+        if start is None:
+            start = self.next_number(User.objects, 'email', 'load')
+        
+        def rows():
+            for number in range(start, start + count):
+                created = self.timestamp()
+                yield User(
+                    username=f'load{number}',
+                    email=f'load{number}@load.test',
+                    password=self.password,
+                    first_name='Mijoz',
+                    last_name=str(number),
+                    client_code=f'L{number:09d}',
+                    city=self.rng.choice(CITIES),
+                    date_joined=created,
+                    created_at=created,
+                    updated_at=created,
+                )
+        return self.write(User, rows())
+    
+    def seed_orders(self, users, count, status_weights=None, updates_per_order=1, delivery_weights=None, start=None):
+        if start is None:
+            start = self.next_number(Order.objects, 'order_number', 'LO-')
+        
+        def rows():
+            for number in range(start, start + count):
+                quantity = self.rng.randint(1, 10)
+                unit_price = Decimal(self.rng.randrange(100, 100000)) / 100
+                ordered = self.timestamp()
+                yield Order(
+                    order_number=f'LO-{number:012d}',
+                    user=self.rng.choice(users),
+                    product_name=self.rng.choice(PRODUCTS),
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    total_price=unit_price * quantity,
+                    status=self.weighted(Order.ORDER_STATUS_CHOICES, status_weights),
+                    delivery_status=self.weighted(Order.DELIVERY_STATUS_CHOICES, delivery_weights),
+                    delivery_address=self.rng.choice(CITIES),
+                    delivery_phone='+998901234567',
+                    order_date=ordered,
+                    updated_at=ordered,
+                )
+        orders = self.write(Order, rows())
+        
+        def updates():
+            for order in orders:
+                for step in range(self.rng.randint(0, 2 * updates_per_order)):
+                    yield OrderStatusUpdate(
+                        order=order,
+                        status=order.status,
+                        delivery_status=order.delivery_status,
+                        updated_at=order.order_date + timedelta(hours=step + 1),
+                    )
+        self.write(OrderStatusUpdate, updates())
+        return orders
+    
+    def seed_declarations(self, orders, count, status_weights=None, start=None):
+        if start is None:
+            start = self.next_number(Declaration.objects, 'declaration_number', 'LD-')
+        
+        def rows():
+            for number in range(start, start + count):
+                order = self.rng.choice(orders)
+                created = order.order_date + timedelta(hours=self.rng.randint(1, 48))
+                yield Declaration(
+                    declaration_number=f'LD-{number:012d}',
+                    user_id=order.user_id,
+                    order=order,
+                    declaration_type=self.weighted(Declaration.DECLARATION_TYPE_CHOICES),
+                    status=self.weighted(Declaration.DECLARATION_STATUS_CHOICES, status_weights),
+                    passport_series='AA',
+                    passport_number=f'{number % 10000000:07d}',
+                    passport_issue_date=created.date() - timedelta(days=2000),
+                    passport_expiry_date=created.date() + timedelta(days=1650),
+                    passport_issuing_authority='IIV',
+                    contact_name=f'Mijoz {order.user_id}',
+                    contact_phone='+998901234567',
+                    contact_email=f'load{order.user_id}@load.test',
+                    delivery_address=order.delivery_address,
+                    delivery_country='Oʻzbekiston',
+                    delivery_city=self.rng.choice(CITIES),
+                    product_name=order.product_name,
+                    product_description=' '.join(self.rng.choices(WORDS, k=12)),
+                    product_quantity=order.quantity,
+                    product_unit='dona',
+                    product_value=order.total_price,
+                    created_at=created,
+                    updated_at=created,
+                )
+        return self.write(Declaration, rows())
+    
+    def seed_tickets(self, users, count, messages_per_ticket=3, status_weights=None, priority_weights=None, start=None):
+        if start is None:
+            start = self.next_number(SupportTicket.objects, 'ticket_number', 'LT-')
+        
+        def rows():
+            for number in range(start, start + count):
+                created = self.timestamp()
+                status = self.weighted(SupportTicket.STATUS_CHOICES, status_weights)
+                yield SupportTicket(
+                    ticket_number=f'LT-{number:012d}',
+                    user=self.rng.choice(users),
+                    subject=' '.join(self.rng.choices(WORDS, k=4)).capitalize(),
+                    description=' '.join(self.rng.choices(WORDS, k=30)),
+                    ticket_type=self.weighted(SupportTicket.TICKET_TYPE_CHOICES),
+                    priority=self.weighted(SupportTicket.PRIORITY_CHOICES, priority_weights),
+                    status=status,
+                    created_at=created,
+                    updated_at=created,
+                    resolved_at=created + timedelta(days=1) if status == 'resolved' else None,
+                    closed_at=created + timedelta(days=2) if status == 'closed' else None,
+                )
+        tickets = self.write(SupportTicket, rows())
+        
+        def messages():
+            for ticket in tickets:
+                for step in range(self.rng.randint(1, 2 * messages_per_ticket - 1)):
+                    created = ticket.created_at + timedelta(hours=step * self.rng.randint(1, 12))
+                    from_customer = step % 2 == 0
+                    yield SupportMessage(
+                        ticket=ticket,
+                        sender_id=ticket.user_id,
+                        message_type='customer' if from_customer else 'staff',
+                        message=' '.join(self.rng.choices(WORDS, k=20)),
+                        created_at=created,
+                        updated_at=created,
+                    )
+        self.write(SupportMessage, messages())
+        return tickets
+    
+    def seed_news(self, author, count, start=None):
+        category, _ = NewsCategory.objects.get_or_create(slug='load', defaults={'name': 'Yuklama'})
+        if start is None:
+            start = self.next_number(News.objects, 'slug', 'load-')
+        
+        def rows():
+            for number in range(start, start + count):
+                created = self.timestamp()
+                status = self.weighted(News.STATUS_CHOICES, [1, 8, 1])
+                yield News(
+                    title=' '.join(self.rng.choices(WORDS, k=6)).capitalize(),
+                    slug=f'load-{number}',
+                    content=' '.join(self.rng.choices(WORDS, k=200)),
+                    excerpt=' '.join(self.rng.choices(WORDS, k=20)),
+                    category=category,
+                    status=status,
+                    author=author,
+                    created_at=created,
+                    updated_at=created,
+                    published_at=created if status == 'published' else None,
+                )
+        return self.write(News, rows())
+    
+    def seed_site_content(self, count):
+        """Services, FAQs, support categories with templates and one active
+        company info page per type that has none yet"""
+        stamps = {'created_at': self.now, 'updated_at': self.now}
+        start = self.next_number(Service.objects, 'slug', 'load-')
+        self.write(Service, (
+            Service(
+                name=' '.join(self.rng.choices(WORDS, k=3)).capitalize(),
+                slug=f'load-{number}',
+                description=' '.join(self.rng.choices(WORDS, k=80)),
+                service_type=self.weighted(Service.SERVICE_TYPE_CHOICES),
+                price=Decimal(self.rng.randrange(1000, 100000)) / 100,
+                order=number,
+                **stamps
+            )
+            for number in range(start, start + count)
+        ))
+        self.write(FAQ, (
+            FAQ(
+                question=' '.join(self.rng.choices(WORDS, k=8)).capitalize() + '?',
+                answer=' '.join(self.rng.choices(WORDS, k=40)),
+                **stamps
+            )
+            for _ in range(count)
+        ))
+        
+        existing = set(CompanyInfo.objects.filter(is_active=True).values_list('info_type', flat=True))
+        self.write(CompanyInfo, (
+            CompanyInfo(title=label, info_type=info_type, content=' '.join(self.rng.choices(WORDS, k=120)), **stamps)
+            for info_type, label in CompanyInfo.INFO_TYPE_CHOICES if info_type not in existing
+        ))
+        
+        categories = self.write(SupportCategory, (
+            SupportCategory(name=f'Yuklama {number}', description=' '.join(self.rng.choices(WORDS, k=10)), **stamps)
+            for number in range(max(count // 5, 1))
+        ))
+        self.write(SupportTemplate, (
+            SupportTemplate(
+                name=' '.join(self.rng.choices(WORDS, k=3)).capitalize(),
+                subject=' '.join(self.rng.choices(WORDS, k=4)).capitalize(),
+                content=' '.join(self.rng.choices(WORDS, k=30)),
+                category=self.rng.choice(categories),
+                **stamps
+            )
+            for _ in range(count)
+        ))
+    
+    # Derived tables
+    
+    def refresh_derived(self):
+        """Rebuild rollups and search indexes that bulk_create bypassed"""
+        for spec in ROLLUP_SPECS:
+            spec.rebuild(batch_size=self.batch_size)
+        backend = get_search_backend(connection)
+        for index in SEARCH_INDEXES.values():
+            backend.rebuild(index, connection, batch_size=self.batch_size)
@@ -1,15 +1,21 @@
 import os
 import logging
-from django.core.mail import send_mail, EmailMessage
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from django.core.mail import send_mail, EmailMessage, get_connection
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.utils import timezone
-# from weasyprint import HTML
 from io import BytesIO
-import requests
 import json
 
-from .models import EmailTemplate, EmailLog, SMSLog, PDFTemplate, PDFLog, SystemSetting
+from .models import EmailLog, SMSLog, PDFLog
+from . import metrics
+from .pdf import render_pdf
+from .sms import SMSGatewayError, get_sms_client
+from .templating import email_templates, pdf_templates
 
 logger = logging.getLogger(__name__)
 
@@ -17,32 +23,52 @@ logger = logging.getLogger(__name__)
 class EmailService:
     """Email service for sending emails"""
     
+    @staticmethod
+    def render_email(template_type, context=None):
+        """Return (template, subject, content) for a template type, or None
+        
+        Templates come compiled from the process-local template cache.
+        """
+        cached = email_templates.get(template_type)
+        if not cached:
+            logger.error(f"Email template not found for type: {template_type}")
+            return None
+        
+        return cached.template, cached.render('subject', context), cached.render('content', context)
+    
+    @staticmethod
+    def deliver(email_log):
+        """Send a logged email over SMTP and mark it sent, raising on failure"""
+        started = time.perf_counter()
+        try:
+            send_mail(
+                subject=email_log.subject,
+                message=email_log.content,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[email_log.recipient],
+                fail_silently=False
+            )
+        except Exception:
+            metrics.email_messages.labels('failed').inc()
+            raise
+        finally:
+            metrics.email_send_duration.labels().observe(time.perf_counter() - started)
+        metrics.email_messages.labels('sent').inc()
+        
+        email_log.status = 'sent'
+        email_log.sent_at = timezone.now()
+        email_log.error_message = ''
+        email_log.save(update_fields=['status', 'sent_at', 'error_message'])
+        logger.info(f"Email sent successfully to {email_log.recipient}")
+    
     @staticmethod
     def send_email(template_type, recipient, context=None, user=None, ip_address=None, user_agent=None):
-        """Send email using template"""
+        """Send email using template, waiting for SMTP"""
         try:
-            # Get email template
-            template = EmailTemplate.objects.filter(
-                template_type=template_type,
-                is_active=True
-            ).first()
-            
-            if not template:
-                logger.error(f"Email template not found for type: {template_type}")
+            rendered = EmailService.render_email(template_type, context)
+            if not rendered:
                 return False
-            
-            # Prepare context
-            if context is None:
-                context = {}
-            
-            # Render email content
-            subject = template.subject
-            content = template.content
-            
-            # Replace variables in subject and content
-            for key, value in context.items():
-                subject = subject.replace(f"{{{{{key}}}}}", str(value))
-                content = content.replace(f"{{{{{key}}}}}", str(value))
+            template, subject, content = rendered
             
             # Create email log
             email_log = EmailLog.objects.create(
@@ -52,27 +78,14 @@ class EmailService:
                 content=content,
                 user=user,
                 ip_address=ip_address,
-                user_agent=user_agent
+                user_agent=user_agent or ''
             )
             
             # Send email
             try:
-                send_mail(
-                    subject=subject,
-                    message=content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[recipient],
-                    fail_silently=False
-                )
-                
-                # Update log
-                email_log.status = 'sent'
-                email_log.sent_at = timezone.now()
-                email_log.save()
-                
-                logger.info(f"Email sent successfully to {recipient}")
+                EmailService.deliver(email_log)
                 return True
-                
+            
             except Exception as e:
                 # Update log with error
                 email_log.status = 'failed'
@@ -81,11 +94,158 @@ class EmailService:
                 
                 logger.error(f"Failed to send email to {recipient}: {str(e)}")
                 return False
-                
+        
         except Exception as e:
             logger.error(f"Email service error: {str(e)}")
             return False
     
+    @staticmethod
+    def queue_email(template_type, recipient, context=None, user=None, ip_address=None, user_agent=None):
+        """Log an email as pending and send it from a Celery task
+        
+        The task is queued once the current transaction commits and retries
+        with exponential backoff. Returns the EmailLog, or None when the
+        template is missing.
+        """
+        from .tasks import send_email_task
+        
+        try:
+            rendered = EmailService.render_email(template_type, context)
+            if not rendered:
+                return None
+            template, subject, content = rendered
+            
+            email_log = EmailLog.objects.create(
+                template=template,
+                recipient=recipient,
+                subject=subject,
+                content=content,
+                user=user,
+                ip_address=ip_address,
+                user_agent=user_agent or ''
+            )
+        except Exception as e:
+            logger.error(f"Email service error: {str(e)}")
+            return None
+        
+        def enqueue():
+            try:
+                send_email_task.delay(email_log.pk)
+            except Exception as e:
+                # Broker unavailable, the log stays pending
+                logger.error(f"Failed to queue email {email_log.pk}: {str(e)}")
+        
+        transaction.on_commit(enqueue)
+        return email_log
+    
+    @staticmethod
+    def send_bulk(template_type, recipients, user=None, batch_size=500):
+        """Send one template to many recipients over one SMTP connection per batch
+        
+        recipients is an iterable of (email, context) pairs. Each batch is
+        logged with a single bulk_create, sent through one connection and
+        its log statuses saved with a single bulk_update. Returns the
+        numbers of sent and failed messages.
+        """
+        template = email_templates.get(template_type)
+        if not template:
+            logger.error(f"Email template not found for type: {template_type}")
+            return {'sent': 0, 'failed': 0}
+        
+        totals = {'sent': 0, 'failed': 0}
+        batch = []
+        for recipient, context in recipients:
+            batch.append((recipient, context))
+            if len(batch) >= batch_size:
+                EmailService._send_batch(template, batch, user, totals)
+                batch = []
+        if batch:
+            EmailService._send_batch(template, batch, user, totals)
+        
+        logger.info(f"Bulk email {template_type}: {totals['sent']} sent, {totals['failed']} failed")
+        return totals
+    
+    @staticmethod
+    def _send_batch(template, batch, user, totals):
+        logs = [
+            EmailLog(
+                template=template.template,
+                recipient=recipient,
+                subject=template.render('subject', context),
+                content=template.render('content', context),
+                user=user
+            )
+            for recipient, context in batch
+        ]
+        logs = EmailLog.objects.bulk_create(logs)
+        
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            for email_log in logs:
+                email_log.status = 'failed'
+                email_log.error_message = str(e)
+            EmailLog.objects.bulk_update(logs, ['status', 'error_message'])
+            totals['failed'] += len(logs)
+            metrics.email_messages.labels('failed').inc(len(logs))
+            logger.error(f"Failed to open email connection: {str(e)}")
+            return
+        
+        try:
+            for email_log in logs:
+                message = EmailMessage(
+                    subject=email_log.subject,
+                    body=email_log.content,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[email_log.recipient],
+                    connection=connection
+                )
+                # Sent one by one on the open connection to record per-recipient failures
+                started = time.perf_counter()
+                try:
+                    connection.send_messages([message])
+                    email_log.status = 'sent'
+                    email_log.sent_at = timezone.now()
+                    totals['sent'] += 1
+                except Exception as e:
+                    email_log.status = 'failed'
+                    email_log.error_message = str(e)
+                    totals['failed'] += 1
+                metrics.email_send_duration.labels().observe(time.perf_counter() - started)
+                metrics.email_messages.labels(email_log.status).inc()
+        finally:
+            connection.close()
+        
+        EmailLog.objects.bulk_update(logs, ['status', 'sent_at', 'error_message'])
+    
+    @staticmethod
+    def queue_bulk(template_type, recipients, user=None, batch_size=500):
+        """Send a bulk email from Celery tasks, one task per batch of recipients"""
+        from .tasks import send_bulk_email_task
+        
+        user_id = user.pk if user else None
+        batches = []
+        batch = []
+        for recipient, context in recipients:
+            # Context values are sent to the broker as JSON
+            batch.append([recipient, {key: str(value) for key, value in (context or {}).items()}])
+            if len(batch) >= batch_size:
+                batches.append(batch)
+                batch = []
+        if batch:
+            batches.append(batch)
+        
+        def enqueue():
+            for chunk in batches:
+                try:
+                    send_bulk_email_task.delay(template_type, chunk, user_id)
+                except Exception as e:
+                    logger.error(f"Failed to queue bulk email batch: {str(e)}")
+        
+        transaction.on_commit(enqueue)
+        return len(batches)
+    
     @staticmethod
     def send_verification_email(email, code, user=None, ip_address=None, user_agent=None):
         """Send verification code email"""
@@ -94,7 +254,7 @@ class EmailService:
             'email': email,
             'expiry_minutes': 5
         }
-        return EmailService.send_email(
+        return EmailService.queue_email(
             'verification',
             email,
             context,
@@ -111,7 +271,7 @@ class EmailService:
             'email': email,
             'client_code': user.client_code
         }
-        return EmailService.send_email(
+        return EmailService.queue_email(
             'welcome',
             email,
             context,
@@ -127,7 +287,7 @@ class EmailService:
             'reset_url': reset_url,
             'email': email
         }
-        return EmailService.send_email(
+        return EmailService.queue_email(
             'password_reset',
             email,
             context,
@@ -152,65 +312,79 @@ class SMSService:
                 ip_address=ip_address
             )
             
-            # Get SMS settings
-            sms_api_url = SystemSetting.objects.filter(
-                key='sms_api_url',
-                is_active=True
-            ).first()
-            
-            sms_api_key = SystemSetting.objects.filter(
-                key='sms_api_key',
-                is_active=True
-            ).first()
+            # Shared pooled client of the configured provider
+            client = get_sms_client()
             
-            if not sms_api_url or not sms_api_key:
+            if client is None:
                 logger.error("SMS API settings not configured")
                 sms_log.status = 'failed'
                 sms_log.error_message = "SMS API settings not configured"
                 sms_log.save()
+                metrics.sms_messages.labels('failed').inc()
                 return False
             
-            # Send SMS (example using external API)
             try:
-                # This is a placeholder for actual SMS API integration
-                # Replace with your SMS provider's API
-                response = requests.post(
-                    sms_api_url.value,
-                    json={
-                        'phone': phone_number,
-                        'message': message,
-                        'api_key': sms_api_key.value
-                    },
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    sms_log.status = 'sent'
-                    sms_log.sent_at = timezone.now()
-                    sms_log.save()
-                    
-                    logger.info(f"SMS sent successfully to {phone_number}")
-                    return True
-                else:
-                    sms_log.status = 'failed'
-                    sms_log.error_message = f"API error: {response.status_code}"
-                    sms_log.save()
-                    
-                    logger.error(f"Failed to send SMS to {phone_number}: API error")
-                    return False
-                    
-            except Exception as e:
+                client.send(phone_number, message)
+            except SMSGatewayError as e:
                 sms_log.status = 'failed'
                 sms_log.error_message = str(e)
                 sms_log.save()
+                metrics.sms_messages.labels('failed').inc()
                 
                 logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
                 return False
-                
+            
+            sms_log.status = 'sent'
+            sms_log.sent_at = timezone.now()
+            sms_log.save()
+            metrics.sms_messages.labels('sent').inc()
+            
+            logger.info(f"SMS sent successfully to {phone_number}")
+            return True
+        
         except Exception as e:
             logger.error(f"SMS service error: {str(e)}")
             return False
     
+    @staticmethod
+    def send_bulk_sms(messages, user=None, batch_size=500):
+        """Send many (phone_number, message) pairs concurrently
+        
+        Each batch is logged with a single bulk_create, sent in parallel over
+        the client's connection pool and its statuses saved with a single
+        bulk_update. Returns the numbers of sent and failed messages.
+        """
+        totals = {'sent': 0, 'failed': 0}
+        client = get_sms_client()
+        messages = list(messages)
+        
+        for start in range(0, len(messages), batch_size):
+            logs = SMSLog.objects.bulk_create([
+                SMSLog(phone_number=phone_number, message=message, user=user)
+                for phone_number, message in messages[start:start + batch_size]
+            ])
+            if client is None:
+                errors = ["SMS API settings not configured"] * len(logs)
+            else:
+                errors = client.send_many((log.phone_number, log.message) for log in logs)
+            
+            sent_at = timezone.now()
+            for sms_log, error in zip(logs, errors):
+                if error:
+                    sms_log.status = 'failed'
+                    sms_log.error_message = error
+                    totals['failed'] += 1
+                else:
+                    sms_log.status = 'sent'
+                    sms_log.sent_at = sent_at
+                    totals['sent'] += 1
+            SMSLog.objects.bulk_update(logs, ['status', 'error_message', 'sent_at'])
+        
+        metrics.sms_messages.labels('sent').inc(totals['sent'])
+        metrics.sms_messages.labels('failed').inc(totals['failed'])
+        logger.info(f"Bulk SMS: {totals['sent']} sent, {totals['failed']} failed")
+        return totals
+    
     @staticmethod
     def send_verification_sms(phone_number, code, user=None, ip_address=None):
         """Send verification code SMS"""
@@ -222,77 +396,94 @@ class PDFService:
     """PDF service for generating PDF documents"""
     
     @staticmethod
-    def generate_pdf(template_type, context=None, user=None, ip_address=None):
-        """Generate PDF using template"""
+    def submit_pdf(template_type, context=None, user=None, ip_address=None):
+        """Start rendering a PDF in the worker pool
+        
+        Returns (pdf_log, future) for complete_pdf(), or None when the
+        template does not exist. Submitting many documents before completing
+        any of them renders them in parallel.
+        """
+        # Get compiled PDF template
+        cached = pdf_templates.get(template_type)
+        
+        if not cached:
+            logger.error(f"PDF template not found for type: {template_type}")
+            return None
+        
+        # Render HTML content
+        template = cached.template
+        html_content = cached.render('html_template', context)
+        
+        # Add CSS styles
+        if template.css_styles:
+            html_content = f"""
+            <style>
+            {template.css_styles}
+            </style>
+            {html_content}
+            """
+        
+        # Create PDF log
+        pdf_log = PDFLog.objects.create(
+            template=template,
+            user=user,
+            ip_address=ip_address
+        )
+        return pdf_log, render_pdf(html_content)
+    
+    @staticmethod
+    def complete_pdf(pdf_log, future, timeout=None):
+        """Wait for a submitted PDF, record it in its log and return the log or None"""
         try:
-            # Get PDF template
-            template = PDFTemplate.objects.filter(
-                template_type=template_type,
-                is_active=True
-            ).first()
-            
-            if not template:
-                logger.error(f"PDF template not found for type: {template_type}")
-                return None
-            
-            # Prepare context
-            if context is None:
-                context = {}
-            
-            # Render HTML content
-            html_content = template.html_template
-            
-            # Replace variables in template
-            for key, value in context.items():
-                html_content = html_content.replace(f"{{{{{key}}}}}", str(value))
-            
-            # Add CSS styles
-            if template.css_styles:
-                html_content = f"""
-                <style>
-                {template.css_styles}
-                </style>
-                {html_content}
-                """
-            
-            # Create PDF log
-            pdf_log = PDFLog.objects.create(
-                template=template,
-                user=user,
-                ip_address=ip_address
-            )
+            stored = future.result(timeout=timeout)
+        except Exception as e:
+            # Update log with error
+            pdf_log.status = 'failed'
+            pdf_log.error_message = str(e) or type(e).__name__
+            pdf_log.save()
+            metrics.pdf_renders.labels(pdf_log.template.template_type, 'failed').inc()
             
-            try:
-                # Generate PDF using WeasyPrint
-                # html = HTML(string=html_content)
-                # pdf_bytes = html.write_pdf()
-                
-                # Update log
-                pdf_log.status = 'generated'
-                pdf_log.generated_at = timezone.now()
-                pdf_log.file_size = 0 # Placeholder, actual size will be calculated later
-                pdf_log.save()
-                
-                logger.info(f"PDF generated successfully for template: {template.name}")
-                return None # Return None as PDF generation is commented out
-                
-            except Exception as e:
-                # Update log with error
-                pdf_log.status = 'failed'
-                pdf_log.error_message = str(e)
-                pdf_log.save()
-                
-                logger.error(f"Failed to generate PDF for template {template.name}: {str(e)}")
+            logger.error(f"Failed to generate PDF for template {pdf_log.template.name}: {str(e)}")
+            return None
+        
+        # Update log
+        pdf_log.status = 'generated'
+        pdf_log.generated_at = timezone.now()
+        pdf_log.file_path = stored.path
+        pdf_log.file_size = stored.size
+        pdf_log.save()
+        
+        template_type = pdf_log.template.template_type
+        if stored.cached:
+            metrics.pdf_renders.labels(template_type, 'cached').inc()
+            logger.info(f"PDF served from cache for template: {pdf_log.template.name}")
+        else:
+            metrics.pdf_renders.labels(template_type, 'rendered').inc()
+            metrics.pdf_render_duration.labels(template_type).observe(stored.duration)
+            logger.info(f"PDF generated successfully for template: {pdf_log.template.name}")
+        return pdf_log
+    
+    @staticmethod
+    def generate_pdf(template_type, context=None, user=None, ip_address=None):
+        """Generate PDF using template
+        
+        The document is rendered in the PDF worker pool and stored under
+        MEDIA_ROOT by content hash; unchanged documents are not rendered
+        again. Returns the PDFLog with file_path and file_size, or None.
+        """
+        try:
+            submitted = PDFService.submit_pdf(template_type, context, user, ip_address)
+            if submitted is None:
                 return None
-                
+            return PDFService.complete_pdf(*submitted, timeout=settings.PDF_TIMEOUT)
+        
         except Exception as e:
             logger.error(f"PDF service error: {str(e)}")
             return None
     
     @staticmethod
-    def generate_declaration_pdf(declaration, user=None, ip_address=None):
-        """Generate declaration PDF"""
-        context = {
+    def declaration_context(declaration):
+        return {
             'declaration_number': declaration.declaration_number,
             'declaration_type': declaration.get_declaration_type_display(),
             'product_name': declaration.product_name,
@@ -307,13 +498,10 @@ class PDFService:
             'created_at': declaration.created_at.strftime('%d.%m.%Y'),
             'status': declaration.get_status_display(),
         }
-        
-        return PDFService.generate_pdf('declaration', context, user, ip_address)
     
     @staticmethod
-    def generate_invoice_pdf(order, user=None, ip_address=None):
-        """Generate invoice PDF"""
-        context = {
+    def invoice_context(order):
+        return {
             'order_number': order.order_number,
             'product_name': order.product_name,
             'quantity': order.quantity,
@@ -323,8 +511,64 @@ class PDFService:
             'order_date': order.order_date.strftime('%d.%m.%Y'),
             'status': order.get_status_display(),
         }
-        
+    
+    @staticmethod
+    def generate_declaration_pdf(declaration, user=None, ip_address=None):
+        """Generate declaration PDF"""
+        context = PDFService.declaration_context(declaration)
+        return PDFService.generate_pdf('declaration', context, user, ip_address)
+    
+    @staticmethod
+    def generate_invoice_pdf(order, user=None, ip_address=None):
+        """Generate invoice PDF"""
+        context = PDFService.invoice_context(order)
         return PDFService.generate_pdf('invoice', context, user, ip_address)
+    
+    @staticmethod
+    def generate_batch(documents, user=None, ip_address=None, window=None):
+        """Render (filename, template_type, context) documents in parallel
+        
+        Up to window documents (twice PDF_WORKERS by default) are rendering
+        at a time. Yields (filename, pdf_log) as each one completes, in
+        completion order, with pdf_log None for failed documents.
+        """
+        window = window or 2 * max(settings.PDF_WORKERS, 1)
+        pending = {}
+        documents = iter(documents)
+        
+        while True:
+            for filename, template_type, context in documents:
+                submitted = PDFService.submit_pdf(template_type, context, user, ip_address)
+                if submitted is None:
+                    yield filename, None
+                    continue
+                pdf_log, future = submitted
+                pending[future] = (filename, pdf_log)
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            
+            done, _ = wait(pending, timeout=settings.PDF_TIMEOUT, return_when=FIRST_COMPLETED)
+            for future in done or list(pending):
+                filename, pdf_log = pending.pop(future)
+                yield filename, PDFService.complete_pdf(pdf_log, future, timeout=0)
+    
+    @staticmethod
+    def batch_files(documents, user=None, ip_address=None):
+        """generate_batch() as (filename, open file) entries for iter_zip
+        
+        Documents that could not be rendered are listed in errors.txt.
+        """
+        failed = []
+        for filename, pdf_log in PDFService.generate_batch(documents, user, ip_address):
+            if pdf_log is None:
+                failed.append(filename)
+            else:
+                yield filename, default_storage.open(pdf_log.file_path, 'rb')
+        
+        if failed:
+            yield 'errors.txt', BytesIO('\n'.join(failed).encode())
 
 
 class NotificationService:
@@ -342,7 +586,7 @@ class NotificationService:
                 'user_name': order.user.get_full_name() or order.user.username
             }
             
-            EmailService.send_email(
+            EmailService.queue_email(
                 'order_confirmation',
                 order.user.email,
                 context,
@@ -361,7 +605,7 @@ class NotificationService:
                 'user_name': declaration.user.get_full_name() or declaration.user.username
             }
             
-            EmailService.send_email(
+            EmailService.queue_email(
                 'declaration_status',
                 declaration.user.email,
                 context,
@@ -380,10 +624,39 @@ class NotificationService:
                 'user_name': ticket.user.get_full_name() or ticket.user.username
             }
             
-            EmailService.send_email(
+            EmailService.queue_email(
                 'support_reply',
                 ticket.user.email,
                 context,
                 user,
                 ip_address
-            ) 
\ No newline at end of file
+            ) 
+    
+    @staticmethod
+    def send_bulk_order_status_notifications(orders, user=None):
+        """Queue order status emails for many orders in batches"""
+        recipients = (
+            (order.user.email, {
+                'order_number': order.order_number,
+                'status': order.get_status_display(),
+                'product_name': order.product_name,
+                'total_price': order.total_price,
+                'user_name': order.user.get_full_name() or order.user.username
+            })
+            for order in orders.select_related('user') if order.user.email
+        )
+        return EmailService.queue_bulk('order_confirmation', recipients, user)
+    
+    @staticmethod
+    def send_bulk_declaration_status_notifications(declarations, user=None):
+        """Queue declaration status emails for many declarations in batches"""
+        recipients = (
+            (declaration.user.email, {
+                'declaration_number': declaration.declaration_number,
+                'status': declaration.get_status_display(),
+                'product_name': declaration.product_name,
+                'user_name': declaration.user.get_full_name() or declaration.user.username
+            })
+            for declaration in declarations.select_related('user') if declaration.user.email
+        )
+        return EmailService.queue_bulk('declaration_status', recipients, user)
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EmailTemplate, PDFTemplate, SystemSetting
+from .system_settings import invalidate_settings
+from .templating import email_templates, pdf_templates
+
+
+@receiver([post_save, post_delete], sender=EmailTemplate, dispatch_uid='email_template_cache')
+def invalidate_email_templates(sender, **kwargs):
+    email_templates.invalidate()
+
+
+@receiver([post_save, post_delete], sender=PDFTemplate, dispatch_uid='pdf_template_cache')
+def invalidate_pdf_templates(sender, **kwargs):
+    pdf_templates.invalidate()
+
+
+@receiver([post_save, post_delete], sender=SystemSetting, dispatch_uid='system_settings_cache')
+def invalidate_system_settings(sender, **kwargs):
+    invalidate_settings()
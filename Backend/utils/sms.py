@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics, system_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SMSGatewayError(Exception):
+    """The SMS provider rejected a message or could not be reached"""
+
+
+class CircuitOpenError(SMSGatewayError):
+    """Sending skipped, the provider failed too many times in a row"""
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second with bursts of burst"""
+    
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self):
+        """Take a token, returning how many seconds to wait before using it"""
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+    
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+    
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Stop calling a provider after failure_threshold consecutive failures
+    
+    While open every call fails fast. After reset_timeout seconds one trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SMSGatewayClient:
+    """HTTP client of an SMS provider
+    
+    Messages go through one requests.Session whose connection pool keeps up
+    to pool_size keep-alive connections to the provider, throttled by a
+    RateLimiter and guarded by a CircuitBreaker. Create it once per provider
+    (see get_sms_client) so the pool, limiter and breaker are shared.
+    """
+    
+    def __init__(self, url, api_key, timeout=(3.05, 10), pool_size=10, rate=None, burst=None,
+                 failure_threshold=5, reset_timeout=30):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.limiter = RateLimiter(rate, burst or pool_size)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def send(self, phone_number, message):
+        """Send one message, raising SMSGatewayError when it was not accepted"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("SMS provider circuit is open")
+        self.limiter.acquire()
+        return self._post(phone_number, message)
+    
+    def _post(self, phone_number, message):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.url,
+                json={
+                    'phone': phone_number,
+                    'message': message,
+                    'api_key': self.api_key
+                },
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise SMSGatewayError(str(e)) from e
+        finally:
+            metrics.sms_send_duration.labels().observe(time.perf_counter() - started)
+        
+        if response.status_code != 200:
+            # Client errors concern the message, not the provider's health
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise SMSGatewayError(f"API error: {response.status_code}")
+        
+        self.breaker.record_success()
+        return response
+    
+    def send_quietly(self, phone_number, message):
+        """send() returning None on success or the error message"""
+        try:
+            self.send(phone_number, message)
+        except SMSGatewayError as e:
+            return str(e)
+        return None
+    
+    def send_many(self, messages, workers=None):
+        """Send (phone_number, message) pairs concurrently over the pool
+        
+        Returns a list of errors in the order of messages, None for each
+        message that was sent.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(workers or self.pool_size, len(messages))) as executor:
+            return list(executor.map(lambda item: self.send_quietly(*item), messages))
+    
+    async def asend(self, phone_number, message):
+        """Coroutine variant of send(), the request runs in a worker thread"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("SMS provider circuit is open")
+        # Wait for the rate limit without holding a thread
+        await self.limiter.acquire_async()
+        return await asyncio.to_thread(self._post, phone_number, message)
+    
+    async def asend_many(self, messages, concurrency=None):
+        """Coroutine variant of send_many() for use inside an event loop"""
+        semaphore = asyncio.Semaphore(concurrency or self.pool_size)
+        
+        async def send(phone_number, message):
+            async with semaphore:
+                try:
+                    await self.asend(phone_number, message)
+                except SMSGatewayError as e:
+                    return str(e)
+                return None
+        return await asyncio.gather(*(send(*item) for item in messages))
+    
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_sms_client():
+    """Shared client of the configured provider, or None when not configured
+    
+    The provider URL and key come from the cached system settings, a new
+    client (and pool) is only built when they change.
+    """
+    url = system_settings.get_str('sms_api_url')
+    api_key = system_settings.get_str('sms_api_key')
+    if not url or not api_key:
+        return None
+    
+    with _clients_lock:
+        client = _clients.get((url, api_key))
+        if client is None:
+            for previous in _clients.values():
+                previous.close()
+            _clients.clear()
+            client = _clients[(url, api_key)] = SMSGatewayClient(
+                url,
+                api_key,
+                timeout=getattr(settings, 'SMS_TIMEOUT', (3.05, 10)),
+                pool_size=getattr(settings, 'SMS_POOL_SIZE', 10),
+                rate=system_settings.get_float('sms_rate_limit', getattr(settings, 'SMS_RATE_LIMIT', None)),
+                failure_threshold=getattr(settings, 'SMS_CIRCUIT_FAILURES', 5),
+                reset_timeout=getattr(settings, 'SMS_CIRCUIT_RESET', 30),
+            )
+        return client
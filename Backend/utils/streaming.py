@@ -0,0 +1,74 @@
+import zipfile
+from contextlib import closing, nullcontext
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def iter_ndjson(queryset, serializer_class, chunk_size=500, context=None):
+    """Yield one serialized JSON document per row without loading the whole queryset"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        data = serializer_class(instance, context=context or {}).data
+        yield encoder.encode(data) + '\n'
+
+
+def ndjson_response(queryset, serializer_class, filename=None, chunk_size=500, context=None):
+    """Stream a queryset as newline delimited JSON"""
+    response = StreamingHttpResponse(
+        iter_ndjson(queryset, serializer_class, chunk_size, context),
+        content_type='application/x-ndjson'
+    )
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class StreamBuffer:
+    """Write-only file collecting what ZipFile writes until it is yielded"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(entries, chunk_size=64 * 1024, compression=zipfile.ZIP_STORED):
+    """Yield a ZIP archive of (name, source) entries as it is written
+    
+    A source is a binary file, copied in chunks and closed, or an iterable
+    of bytes, so only one chunk of one entry is held in memory. The
+    archive uses data descriptors, it is never seeked.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, source in entries:
+            if hasattr(source, 'read'):
+                chunks = iter(lambda: source.read(chunk_size), b'')
+            else:
+                chunks = iter(source)
+            with closing(source) if hasattr(source, 'close') else nullcontext(), archive.open(name, 'w') as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if buffer.chunks:
+                        yield buffer.pop()
+            yield buffer.pop()
+    # Central directory
+    yield buffer.pop()
+
+
+def zip_response(entries, filename):
+    """Stream (name, binary file) entries as a ZIP download"""
+    response = StreamingHttpResponse(iter_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
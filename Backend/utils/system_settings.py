@@ -0,0 +1,92 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .local_cache import VersionedLocalCache
+from .models import SystemSetting
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on', 'ha'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', "yo'q", 'yoq'}
+
+system_settings_cache = VersionedLocalCache('system-settings')
+
+
+def load_settings():
+    """Active settings as {key: value}, from the shared cache tier or the database"""
+    shared = None
+    data_key = f'system-settings:data:{system_settings_cache.shared_version()}'
+    if getattr(settings, 'SYSTEM_SETTINGS_SHARED_CACHE', False):
+        shared = caches[system_settings_cache.cache_alias]
+        try:
+            values = shared.get(data_key)
+            if values is not None:
+                return values
+        except Exception:
+            logger.exception("Shared system settings cache unavailable")
+    
+    values = dict(SystemSetting.objects.filter(is_active=True).values_list('key', 'value'))
+    
+    if shared is not None:
+        try:
+            shared.set(data_key, values, timeout=None)
+        except Exception:
+            logger.exception("Failed to store system settings in shared cache")
+    return values
+
+
+def all_settings():
+    return system_settings_cache.get('all', load_settings)
+
+
+def get_setting(key, default=None):
+    """Value of an active setting, read from memory"""
+    return all_settings().get(key, default)
+
+
+def get_str(key, default=''):
+    value = get_setting(key)
+    return default if value is None else value.strip()
+
+
+def get_int(key, default=None):
+    value = get_setting(key)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float(key, default=None):
+    value = get_setting(key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_bool(key, default=False):
+    value = get_setting(key)
+    if value is None:
+        return default
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    return default
+
+
+def get_json(key, default=None):
+    value = get_setting(key)
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def invalidate_settings():
+    system_settings_cache.invalidate()
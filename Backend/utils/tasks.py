@@ -0,0 +1,50 @@
+import logging
+import random
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .models import EmailLog
+from .services import EmailService
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(retries):
+    """Exponential backoff with jitter for the given retry number"""
+    base = getattr(settings, 'EMAIL_RETRY_BACKOFF', 30)
+    limit = getattr(settings, 'EMAIL_RETRY_BACKOFF_MAX', 3600)
+    delay = min(base * (2 ** retries), limit)
+    return delay // 2 + random.randint(0, delay // 2)
+
+
+@shared_task(bind=True, max_retries=getattr(settings, 'EMAIL_MAX_RETRIES', 5))
+def send_email_task(self, email_log_id):
+    """Deliver a pending EmailLog, retrying SMTP failures with backoff"""
+    email_log = EmailLog.objects.filter(pk=email_log_id).first()
+    if email_log is None or email_log.status == 'sent':
+        return False
+    
+    try:
+        EmailService.deliver(email_log)
+        return True
+    except Exception as e:
+        email_log.error_message = str(e)
+        
+        if self.request.retries < self.max_retries:
+            email_log.save(update_fields=['error_message'])
+            logger.warning(f"Email {email_log_id} to {email_log.recipient} failed, retry {self.request.retries + 1}: {str(e)}")
+            raise self.retry(exc=e, countdown=retry_delay(self.request.retries))
+        
+        email_log.status = 'failed'
+        email_log.save(update_fields=['status', 'error_message'])
+        logger.error(f"Failed to send email to {email_log.recipient}: {str(e)}")
+        return False
+
+
+@shared_task
+def send_bulk_email_task(template_type, recipients, user_id=None):
+    """Send one batch of a bulk email over a single SMTP connection"""
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    return EmailService.send_bulk(template_type, recipients, user, batch_size=len(recipients) or 1)
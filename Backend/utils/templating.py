@@ -0,0 +1,88 @@
+import re
+
+from django.utils.html import escape
+
+from .local_cache import VersionedLocalCache
+from .models import EmailTemplate, PDFTemplate
+
+# {{name}} placeholders, as used by email and PDF templates
+VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+class CompiledTemplate:
+    """Template text split once into literal and variable parts
+    
+    Rendering is a single pass over the parts. Placeholders without a
+    context value are left as they are. With autoescape the values are
+    HTML-escaped, for templates rendered as HTML.
+    """
+    
+    def __init__(self, text, autoescape=False):
+        self.autoescape = autoescape
+        self.parts = []
+        position = 0
+        for match in VARIABLE_RE.finditer(text or ''):
+            if match.start() > position:
+                self.parts.append((False, text[position:match.start()]))
+            self.parts.append((True, match.group(1)))
+            position = match.end()
+        if position < len(text or ''):
+            self.parts.append((False, text[position:]))
+    
+    def render(self, context):
+        output = []
+        for is_variable, value in self.parts:
+            if not is_variable:
+                output.append(value)
+            elif value in context:
+                output.append(escape(context[value]) if self.autoescape else str(context[value]))
+            else:
+                output.append(f'{{{{{value}}}}}')
+        return ''.join(output)
+
+
+class CachedTemplate:
+    """Active template row with its text fields compiled"""
+    
+    def __init__(self, template, fields, autoescape=False):
+        self.template = template
+        self.compiled = {field: CompiledTemplate(getattr(template, field), autoescape) for field in fields}
+    
+    def render(self, field, context=None):
+        return self.compiled[field].render(context or {})
+
+
+class TemplateCache:
+    """Active templates by template_type, compiled once per (id, updated_at)"""
+    
+    def __init__(self, model, fields, autoescape=False):
+        self.model = model
+        self.fields = fields
+        self.autoescape = autoescape
+        self.templates = VersionedLocalCache(f'templates:{model._meta.label_lower}')
+        self.compiled = {}
+    
+    def load(self, template_type):
+        template = self.model.objects.filter(template_type=template_type, is_active=True).first()
+        if template is None:
+            return None
+        
+        # Unchanged rows reloaded after an invalidation are not compiled again
+        key = (template.pk, template.updated_at)
+        if key not in self.compiled:
+            if len(self.compiled) > 100:
+                self.compiled.clear()
+            self.compiled[key] = CachedTemplate(template, self.fields, self.autoescape)
+        return self.compiled[key]
+    
+    def get(self, template_type):
+        """Compiled active template of the type, or None"""
+        return self.templates.get(template_type, lambda: self.load(template_type))
+    
+    def invalidate(self):
+        self.templates.invalidate()
+
+
+email_templates = TemplateCache(EmailTemplate, ['subject', 'content', 'html_content'])
+# PDF templates are HTML, values such as names and addresses are escaped
+pdf_templates = TemplateCache(PDFTemplate, ['html_template'], autoescape=True)
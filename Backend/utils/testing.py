@@ -0,0 +1,31 @@
+class QueryCountMixin:
+    """TestCase assertions on the exact number of queries of API endpoints
+    
+    Used with a TestCase whose self.client is an authenticated APIClient.
+    assertQueriesConstant also checks that the count does not grow with
+    the number of related rows, which catches N+1 queries and unbounded
+    prefetches that a single request with little data would miss.
+    """
+    
+    def assertEndpointQueries(self, expected, url, method='get', data=None, status_code=200, **extra):
+        """Request url and assert it ran exactly expected queries"""
+        request = getattr(self.client, method)
+        with self.assertNumQueries(expected):
+            if method == 'get':
+                response = request(url, data, **extra)
+            else:
+                response = request(url, data, format='json', **extra)
+        self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+        return response
+    
+    def assertQueriesConstant(self, expected, url, grow, rounds=2, **kwargs):
+        """assertEndpointQueries before and after each call of grow()
+        
+        grow adds related rows (status updates, documents, messages...) so
+        every round shows more data for the same number of queries.
+        """
+        responses = [self.assertEndpointQueries(expected, url, **kwargs)]
+        for _ in range(rounds):
+            grow()
+            responses.append(self.assertEndpointQueries(expected, url, **kwargs))
+        return responses
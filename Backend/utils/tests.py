@@ -1,3 +1,700 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from declarations.models import Declaration
+from orders.models import Order
+from orders.services import OrderStatisticsService
+from support.models import SupportTicket
+from users.models import User
+from . import metrics, system_settings
+from .benchmarks import BenchmarkFixtures, api_routes, compare_reports, run_benchmarks
+from .metrics import Registry
+from .middleware import fingerprint
+from .models import EmailLog, EmailTemplate, PDFLog, PDFTemplate, SMSLog, SlowRequestLog, SystemSetting
+from .pdf import fetch_resource, shutdown_pdf_executor
+from .seeding import DatasetSeeder
+from .services import EmailService, NotificationService, PDFService, SMSService
+from .sms import CircuitOpenError, SMSGatewayClient, SMSGatewayError
+from .streaming import iter_zip
+from .templating import CompiledTemplate
+
+
+class DatasetSeederTests(TestCase):
+    """Tests for the synthetic dataset generator"""
+    
+    def test_seeded_rows_keep_timestamps_and_rollups(self):
+        seeder = DatasetSeeder(seed=7, batch_size=50)
+        users = seeder.seed_users(20)
+        orders = seeder.seed_orders(users, 120)
+        seeder.seed_tickets(users, 10)
+        seeder.refresh_derived()
+        
+        self.assertEqual(Order.objects.count(), 120)
+        self.assertGreater(len({order.order_date.date() for order in Order.objects.all()}), 1)
+        self.assertTrue(all(ticket.messages.exists() for ticket in SupportTicket.objects.all()))
+        self.assertEqual(
+            OrderStatisticsService.rollup_summary(None),
+            OrderStatisticsService.summary(Order.objects.all())
+        )
+        
+        # Numbering continues after previously seeded rows
+        more = DatasetSeeder(seed=7, batch_size=50).seed_orders(users, 5)
+        self.assertEqual(more[0].order_number, f'LO-{120:012d}')
+        self.assertNotEqual(orders[0].order_number, more[0].order_number)
+
+
+class APIBenchmarkTests(TestCase):
+    """Tests for the API endpoint benchmark"""
+    
+    def test_every_get_endpoint_is_benchmarked(self):
+        seeder = DatasetSeeder(seed=3, batch_size=50)
+        users = seeder.seed_users(5)
+        orders = seeder.seed_orders(users, 30)
+        seeder.seed_declarations(orders, 5)
+        seeder.seed_tickets(users, 5)
+        seeder.seed_news(users[0], 3)
+        seeder.seed_site_content(3)
+        
+        report = run_benchmarks(BenchmarkFixtures(), repeat=1)
+        endpoints = report['endpoints']
+        
+        errors = {key: result['status'] for key, result in endpoints.items() if result['status'] >= 500}
+        self.assertEqual(errors, {})
+        for name, _, view_class, _ in api_routes():
+            if view_class is not None and hasattr(view_class, 'get') and name not in report['skipped']:
+                self.assertIn(f'{name} [staff]', endpoints)
+                self.assertIn(f'{name} [customer]', endpoints)
+        self.assertEqual(endpoints['orders:order-detail [customer]']['status'], 200)
+        self.assertEqual(endpoints['orders:order-detail [customer]']['queries'], 3)
+        self.assertEqual(endpoints['news:admin-news-list [customer]']['status'], 403)
+        self.assertIn('orders:bulk-status', report['skipped'])
+    
+    def test_compare_reports_flags_regressions(self):
+        def report(queries, p95_ms, memory_kb):
+            return {'endpoints': {'orders:order-list [staff]': {
+                'status': 200, 'queries': queries, 'p50_ms': p95_ms, 'p95_ms': p95_ms, 'peak_memory_kb': memory_kb,
+            }}}
+        baseline = report(2, 10.0, 100)
+        
+        self.assertEqual(compare_reports(baseline, report(2, 14.0, 140)), [])
+        # Large ratios of small values stay under the floors
+        self.assertEqual(compare_reports(report(2, 2.0, 100), report(2, 4.0, 300)), [])
+        regressions = compare_reports(baseline, report(3, 30.0, 1000))
+        self.assertEqual(len(regressions), 3)
+        self.assertIn('2 -> 3 queries', regressions[0])
+        self.assertEqual(compare_reports(baseline, report(3, 10.0, 100), {'queries': 1}), [])
+
+
+class SeedLoadCommandTests(TestCase):
+    """Tests for the load test data generator"""
+    
+    def orders(self, start, count):
+        numbers = [f'LO-{number:012d}' for number in range(start, start + count)]
+        return list(
+            Order.objects.filter(order_number__in=numbers).order_by('order_number')
+            .values_list('user_id', 'product_name', 'quantity', 'status', 'delivery_status')
+        )
+    
+    def test_seeded_volumes_and_distributions(self):
+        call_command(
+            'seed_load', users=10, orders=60, chunk_size=25, news=3, workers=1,
+            order_status='delivered=1', ticket_priority='urgent=1,low=1', stdout=StringIO()
+        )
+        self.assertEqual(User.objects.filter(email__endswith='@load.test').count(), 10)
+        self.assertEqual(Order.objects.count(), 60)
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'delivered'})
+        # 0.1 declarations and 0.05 tickets per order
+        self.assertEqual(Declaration.objects.count(), 6)
+        self.assertEqual(SupportTicket.objects.count(), 3)
+        self.assertTrue(set(SupportTicket.objects.values_list('priority', flat=True)) <= {'urgent', 'low'})
+        # Rollups were rebuilt after the bulk inserts
+        self.assertEqual(
+            OrderStatisticsService.rollup_summary(None),
+            OrderStatisticsService.summary(Order.objects.all())
+        )
+    
+    def test_same_seed_generates_same_rows(self):
+        call_command('seed_load', users=10, orders=60, chunk_size=25, news=0, skip_derived=True, stdout=StringIO())
+        call_command('seed_load', users=0, orders=60, chunk_size=25, news=0, skip_derived=True, stdout=StringIO())
+        # Numbering continues, the generated values repeat
+        self.assertEqual(Order.objects.count(), 120)
+        self.assertEqual(self.orders(0, 60), self.orders(60, 60))
+    
+    def test_invalid_distribution(self):
+        with self.assertRaisesMessage(CommandError, '--order-status'):
+            call_command('seed_load', users=1, orders=1, order_status='unknown=1', stdout=StringIO())
+
+
+class IndexBenchmarkCommandTests(TransactionTestCase):
+    """The benchmark drops and recreates indexes, which needs a real transaction"""
+    
+    def test_index_benchmark_command(self):
+        output = StringIO()
+        # Already in the test database, which is not created a second time
+        call_command('benchmark_indexes', orders=200, users=10, repeat=2, in_place=True, stdout=output)
+        self.assertIn('orders by status', output.getvalue())
+        self.assertIn('with indexes', output.getvalue())
+
+
+@override_settings(SQL_PROFILING=True, SQL_PROFILING_SLOW_MS=10000, SQL_PROFILING_SLOW_QUERIES=10)
+class SQLProfilingMiddlewareTests(TestCase):
+    """Tests for the per-request SQL profiling middleware"""
+    
+    def setUp(self):
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        # The client loads the middleware chain under the overridden settings
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+    
+    def test_fingerprint_groups_parameters(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND x IN (%s, %s)"),
+            fingerprint("SELECT  * FROM t WHERE id = 7 AND name = 'b' AND x IN (%s)")
+        )
+    
+    def test_server_timing_without_slow_log(self):
+        response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('app;dur=', response['Server-Timing'])
+        self.assertFalse(SlowRequestLog.objects.exists())
+    
+    def test_duplicated_queries_are_logged(self):
+        DatasetSeeder(seed=5, batch_size=50).seed_site_content(12)
+        with self.assertLogs('utils.middleware', 'WARNING') as logs:
+            response = self.client.get('/api/support/templates/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db-dup;desc="', response['Server-Timing'])
+        
+        entry = SlowRequestLog.objects.get()
+        self.assertEqual(entry.view_name, 'support:template-list')
+        self.assertEqual(entry.user, self.staff)
+        self.assertGreaterEqual(entry.query_count, 10)
+        self.assertGreaterEqual(entry.duplicate_count, 10)
+        self.assertGreaterEqual(entry.duplicates[0]['count'], 11)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], entry.query_count)
+    
+    def test_ring_buffer_keeps_newest(self):
+        for index in range(5):
+            SlowRequestLog.record(3, method='GET', path=f'/api/{index}/', status_code=200, duration_ms=1, sql_ms=1, query_count=1)
+        self.assertEqual(
+            list(SlowRequestLog.objects.order_by('-id').values_list('path', flat=True)),
+            ['/api/4/', '/api/3/', '/api/2/']
+        )
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class EmailQueueTests(TestCase):
+    """Tests for queued email delivery through the Celery task (eager in tests)"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        EmailTemplate.objects.create(
+            name='Buyurtma',
+            template_type='order_confirmation',
+            subject='Buyurtma {{order_number}}',
+            content='Hurmatli {{user_name}}, buyurtmangiz holati: {{status}}',
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            product_name='Mahsulot',
+            unit_price=Decimal('10.00'),
+            delivery_address='Toshkent',
+            delivery_phone='+998901234567',
+        )
+    
+    def test_notification_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            NotificationService.send_order_status_notification(self.order)
+        
+        # Nothing is sent inside the request transaction
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailLog.objects.get().status, 'pending')
+        
+        for callback in callbacks:
+            callback()
+        email_log = EmailLog.objects.get()
+        self.assertEqual(email_log.status, 'sent')
+        self.assertEqual(mail.outbox[0].subject, f'Buyurtma {self.order.order_number}')
+    
+    def test_smtp_failures_are_retried(self):
+        with mock.patch('utils.services.send_mail', side_effect=[SMTPException('busy'), SMTPException('busy'), 1]) as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                NotificationService.send_order_status_notification(self.order)
+        
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(EmailLog.objects.get().status, 'sent')
+    
+    def test_gives_up_after_max_retries(self):
+        with mock.patch('utils.services.send_mail', side_effect=SMTPException('down')) as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                NotificationService.send_order_status_notification(self.order)
+        
+        self.assertEqual(send.call_count, 6)
+        email_log = EmailLog.objects.get()
+        self.assertEqual(email_log.status, 'failed')
+        self.assertEqual(email_log.error_message, 'down')
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class BulkEmailTests(TestCase):
+    """Tests for batched email sending"""
+    
+    def setUp(self):
+        EmailTemplate.objects.create(
+            name='Yangiliklar',
+            template_type='newsletter',
+            subject='Yangiliklar',
+            content='Hurmatli {{user_name}}',
+        )
+        self.recipients = [(f'mijoz{number}@example.com', {'user_name': f'Mijoz {number}'}) for number in range(5)]
+    
+    def test_batches_share_connections_and_bulk_queries(self):
+        with mock.patch('utils.services.get_connection', wraps=mail.get_connection) as get_connection:
+            # Template lookup, then one INSERT and one UPDATE per batch
+            with self.assertNumQueries(7):
+                totals = EmailService.send_bulk('newsletter', self.recipients, batch_size=2)
+        
+        self.assertEqual(totals, {'sent': 5, 'failed': 0})
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual([message.body for message in mail.outbox][-1], 'Hurmatli Mijoz 4')
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 5)
+    
+    def test_failures_are_recorded_per_recipient(self):
+        original = mail.backends.locmem.EmailBackend.send_messages
+        
+        def send_messages(backend, messages):
+            if messages[0].to == ['mijoz3@example.com']:
+                raise SMTPException('rejected')
+            return original(backend, messages)
+        
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', send_messages):
+            totals = EmailService.send_bulk('newsletter', self.recipients)
+        
+        self.assertEqual(totals, {'sent': 4, 'failed': 1})
+        failed = EmailLog.objects.get(status='failed')
+        self.assertEqual((failed.recipient, failed.error_message), ('mijoz3@example.com', 'rejected'))
+    
+    def test_bulk_status_notifications_are_queued_in_batches(self):
+        user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        EmailTemplate.objects.create(name='Buyurtma', template_type='order_confirmation', subject='{{order_number}}', content='{{status}}')
+        for _ in range(3):
+            Order.objects.create(
+                user=user, product_name='Mahsulot', unit_price=Decimal('1.00'),
+                delivery_address='Toshkent', delivery_phone='+998901234567'
+            )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.send_bulk_order_status_notifications(Order.objects.all())
+        self.assertEqual(EmailLog.objects.filter(template__template_type='order_confirmation', status='sent').count(), 3)
+
+
+class TemplateCacheTests(TestCase):
+    """Tests for compiled and cached email templates"""
+    
+    def test_compiled_template_renders_in_one_pass(self):
+        template = CompiledTemplate('{{a}} va {{b}}: {{missing}} {{a}}')
+        # Values are not substituted again, even when they look like placeholders
+        self.assertEqual(template.render({'a': '{{b}}', 'b': 2}), '{{b}} va 2: {{missing}} {{b}}')
+    
+    def test_templates_are_cached_until_saved(self):
+        template = EmailTemplate.objects.create(
+            name='Tasdiqlash', template_type='verification', subject='Kod', content='Kodingiz: {{code}}'
+        )
+        EmailService.render_email('verification', {'code': 1})
+        with self.assertNumQueries(0):
+            _, _, content = EmailService.render_email('verification', {'code': 123456})
+        self.assertEqual(content, 'Kodingiz: 123456')
+        
+        template.content = 'Yangi kod: {{code}}'
+        template.save()
+        self.assertEqual(EmailService.render_email('verification', {'code': 7})[2], 'Yangi kod: 7')
+        
+        template.delete()
+        self.assertIsNone(EmailService.render_email('verification', {'code': 7}))
+
+
+class SystemSettingCacheTests(TestCase):
+    """Tests for the in-memory SystemSetting accessor"""
+    
+    def setUp(self):
+        system_settings.invalidate_settings()
+        self.addCleanup(system_settings.invalidate_settings)
+    
+    def test_typed_getters(self):
+        SystemSetting.objects.bulk_create([
+            SystemSetting(name='limit', key='limit', value='25'),
+            SystemSetting(name='ratio', key='ratio', value='0.5'),
+            SystemSetting(name='enabled', key='enabled', value='Yes'),
+            SystemSetting(name='channels', key='channels', value='["sms", "email"]'),
+            SystemSetting(name='disabled', key='disabled', value='1', is_active=False),
+        ])
+        # bulk_create sends no signals
+        system_settings.invalidate_settings()
+        
+        self.assertEqual(system_settings.get_int('limit'), 25)
+        self.assertEqual(system_settings.get_float('ratio'), 0.5)
+        self.assertTrue(system_settings.get_bool('enabled'))
+        self.assertEqual(system_settings.get_json('channels'), ['sms', 'email'])
+        self.assertFalse(system_settings.get_bool('disabled'))
+        self.assertEqual(system_settings.get_int('ratio', 3), 3)
+        self.assertEqual(system_settings.get_str('missing', 'default'), 'default')
+    
+    def test_reads_are_cached_until_saved(self):
+        setting = SystemSetting.objects.create(name='sms_sender', key='sms_sender', value='WCompany')
+        self.assertEqual(system_settings.get_str('sms_sender'), 'WCompany')
+        with self.assertNumQueries(0):
+            self.assertEqual(system_settings.get_str('sms_sender'), 'WCompany')
+        
+        setting.value = 'WC'
+        setting.save()
+        self.assertEqual(system_settings.get_str('sms_sender'), 'WC')
+        
+        setting.delete()
+        self.assertIsNone(system_settings.get_setting('sms_sender'))
+    
+    def test_send_sms_reads_settings_without_queries(self):
+        SystemSetting.objects.create(name='sms_api_url', key='sms_api_url', value='http://sms.test/send')
+        SystemSetting.objects.create(name='sms_api_key', key='sms_api_key', value='secret')
+        system_settings.all_settings()
+        
+        with mock.patch('requests.Session.post') as post, CaptureQueriesContext(connection) as queries:
+            post.return_value.status_code = 200
+            self.assertTrue(SMSService.send_sms('+998901234567', 'Salom'))
+        # Only the SMSLog insert and update
+        table = SystemSetting._meta.db_table
+        self.assertEqual(len(queries), 2)
+        self.assertFalse([query for query in queries if table in query['sql']])
+        post.assert_called_once()
+        self.assertEqual(post.call_args.args[0], 'http://sms.test/send')
+        self.assertEqual(post.call_args.kwargs['json']['api_key'], 'secret')
+
+
+class StubSMSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.messages.append(body)
+            self.server.connections.add(self.client_address)
+        status = self.server.status
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+    
+    def log_message(self, *args):
+        pass
+
+
+class StubSMSServer(ThreadingHTTPServer):
+    """Local SMS provider recording messages and client connections"""
+    
+    daemon_threads = True
+    
+    def __init__(self, status=200):
+        super().__init__(('127.0.0.1', 0), StubSMSHandler)
+        self.status = status
+        self.messages = []
+        self.connections = set()
+        self.lock = threading.Lock()
+    
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/send'
+
+
+class SMSGatewayClientTests(TestCase):
+    """Tests for the pooled SMS provider client against a stub server"""
+    
+    def setUp(self):
+        self.server = StubSMSServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        system_settings.invalidate_settings()
+        self.addCleanup(system_settings.invalidate_settings)
+    
+    def gateway(self, **kwargs):
+        client = SMSGatewayClient(self.server.url, 'secret', **kwargs)
+        self.addCleanup(client.close)
+        return client
+    
+    def test_connections_are_reused(self):
+        client = self.gateway(pool_size=4)
+        messages = [(f'+99890{number:07d}', f'Xabar {number}') for number in range(40)]
+        
+        self.assertEqual(client.send_many(messages), [None] * 40)
+        self.assertEqual(len(self.server.messages), 40)
+        self.assertEqual(self.server.messages[0]['api_key'], 'secret')
+        self.assertLessEqual(len(self.server.connections), 4)
+    
+    def test_async_fan_out(self):
+        client = self.gateway(pool_size=4)
+        messages = [(f'+99890{number:07d}', 'Salom') for number in range(12)]
+        
+        self.assertEqual(asyncio.run(client.asend_many(messages)), [None] * 12)
+        self.assertEqual(len(self.server.messages), 12)
+    
+    def test_rate_limit(self):
+        client = self.gateway(rate=50, burst=1)
+        started = time.monotonic()
+        client.send_many([('+998901234567', 'Salom')] * 6)
+        # The first message uses the burst token, the other five wait 20ms each
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+    
+    def test_circuit_opens_after_failures(self):
+        self.server.status = 503
+        client = self.gateway(failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            with self.assertRaises(SMSGatewayError):
+                client.send('+998901234567', 'Salom')
+        
+        with self.assertRaises(CircuitOpenError):
+            client.send('+998901234567', 'Salom')
+        self.assertEqual(len(self.server.messages), 3)
+        
+        # After the reset timeout one trial request closes the circuit again
+        self.server.status = 200
+        client.breaker.opened_at -= 60
+        client.send('+998901234567', 'Salom')
+        self.assertEqual(client.breaker.state, 'closed')
+    
+    def test_send_bulk_sms_logs_each_message(self):
+        SystemSetting.objects.create(name='sms_api_url', key='sms_api_url', value=self.server.url)
+        SystemSetting.objects.create(name='sms_api_key', key='sms_api_key', value='secret')
+        self.server.status = 400
+        totals = SMSService.send_bulk_sms([('+998901234567', 'Salom')] * 3, batch_size=2)
+        self.assertEqual(totals, {'sent': 0, 'failed': 3})
+        
+        self.server.status = 200
+        totals = SMSService.send_bulk_sms([('+998901234567', 'Salom')] * 3, batch_size=2)
+        self.assertEqual(totals, {'sent': 3, 'failed': 0})
+        self.assertEqual(SMSLog.objects.filter(status='sent').count(), 3)
+        self.assertEqual(SMSLog.objects.filter(status='failed', error_message='API error: 400').count(), 3)
+
+
+class PDFRenderingTests(TestCase):
+    """Tests for the PDF worker pool and content-addressed storage"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PDF_RENDERER='utils.pdf.render_text')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        PDFTemplate.objects.create(name='Hisobot', template_type='report', html_template='<p>Hisobot {{number}}</p>')
+    
+    @override_settings(PDF_WORKERS=2)
+    def test_documents_render_in_worker_processes(self):
+        self.addCleanup(shutdown_pdf_executor)
+        submitted = [PDFService.submit_pdf('report', {'number': number}) for number in range(4)]
+        logs = [PDFService.complete_pdf(*item, timeout=30) for item in submitted]
+        
+        self.assertEqual(len({pdf_log.file_path for pdf_log in logs}), 4)
+        for pdf_log in logs:
+            pdf_log.refresh_from_db()
+            self.assertEqual(pdf_log.status, 'generated')
+            self.assertEqual(default_storage.size(pdf_log.file_path), pdf_log.file_size)
+    
+    @override_settings(PDF_WORKERS=2)
+    def test_batch_yields_documents_as_they_complete(self):
+        self.addCleanup(shutdown_pdf_executor)
+        documents = ((f'{number}.pdf', 'report', {'number': number}) for number in range(6))
+        results = dict(PDFService.generate_batch(documents, window=3))
+        
+        self.assertEqual(sorted(results), sorted(f'{number}.pdf' for number in range(6)))
+        self.assertTrue(all(pdf_log and pdf_log.status == 'generated' for pdf_log in results.values()))
+    
+    def test_zip_is_streamed_entry_by_entry(self):
+        requested = []
+        
+        def entries():
+            for name in ['a.pdf', 'b.pdf']:
+                requested.append(name)
+                yield name, BytesIO(name.encode() * 1000)
+        
+        stream = iter_zip(entries())
+        next(stream)
+        # The first entry is sent before the second one is requested
+        self.assertEqual(requested, ['a.pdf'])
+        
+        archive = zipfile.ZipFile(BytesIO(b''.join(stream)))
+        self.assertEqual(archive.read('b.pdf'), b'b.pdf' * 1000)
+    
+    def test_context_values_are_escaped(self):
+        with mock.patch('utils.services.render_pdf') as render:
+            PDFService.submit_pdf('report', {'number': '<img src="file:///etc/passwd">'})
+        self.assertIn('<p>Hisobot &lt;img src=&quot;file:///etc/passwd&quot;&gt;</p>', render.call_args[0][0])
+    
+    @override_settings(PDF_ALLOWED_HOSTS=['cdn.example.com'])
+    def test_resources_are_limited_to_allowed_hosts(self):
+        for url in ['file:///etc/passwd', 'http://169.254.169.254/latest/', 'ftp://cdn.example.com/logo.png']:
+            with self.assertRaises(ValueError):
+                fetch_resource(url)
+        
+        weasyprint = mock.Mock()
+        with mock.patch.dict('sys.modules', {'weasyprint': weasyprint}):
+            fetch_resource('https://cdn.example.com/logo.png', timeout=10)
+            fetch_resource('data:image/png;base64,AAAA')
+        self.assertEqual(weasyprint.default_url_fetcher.call_count, 2)
+    
+    @override_settings(PDF_WORKERS=0, PDF_RENDERER='utils.pdf.render_weasyprint_missing')
+    def test_failed_rendering_is_logged(self):
+        self.assertIsNone(PDFService.generate_pdf('report', {'number': 1}))
+        self.assertEqual(PDFLog.objects.get().status, 'failed')
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+class MetricsTests(TestCase):
+    """Tests for the Prometheus metrics endpoint"""
+    
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='pass12345')
+        # The client loads the middleware chain under the overridden settings
+        self.client = APIClient()
+    
+    def scrape(self, **extra):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token', **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+    
+    def test_exposition_format(self):
+        registry = Registry()
+        requests_total = registry.counter('jobs_total', "Jobs", ['queue'])
+        duration = registry.histogram('job_seconds', "Job time", buckets=(0.1, 1))
+        requests_total.labels('a"b').inc(2)
+        duration.labels().observe(0.1)
+        duration.labels().observe(5)
+        
+        self.assertEqual(registry.render(), (
+            '# HELP jobs_total Jobs\n'
+            '# TYPE jobs_total counter\n'
+            'jobs_total{queue="a\\"b"} 2\n'
+            '# HELP job_seconds Job time\n'
+            '# TYPE job_seconds histogram\n'
+            'job_seconds_bucket{le="0.1"} 1\n'
+            'job_seconds_bucket{le="1"} 1\n'
+            'job_seconds_bucket{le="+Inf"} 2\n'
+            'job_seconds_sum 5.1\n'
+            'job_seconds_count 2\n'
+        ))
+        with self.assertRaises(ValueError):
+            requests_total.labels()
+    
+    def test_requests_are_counted_per_url_name(self):
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/orders/')
+        self.client.get('/api/orders/')
+        self.client.get('/api/token/')
+        samples = self.scrape()
+        
+        self.assertEqual(samples['http_requests_total{view="orders:order-list",method="GET",status="200"}'], 2)
+        self.assertEqual(samples['http_request_duration_seconds_count{view="orders:order-list",method="GET"}'], 2)
+        self.assertGreater(samples['http_request_db_queries_sum{view="orders:order-list"}'], 0)
+        self.assertIn('http_request_db_duration_seconds_count{view="orders:order-list"}', samples)
+        # Routes outside the API apps share one label
+        self.assertEqual(samples['http_requests_total{view="other",method="GET",status="405"}'], 1)
+    
+    def test_values_of_all_processes_are_added(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # Values written by another worker process
+        other = metrics.registry.empty()
+        other.metrics['email_messages_total'].labels('sent').inc(3)
+        other.metrics['email_send_duration_seconds'].labels().observe(0.2)
+        with open(os.path.join(directory, '1.json'), 'w') as values_file:
+            json.dump(other.dump(), values_file)
+        
+        EmailTemplate.objects.create(name='Xush kelibsiz', template_type='welcome', subject='Salom', content='Salom')
+        with override_settings(METRICS_DIR=directory):
+            EmailService.send_email('welcome', 'client@example.com')
+            samples = self.scrape()
+        
+        self.assertEqual(samples['email_messages_total{status="sent"}'], 4)
+        self.assertEqual(samples['email_send_duration_seconds_count'], 2)
+        self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+    
+    def test_values_inherited_from_a_writing_process_are_dropped(self):
+        registry = Registry()
+        jobs = registry.counter('jobs_total', "Jobs")
+        jobs.labels().inc(5)
+        # As in a worker forked from a process that writes its own file
+        registry.writer_pid = -1
+        with override_settings(METRICS_DIR=tempfile.gettempdir()):
+            jobs.labels().inc()
+        self.assertEqual(registry.dump(), {'jobs_total': [[[], 1]]})
+    
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.scrape()
+    
+    @override_settings(METRICS_TOKEN='')
+    def test_staff_only_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        
+        staff = User.objects.create_user(email='staff@example.com', username='staff', password='pass12345', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+    
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 404)
+    
+    def test_notification_and_pdf_metrics(self):
+        EmailTemplate.objects.create(name='Xush kelibsiz', template_type='welcome', subject='Salom', content='Salom')
+        EmailService.send_email('welcome', 'client@example.com')
+        with mock.patch('utils.services.send_mail', side_effect=SMTPException('down')):
+            EmailService.send_email('welcome', 'client@example.com')
+        # Without the provider settings the message fails
+        system_settings.invalidate_settings()
+        SMSService.send_sms('+998901234567', 'Salom')
+        
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        PDFTemplate.objects.create(name='Hisobot', template_type='report', html_template='<p>Hisobot</p>')
+        with override_settings(MEDIA_ROOT=media_root, PDF_RENDERER='utils.pdf.render_text', PDF_WORKERS=0):
+            PDFService.generate_pdf('report')
+            PDFService.generate_pdf('report')
+        
+        samples = self.scrape()
+        self.assertEqual(samples['email_messages_total{status="sent"}'], 1)
+        self.assertEqual(samples['email_messages_total{status="failed"}'], 1)
+        self.assertEqual(samples['email_send_duration_seconds_count'], 2)
+        self.assertEqual(samples['sms_messages_total{status="failed"}'], 1)
+        self.assertEqual(samples['pdf_renders_total{template="report",result="rendered"}'], 1)
+        self.assertEqual(samples['pdf_renders_total{template="report",result="cached"}'], 1)
+        self.assertEqual(samples['pdf_render_duration_seconds_count{template="report"}'], 1)
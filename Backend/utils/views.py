@@ -1,3 +1,26 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
 
-# Create your views here.
+from .metrics import registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_view(request):
+    """Metrics in the Prometheus text format
+    
+    The totals of all processes writing to METRICS_DIR, or of this process
+    without it. Readable with METRICS_TOKEN as a bearer token, or by a
+    staff user when no token is configured.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(registry.collect().render(), content_type=CONTENT_TYPE)